@@ -1,12 +1,57 @@
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from .middleware import PerfMiddleware, ProfileMiddleware
 from .router import router
+from ..services.data_service import DataService
+from ..utils import metrics, perf, profiling
 from ..utils.config_loader import load_settings
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings and data are loaded here rather than at import time, so
+    # importing the app (e.g. by a process manager) stays cheap.
+    settings = load_settings()
+    app.title = settings["app"]["title"]
+    perf.configure(settings)
+    profiling.configure(settings)
+
+    # Sync endpoints run on anyio's threadpool. DataService publishes
+    # immutable data generations, so it is safe to widen it.
+    threads = settings["app"].get("threadpool_size")
+    if threads:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(threads)
 
-settings = load_settings()
+    if settings["app"].get("preload_data", True):
+        # Load CSVs (or the binary cache) off the event loop; the snapshot
+        # warm-up continues in the background.
+        await run_in_threadpool(DataService.instance)
+        logger.info("Data loaded at startup")
+    yield
 
-app = FastAPI(title=settings["app"]["title"])
+
+app = FastAPI(title="Student Performance Analytics API", lifespan=lifespan)
+app.add_middleware(PerfMiddleware)
+app.add_middleware(ProfileMiddleware)
 app.include_router(router, prefix="/api")
 
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of in-process counters and gauges."""
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # Serve static frontend at root
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
\ No newline at end of file
@@ -0,0 +1,178 @@
+import inspect
+import time
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+
+from ..utils import perf, profiling
+
+
+def _server_timing(timer: perf.RequestTimer, total: float) -> bytes:
+    parts = [f"{name};dur={1000 * seconds:.2f}" for name, (seconds, _) in timer.stages.items()]
+    parts.append(f"total;dur={1000 * total:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class PerfMiddleware:
+    """
+    ASGI middleware that times every API request. It records the latency
+    and stage totals per route template as declared on the router (e.g.
+    "GET /students/{student_id}/enrollments") and adds a Server-Timing
+    header. Static files and requests that match no route are not
+    recorded. When perf is disabled it passes requests straight through.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not perf.enabled():
+            await self.app(scope, receive, send)
+            return
+
+        token = perf.start_request()
+        timer = perf.current_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_timed(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if perf.server_timing_enabled():
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (b"server-timing", _server_timing(timer, time.perf_counter() - start))
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            perf.end_request(token)
+            route = scope.get("route")
+            if isinstance(route, APIRoute):
+                perf.registry.observe_request(
+                    f"{scope['method']} {route.path_format}",
+                    status,
+                    time.perf_counter() - start,
+                    timer,
+                )
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware for utils.profiling. While profiling is on, every HTTP
+    request is sampled, and the profile is kept when the request carried the
+    debug header or was slower than the threshold. When profiling is off it
+    passes requests straight through.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not profiling.enabled():
+            await self.app(scope, receive, send)
+            return
+
+        capture = profiling.begin(
+            scope["method"],
+            scope["path"],
+            profiling.header_requested(scope.get("headers", [])),
+        )
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            if capture is not None:
+                route = scope.get("route")
+                profiling.finish(
+                    capture,
+                    f"{scope['method']} {route.path_format}" if isinstance(route, APIRoute) else None,
+                    status,
+                    time.perf_counter() - start,
+                )
+
+
+def _attached(fn: Callable) -> Callable:
+    """Run a sync callable inside profiling.attach() (it runs on a worker thread)."""
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        with profiling.attach():
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so its own run time is the "endpoint" stage."""
+
+    def done(start: float) -> None:
+        timer = perf.current_request()
+        if timer is not None:
+            end = time.perf_counter()
+            timer.add("endpoint", end - start)
+            timer.endpoint_done = end
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def run_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                done(start)
+
+        return run_async
+
+    @wraps(endpoint)
+    def run(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with profiling.attach():
+                return endpoint(*args, **kwargs)
+        finally:
+            done(start)
+
+    return run
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits a request into the "endpoint" stage (the endpoint
+    function itself) and "serialize" (response validation, Pydantic models
+    and JSON encoding after the endpoint returned). Sync endpoints and
+    response validation run on worker threads, so both are attached to the
+    request's profile.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+        if self.response_field is not None:
+            # The route handler looks validate() up on the field per request
+            self.response_field.validate = _attached(self.response_field.validate)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timer = perf.current_request()
+            if timer is not None and timer.endpoint_done is not None:
+                timer.add("serialize", time.perf_counter() - timer.endpoint_done)
+            return response
+
+        return timed_handler
\ No newline at end of file
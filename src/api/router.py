@@ -1,6 +1,9 @@
+from datetime import datetime
 from pathlib import Path
+import gzip
 import io
 import tempfile
+import zipfile
 from typing import List, Optional, Any, Dict
 
 import pandas as pd
@@ -11,22 +14,30 @@ from fastapi import (
     File,
     HTTPException,
     Query,
+    Request,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
-from ..domain.grade_scale import default_scale
-from ..domain.gradebook import Gradebook
-from ..services.analytics_service import AnalyticsService
-from ..services.risk_service import RiskService
-from ..services.graph_service import GraphService
+from ..services.dashboard_service import DashboardService
 from ..services.data_service import DataService
+from ..utils import perf, profiling
+from ..utils.exceptions import DataValidationError, PrerequisiteCycleError
 from ..models.dto import (
     GPAEntry,
     PassRateEntry,
     DFWRateEntry,
     RiskEntry,
+    RiskSimulationRequest,
+    InProgressUpdate,
     GraphSummary,
+    PrereqClosure,
+    UnlockClosure,
+    CurriculumSummary,
+    CourseCriticalPath,
+    PrereqEdge,
+    GatewayImpact,
     AttendanceCorrelation,
     CohortGPAEntry,
 )
@@ -34,33 +45,53 @@ from ..auth.auth import (
     authenticate_user,
     create_access_token,
     get_current_user,
+    get_optional_user,
     require_role,
 )
 
-router = APIRouter()
+from .middleware import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
 
 
 def get_services():
-  """Build shared services from the singleton DataService."""
-  data_service = DataService.instance()
-  data = data_service.get_datasets()
-
-  gradebook = Gradebook(
-      enrollments=data["enrollments"],
-      courses=data["courses"],
-      scale=default_scale,
-  )
-  analytics = AnalyticsService(
-      gradebook=gradebook,
-      students=data["students"],
-      courses=data["courses"],
-      enrollments=data["enrollments"],
-  )
-  # gpa_tbl includes student metadata from AnalyticsService.gpa_table()
-  gpa_tbl = analytics.gpa_table()
-  risk = RiskService(gpa_tbl, data["enrollments"])
-  graph = GraphService(data["prerequisites"], data.get("courses"))
-  return data_service, data, gradebook, analytics, risk, graph
+  """
+  Yield shared services from the current warmed-up snapshot of the
+  singleton DataService (built once per data version, not per request).
+
+  The snapshot is leased for the whole request, so every table and service
+  the endpoint touches belongs to the same data generation even if an
+  upload publishes a new one meanwhile.
+  """
+  with profiling.attach():
+      # Waiting for the data load or a warm-up shows up in request profiles
+      data_service = DataService.instance()
+      data_service.get_snapshot()
+  with data_service.lease() as snap:
+      yield (
+          data_service,
+          snap.data,
+          snap.gradebook,
+          snap.analytics,
+          snap.risk,
+          snap.graph,
+          snap.eligibility,
+          snap.scopes,
+      )
+
+
+def get_scope(services=Depends(get_services), user=Depends(get_optional_user)):
+  """
+  Row scope of the caller: None (every row) for anonymous callers and
+  admins, else the principal's precomputed DataScope for this snapshot.
+  """
+  *_, scopes = services
+  return scopes.scope_for(user)
+
+
+def _check_student_access(scope, student_id: str) -> None:
+  if scope is not None and not scope.allows(student_id):
+      raise HTTPException(status_code=403, detail="Not enough permissions")
 
 
 @router.get("/health")
@@ -100,9 +131,10 @@ def get_gpa(
   major: Optional[str] = Query(None),
   cohort_year: Optional[int] = Query(None),
   services=Depends(get_services),
+  scope=Depends(get_scope),
 ):
-  _, _, _, analytics, _, _ = services
-  tbl = analytics.gpa_table(major=major, cohort_year=cohort_year)
+  _, _, _, analytics, *_ = services
+  tbl = analytics.gpa_table(major=major, cohort_year=cohort_year, scope=scope)
   records: List[GPAEntry] = []
   for row in tbl.itertuples():
       cohort = None
@@ -128,7 +160,7 @@ def get_pass_rates(
   term: Optional[str] = Query(None),
   services=Depends(get_services),
 ):
-  _, _, _, analytics, _, _ = services
+  _, _, _, analytics, *_ = services
   df = analytics.pass_rates(department=department, term=term)
   out: List[PassRateEntry] = []
   for row in df.itertuples():
@@ -153,7 +185,7 @@ def get_dfw_rates(
   term: Optional[str] = Query(None),
   services=Depends(get_services),
 ):
-  _, _, _, analytics, _, _ = services
+  _, _, _, analytics, *_ = services
   df = analytics.dfw_rates(department=department, term=term)
   out: List[DFWRateEntry] = []
   for row in df.itertuples():
@@ -174,14 +206,14 @@ def get_dfw_rates(
 
 @router.get("/metrics/attendance-correlation", response_model=AttendanceCorrelation)
 def get_attendance_corr(services=Depends(get_services)):
-  _, _, _, analytics, _, _ = services
+  _, _, _, analytics, *_ = services
   corr = analytics.attendance_grade_correlation()
   return AttendanceCorrelation(**corr)
 
 
 @router.get("/metrics/cohort-gpa", response_model=List[CohortGPAEntry])
 def get_cohort_gpa(services=Depends(get_services)):
-  _, _, _, analytics, _, _ = services
+  _, _, _, analytics, *_ = services
   df = analytics.cohort_gpa_summary()
   out: List[CohortGPAEntry] = []
   for row in df.itertuples():
@@ -198,19 +230,142 @@ def get_cohort_gpa(services=Depends(get_services)):
   return out
 
 
+def _set_page_headers(response: Response, total: int, next_cursor: Optional[str]) -> None:
+  response.headers["X-Total-Count"] = str(total)
+  if next_cursor is not None:
+    response.headers["X-Next-Cursor"] = next_cursor
+
+
 @router.get("/metrics/student-summary")
-def get_student_summary(services=Depends(get_services)) -> List[Dict[str, Any]]:
+def get_student_summary(
+  response: Response,
+  sort_by: Optional[str] = Query(None),
+  order: str = Query("desc", pattern="^(asc|desc)$"),
+  offset: int = Query(0, ge=0),
+  limit: Optional[int] = Query(None, ge=1),
+  cursor: Optional[str] = Query(None),
+  major: Optional[str] = Query(None),
+  cohort_year: Optional[int] = Query(None),
+  student_id: Optional[List[str]] = Query(None),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+) -> List[Dict[str, Any]]:
   """
   Enriched per-student metrics for dashboards:
   - GPA, total_credits, quality_points
   - avg_attendance, dfw_count, credits_attempted
   - basic student info (name, major, cohort_year)
+
+  Without parameters, every student in table order. Otherwise one page
+  sorted by `sort_by` (gpa, avg_attendance, dfw_count, credits_attempted,
+  total_credits; default gpa) in `order`, filtered by major, cohort_year
+  and repeated `student_id`. Page with `offset`/`limit` or with the
+  X-Next-Cursor header value as `cursor`; X-Total-Count is the number of
+  matching students.
   """
-  _, _, _, analytics, _, _ = services
-  df = analytics.student_summary_table()
+  _, _, _, analytics, *_ = services
+  paged = (
+      sort_by or limit or offset or cursor or major
+      or cohort_year is not None or student_id is not None
+  )
+  if not paged:
+      df = analytics.student_summary_table(scope=scope)
+      return df.to_dict(orient="records")
+  try:
+      df, total, next_cursor = analytics.student_summary_page(
+          sort_by=sort_by or "gpa",
+          descending=order == "desc",
+          offset=offset,
+          limit=limit,
+          cursor=cursor,
+          major=major,
+          cohort_year=cohort_year,
+          student_ids=student_id,
+          scope=scope,
+      )
+  except ValueError as exc:
+      raise HTTPException(status_code=400, detail=str(exc))
+  _set_page_headers(response, total, next_cursor)
   return df.to_dict(orient="records")
 
 
+@router.get("/metrics/distributions")
+def get_distributions(
+  metric: Optional[List[str]] = Query(None),
+  group_by: Optional[str] = Query(None),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  Pre-binned histograms for dashboard charts: gpa, avg_attendance,
+  dfw_count and credits_attempted (repeat `metric` to pick; default all),
+  overall or per `group_by` (major, cohort_year, department). Each
+  distribution has shared bin `edges` (the last bin is open-ended) and
+  per group `count`, `missing`, `mean` and bin `counts`.
+  """
+  _, _, _, analytics, *_ = services
+  try:
+      return analytics.distributions(metrics=metric, group_by=group_by, scope=scope)
+  except ValueError as exc:
+      raise HTTPException(status_code=400, detail=str(exc))
+
+
+# ---------- Dashboard bundles (PUBLIC) ----------
+
+
+@router.get("/dashboards/overview")
+def get_overview_dashboard(
+  leaderboard_limit: int = Query(50, ge=1, le=1000),
+  risk_limit: int = Query(20, ge=1, le=1000),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  Everything the Overview page renders in one payload: `kpis`, the first
+  `gpa_leaderboard` page (its `next_cursor` continues via
+  /metrics/student-summary?sort_by=gpa), the top `at_risk` students,
+  `cohort_gpa` and the `gpa_distribution`. Scoped like the endpoints it
+  replaces.
+  """
+  _, _, _, analytics, risk, *_ = services
+  return DashboardService(analytics, risk).overview(
+      leaderboard_limit=leaderboard_limit, risk_limit=risk_limit, scope=scope
+  )
+
+
+@router.get("/dashboards/advisor")
+def get_advisor_dashboard(
+  major: Optional[str] = Query(None),
+  cohort_year: Optional[int] = Query(None),
+  limit: int = Query(100, ge=1, le=5000),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  The Advisor table in one payload: the `limit` highest-risk students of
+  the major/cohort filters with flags, score and summary metrics, plus
+  the `total` number of matching at-risk students.
+  """
+  _, _, _, analytics, risk, *_ = services
+  return DashboardService(analytics, risk).advisor(
+      major=major, cohort_year=cohort_year, limit=limit, scope=scope
+  )
+
+
+@router.get("/dashboards/faculty")
+def get_faculty_dashboard(
+  department: Optional[str] = Query(None),
+  term: Optional[str] = Query(None),
+  services=Depends(get_services),
+):
+  """
+  Per-course pass and DFW rates (with completed counts) for the Faculty
+  and Courses pages, computed in one pass over the completed enrollments.
+  """
+  _, _, _, analytics, risk, *_ = services
+  return DashboardService(analytics, risk).faculty(department=department, term=term)
+
+
 # ---------- Export endpoints (PUBLIC) ----------
 
 
@@ -219,9 +374,10 @@ def export_gpa(
   major: Optional[str] = Query(None),
   cohort_year: Optional[int] = Query(None),
   services=Depends(get_services),
+  scope=Depends(get_scope),
 ):
-  _, _, _, analytics, _, _ = services
-  tbl = analytics.gpa_table(major=major, cohort_year=cohort_year)
+  _, _, _, analytics, *_ = services
+  tbl = analytics.gpa_table(major=major, cohort_year=cohort_year, scope=scope)
   buffer = io.StringIO()
   tbl.to_csv(buffer, index=False)
   buffer.seek(0)
@@ -239,7 +395,7 @@ def export_pass_rates(
   term: Optional[str] = Query(None),
   services=Depends(get_services),
 ):
-  _, _, _, analytics, _, _ = services
+  _, _, _, analytics, *_ = services
   df = analytics.pass_rates(department=department, term=term)
   buffer = io.StringIO()
   df.to_csv(buffer, index=False)
@@ -256,52 +412,268 @@ def export_pass_rates(
 
 
 @router.get("/risk/at-risk", response_model=List[RiskEntry])
-def get_at_risk(services=Depends(get_services)):
-  _, _, _, _, risk, _ = services
-  data = risk.at_risk_students()
+def get_at_risk(
+  response: Response,
+  sort_by: str = Query("score"),
+  order: str = Query("desc", pattern="^(asc|desc)$"),
+  offset: int = Query(0, ge=0),
+  limit: Optional[int] = Query(None, ge=1),
+  cursor: Optional[str] = Query(None),
+  major: Optional[str] = Query(None),
+  cohort_year: Optional[int] = Query(None),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  Flagged students, highest risk score first. `sort_by` (score, gpa,
+  avg_attendance, dfw_count) and `order` re-sort from precomputed orders;
+  `major`/`cohort_year` filter. Page with `offset`/`limit` or with the
+  X-Next-Cursor header value as `cursor`; X-Total-Count is the number of
+  matching students.
+  """
+  _, _, _, _, risk, *_ = services
+  try:
+      data, total, next_cursor = risk.at_risk_page(
+          sort_by=sort_by,
+          descending=order == "desc",
+          offset=offset,
+          limit=limit,
+          cursor=cursor,
+          major=major,
+          cohort_year=cohort_year,
+          scope=scope,
+      )
+  except ValueError as exc:
+      raise HTTPException(status_code=400, detail=str(exc))
+  _set_page_headers(response, total, next_cursor)
   return [RiskEntry(**item) for item in data]
 
 
+@router.post("/risk/simulate")
+def simulate_risk(
+  request: RiskSimulationRequest,
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  What-if evaluation of risk policies. `grid` maps policy fields
+  (gpa_threshold, attendance_threshold, dfw_grade_threshold, gpa_weight,
+  attendance_weight, dfw_weight) to value lists and every combination is a
+  scenario; `scenarios` adds explicit ones. Each scenario reports flagged
+  counts, a score histogram and the students it adds or removes compared
+  with the current policy. Scoped like /risk/at-risk.
+  """
+  _, _, _, _, risk, *_ = services
+  try:
+      scenarios = risk.expand_grid(request.grid, extra=len(request.scenarios)) + [
+          s.model_dump(exclude_none=True) for s in request.scenarios
+      ]
+      return risk.simulate(
+          scenarios, bins=request.bins, delta_limit=request.delta_limit, scope=scope
+      )
+  except ValueError as exc:
+      raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/risk/early-warning")
+def get_early_warning(
+  since: Optional[datetime] = Query(None),
+  limit: int = Query(100, ge=1, le=5000),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  Students at risk once in-progress attendance and provisional grades are
+  counted, who became at risk after `since` (ISO datetime, UTC if naive),
+  newest first. Without `since`, also lists those already at risk when the
+  data was loaded (became_at_risk_at null). Scoped like /risk/at-risk.
+  """
+  data_service, *_ = services
+  return data_service.early_warnings().newly_at_risk(
+      since=since, limit=limit, scope=scope
+  )
+
+
 @router.get("/graph/prerequisites", response_model=GraphSummary)
 def get_prereq_summary(services=Depends(get_services)):
-  _, _, _, _, _, graph = services
+  _, _, _, _, _, graph, *_ = services
   summary = graph.summary()
   return GraphSummary(**summary)
 
 
 @router.get("/graph/prerequisites/full")
-def get_prereq_full(services=Depends(get_services)):
+def get_prereq_full(
+  request: Request,
+  department: Optional[str] = Query(None),
+  offset: int = Query(0, ge=0),
+  limit: Optional[int] = Query(None, ge=1),
+  services=Depends(get_services),
+):
   """Return a list of all courses with their titles and prerequisites.
 
   Each item: { course_id, title?, prerequisites: [ {course_id, title?}, ... ] }
+
+  The payload is serialized once per data version; the unfiltered list is
+  served from prebuilt bytes (gzip if accepted) with an ETag. `department`
+  and `offset`/`limit` select a subset; X-Total-Count is the number of
+  matching courses before paging.
   """
-  _, _, _, _, _, graph = services
-  adj = graph.adjacency()
-  out = []
-  for course_id, pres in adj.items():
-    item = {"course_id": course_id}
-    title = getattr(graph, 'course_titles', {}).get(str(course_id))
-    if title:
-      item["title"] = title
-    item["prerequisites"] = pres
-    out.append(item)
-  # Also include courses that might have no adjacency entry but exist in titles
-  for cid, title in getattr(graph, 'course_titles', {}).items():
-    if cid not in adj:
-      out.append({"course_id": cid, "title": title, "prerequisites": []})
-  return out
+  _, _, _, _, _, graph, *_ = services
+  listing = graph.full_listing
+  body, etag, total = listing.select(department, offset, limit)
+  gzipped = listing.gzip_body if body is listing.body else None
+  return _json_bytes_response(
+      request, body, etag, gzipped, headers={"X-Total-Count": str(total)}
+  )
+
+
+def _json_bytes_response(
+  request: Request,
+  body: bytes,
+  etag: str,
+  gzipped: Optional[bytes] = None,
+  headers: Optional[Dict[str, str]] = None,
+) -> Response:
+  """
+  Serve pre-serialized JSON with ETag revalidation (304 on If-None-Match)
+  and gzip when the client accepts it. `gzipped` is a precompressed copy
+  of `body`; without one, bodies over 1 KiB are compressed on the fly.
+  """
+  use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+  if use_gzip and gzipped is None and len(body) > 1024:
+      gzipped = gzip.compress(body, compresslevel=6)
+  if not use_gzip:
+      gzipped = None
+  if gzipped is not None:
+      # A different representation needs its own strong validator
+      etag = etag[:-1] + '-gzip"'
+  out_headers = {
+      "ETag": etag,
+      "Cache-Control": "no-cache",
+      "Vary": "Accept-Encoding",
+      **(headers or {}),
+  }
+  if etag in request.headers.get("if-none-match", ""):
+      return Response(status_code=304, headers=out_headers)
+  if gzipped is not None:
+      out_headers["Content-Encoding"] = "gzip"
+      body = gzipped
+  return Response(content=body, media_type="application/json", headers=out_headers)
+
+
+def _closure_course(graph, course_id: str) -> Dict[str, Any]:
+  if not graph.has_course(course_id):
+    raise HTTPException(status_code=404, detail="Course not found")
+  item: Dict[str, Any] = {"course_id": course_id}
+  title = graph.course_titles.get(course_id)
+  if title:
+    item["title"] = title
+  return item
+
+
+@router.get("/graph/prerequisites/{course_id}/all", response_model=PrereqClosure)
+def get_all_prereqs(
+  course_id: str,
+  max_distance: Optional[int] = Query(None, ge=1),
+  services=Depends(get_services),
+):
+  """All direct and indirect prerequisites of a course, nearest first.
+
+  Answered from the precomputed transitive closure (no graph traversal);
+  `max_distance=1` returns only direct prerequisites.
+  """
+  _, _, _, _, _, graph, *_ = services
+  item = _closure_course(graph, course_id)
+  item["prerequisites"] = graph.all_prerequisites(course_id, max_distance)
+  return item
+
+
+@router.get("/graph/prerequisites/{course_id}/unlocks", response_model=UnlockClosure)
+def get_unlocked_courses(
+  course_id: str,
+  max_distance: Optional[int] = Query(None, ge=1),
+  services=Depends(get_services),
+):
+  """All courses unlocked by (directly or indirectly requiring) a course."""
+  _, _, _, _, _, graph, *_ = services
+  item = _closure_course(graph, course_id)
+  item["unlocks"] = graph.unlocked_by(course_id, max_distance)
+  return item
+
+
+@router.get("/graph/gateway-impact", response_model=List[GatewayImpact])
+def get_gateway_impact(
+  k: Optional[int] = Query(None, ge=1),
+  term: Optional[str] = Query(None),
+  department: Optional[str] = Query(None),
+  services=Depends(get_services),
+):
+  """
+  Highest-impact bottleneck courses: downstream reach weighted by completed
+  enrollments and DFW rate, highest first. `k` defaults to
+  curriculum.gateway_top_k.
+  """
+  _, _, _, analytics, _, graph, *_ = services
+  return graph.gateway_impact(
+      analytics.course_term_outcomes(), term=term, department=department, k=k
+  )
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+  return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+@router.get("/graph/curriculum", response_model=CurriculumSummary)
+def get_curriculum(
+  credit_cap: Optional[float] = Query(None, gt=0),
+  top: int = Query(10, ge=1),
+  services=Depends(get_services),
+):
+  """
+  Curriculum analytics for the faculty view: per-course depth, minimum
+  terms to completion under `credit_cap` credits per term (defaults to
+  curriculum.max_credits_per_term), downstream reach, and the `top`
+  bottleneck courses by DFW rate x downstream dependents.
+  """
+  _, _, _, analytics, _, graph, *_ = services
+  df = graph.curriculum(analytics.dfw_rates(), credit_cap)
+  ranked = df[(df["downstream"] > 0) & df["dfw_rate"].notna()]
+  return {
+      "credit_cap": credit_cap or graph.default_credit_cap,
+      "cycle_detected": graph.summary()["cycle_detected"],
+      "courses": _records(df),
+      "bottlenecks": _records(ranked.nlargest(top, "bottleneck_score")),
+  }
+
+
+@router.get("/graph/curriculum/{course_id}", response_model=CourseCriticalPath)
+def get_course_critical_path(
+  course_id: str,
+  credit_cap: Optional[float] = Query(None, gt=0),
+  services=Depends(get_services),
+):
+  """Curriculum metrics for one course plus its critical (longest) prerequisite path."""
+  _, _, _, analytics, _, graph, *_ = services
+  df = graph.curriculum(analytics.dfw_rates(), credit_cap)
+  row = df[df["course_id"] == course_id]
+  if row.empty:
+      raise HTTPException(status_code=404, detail="Course not found")
+  item = _records(row)[0]
+  item["credit_cap"] = credit_cap or graph.default_credit_cap
+  item["critical_path"] = graph.curriculum_stats.critical_path(course_id) or [course_id]
+  return item
 
 
 # ---------- Student endpoints (still protected) ----------
 
 
 @router.get("/students")
-def list_students(services=Depends(get_services)):
+def list_students(services=Depends(get_services), scope=Depends(get_scope)):
   """
-  Return basic info for all students.
+  Return basic info for all students (in the caller's scope).
   """
   _, data, *_ = services
-  students = data["students"]
+  students = data["students"] if scope is None else scope.students()
   return students[["student_id", "name", "major", "cohort_year"]].to_dict(
       orient="records"
   )
@@ -311,31 +683,68 @@ def list_students(services=Depends(get_services)):
 def get_student_enrollments(
   student_id: str,
   services=Depends(get_services),
+  scope=Depends(get_scope),
 ):
   """
   Return enrollments for a single student. For demo purposes this endpoint
-  is public (no auth) so admin UI can load student records in the demo.
+  is public (no auth) so admin UI can load student records in the demo;
+  signed-in callers only get students within their scope.
   """
-  _, data, *_ = services
-  enroll = data["enrollments"]
-  students = data["students"]
+  _check_student_access(scope, student_id)
+  _, data, *_, scopes = services
   courses = data["courses"]
 
-  df = (
-      enroll[enroll["student_id"] == student_id]
-      .merge(courses, on="course_id", how="left")
-  )
+  df = scopes.student_enrollments(student_id).merge(courses, on="course_id", how="left")
 
-  stu_row = students[students["student_id"] == student_id]
-  student_name = stu_row["name"].iloc[0] if not stu_row.empty else None
+  stu_row = scopes.student_record(student_id)
+  student_name = stu_row.get("name") if stu_row is not None else None
 
   return {
       "student_id": student_id,
       "name": student_name,
-      "enrollments": df.to_dict(orient="records"),
+      # grade is empty for in-progress and withdrawn enrollments
+      "enrollments": _records(df),
   }
 
 
+@router.get("/students/{student_id}/eligible-courses")
+def get_student_eligible_courses(
+  student_id: str,
+  include_open: bool = Query(False),
+  services=Depends(get_services),
+  scope=Depends(get_scope),
+):
+  """
+  Courses the student can take next: every prerequisite passed (completed,
+  grade >= dfw_grade_threshold) and the course itself not yet passed.
+  With include_open=true, courses without prerequisites are listed too.
+  """
+  _check_student_access(scope, student_id)
+  *_, eligibility, _ = services
+  courses = eligibility.eligible_courses(student_id, include_open=include_open)
+  if courses is None:
+      raise HTTPException(status_code=404, detail="Student not found")
+  return {"student_id": student_id, "eligible_courses": courses}
+
+
+@router.get("/eligibility/export")
+def export_eligibility(services=Depends(get_services), scope=Depends(get_scope)):
+  """
+  Bulk CSV of (student_id, course_id) for every student in the caller's
+  scope and every course with prerequisites they are eligible for (courses
+  without prerequisites are omitted). Streamed from the precomputed
+  eligibility matrix.
+  """
+  *_, eligibility, _ = services
+  student_ids = scope.student_ids if scope is not None else None
+  headers = {"Content-Disposition": 'attachment; filename="eligible_courses.csv"'}
+  return StreamingResponse(
+      eligibility.iter_csv(student_ids=student_ids),
+      media_type="text/csv",
+      headers=headers,
+  )
+
+
 # ---------- Admin / Data endpoints (NOW PUBLIC) ----------
 
 
@@ -346,13 +755,87 @@ def get_data_status(
   """
   Previously admin-only; now public for demo/UI purposes.
   """
-  data_service, data, *_ = services
+  data_service, *_ = services
   status = data_service.status()
-  columns = {name: list(df.columns) for name, df in data.items()}
+  columns = {
+      name: list(df.columns) for name, df in data_service.get_datasets().items()
+  }
   status["columns"] = columns
   return status
 
 
+@router.get("/admin/perf")
+def get_perf(reset: bool = Query(False)):
+  """
+  Rolling p50/p95/p99 latency per route with a per-stage breakdown
+  (service methods, "endpoint" and "serialize"), plus per-stage totals
+  across all requests and background warm-ups. `reset=true` clears the
+  statistics after reading them.
+  """
+  out = perf.registry.snapshot()
+  if reset:
+      perf.registry.reset()
+  return out
+
+
+@router.get("/admin/profiles")
+def list_profiles():
+  """
+  Request profiler settings and the kept profiles, newest first. While
+  profiling is on, requests carrying the debug header (X-Profile: 1) or
+  slower than threshold_ms are sampled and kept in a ring buffer.
+  """
+  return {"config": profiling.config(), "profiles": profiling.store.list()}
+
+
+@router.put("/admin/profiles/config")
+def configure_profiling(
+  enabled: Optional[bool] = Query(None),
+  threshold_ms: Optional[float] = Query(None, ge=0),
+  interval_ms: Optional[float] = Query(None, gt=0),
+):
+  """Switch the request profiler on or off and tune it at runtime."""
+  return profiling.update(
+      enabled=enabled, threshold_ms=threshold_ms, interval_ms=interval_ms
+  )
+
+
+@router.get("/admin/profiles/{profile_id}")
+def download_profile(
+  profile_id: int,
+  format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+):
+  """
+  One kept profile, as collapsed stacks (flamegraph.pl, speedscope) or as
+  a pstats file (python -m pstats, snakeviz). Counts are samples.
+  """
+  profile = profiling.store.get(profile_id)
+  if profile is None:
+      raise HTTPException(status_code=404, detail="Profile not found")
+  if format == "pstats":
+      if not profile.samples:
+          # pstats cannot load an empty profile
+          raise HTTPException(status_code=409, detail="Profile has no samples")
+      return Response(
+          profile.pstats(),
+          media_type="application/octet-stream",
+          headers={
+              "Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'
+          },
+      )
+  return Response(
+      profile.collapsed(),
+      media_type="text/plain",
+      headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+  )
+
+
+@router.delete("/admin/profiles")
+def clear_profiles():
+  profiling.store.clear()
+  return {"status": "cleared"}
+
+
 @router.get("/admin/download/{table_name}")
 def download_table(
   table_name: str,
@@ -363,7 +846,7 @@ def download_table(
   """
   data_service, *_ = services
   name = table_name.lower()
-  if name not in {"students", "courses", "enrollments", "prerequisites"}:
+  if name not in DataService.TABLES:
       raise HTTPException(status_code=400, detail="Invalid table name")
   df = data_service.get_table(name)
   buffer = io.StringIO()
@@ -389,7 +872,7 @@ async def upload_table(
   """
   data_service, *_ = services
   name = table_name.lower()
-  if name not in {"students", "courses", "enrollments", "prerequisites"}:
+  if name not in DataService.TABLES:
       raise HTTPException(status_code=400, detail="Invalid table name")
 
   try:
@@ -399,5 +882,138 @@ async def upload_table(
           tmp_path = Path(tmp.name)
       data_service.replace_table_from_file(name, tmp_path)
       return {"status": "ok", "message": f"{name} updated successfully"}
+  except DataValidationError as exc:
+      raise HTTPException(
+          status_code=400, detail={"message": str(exc), "report": exc.report}
+      )
+  except Exception as exc:
+      raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/admin/upload-bundle")
+async def upload_bundle(
+  students: Optional[UploadFile] = File(None),
+  courses: Optional[UploadFile] = File(None),
+  enrollments: Optional[UploadFile] = File(None),
+  prerequisites: Optional[UploadFile] = File(None),
+  bundle: Optional[UploadFile] = File(None),
+  services=Depends(get_services),
+):
+  """
+  Replace several tables in one commit, e.g. when loading a new term.
+
+  Send any of the four tables as separate multipart fields, or a `bundle`
+  zip containing students.csv / courses.csv / enrollments.csv /
+  prerequisites.csv (a table in both places uses the separate field).
+  Tables are cross-checked for dangling ids and published as a single
+  data generation; if any check fails nothing is changed.
+  WARNING: In a real deployment, you must protect this endpoint.
+  """
+  data_service, *_ = services
+  sources: Dict[str, io.BytesIO] = {}
+
+  if bundle is not None:
+      try:
+          with zipfile.ZipFile(io.BytesIO(await bundle.read())) as zf:
+              for info in zf.infolist():
+                  stem = Path(info.filename).stem.lower()
+                  if stem in DataService.TABLES and not info.is_dir():
+                      sources[stem] = io.BytesIO(zf.read(info))
+      except zipfile.BadZipFile:
+          raise HTTPException(status_code=400, detail="bundle is not a valid zip file")
+
+  fields = {
+      "students": students,
+      "courses": courses,
+      "enrollments": enrollments,
+      "prerequisites": prerequisites,
+  }
+  for name, upload in fields.items():
+      if upload is not None:
+          sources[name] = io.BytesIO(await upload.read())
+
+  if not sources:
+      raise HTTPException(status_code=400, detail="No tables supplied")
+
+  try:
+      rows = await run_in_threadpool(data_service.replace_tables, sources)
+  except DataValidationError as exc:
+      raise HTTPException(
+          status_code=400, detail={"message": str(exc), "report": exc.report}
+      )
   except Exception as exc:
-      raise HTTPException(status_code=400, detail=str(exc))
\ No newline at end of file
+      raise HTTPException(status_code=400, detail=str(exc))
+  return {
+      "status": "ok",
+      "message": f"{', '.join(sorted(rows))} updated successfully",
+      "rows": rows,
+  }
+
+
+@router.post("/admin/in-progress")
+def post_in_progress_updates(
+  updates: List[InProgressUpdate],
+  services=Depends(get_services),
+):
+  """
+  Apply in-progress attendance / provisional grade updates, in order.
+  Only the students they touch are re-scored; the response lists those
+  who became at risk or were cleared. Updates naming an unknown student
+  or course are reported under `rejected` by list index.
+  """
+  data_service, *_ = services
+  return data_service.early_warnings().apply(
+      [
+          (u.student_id, u.course_id, u.term, u.attendance_pct, u.grade)
+          for u in updates
+      ]
+  )
+
+
+@router.post("/admin/prerequisites")
+def add_prerequisite(
+  edge: PrereqEdge,
+  services=Depends(get_services),
+):
+  """
+  Add one prerequisite edge without re-uploading the table. An edge that
+  would create a cycle is rejected with 409 and the cycle as a course path.
+  Returns the courses whose prerequisite depth changes.
+  """
+  data_service, *_ = services
+  try:
+      changes = data_service.add_prerequisite(edge.course_id, edge.prereq_id)
+  except PrerequisiteCycleError as exc:
+      raise HTTPException(
+          status_code=409, detail={"message": str(exc), "cycle": exc.path}
+      )
+  except DataValidationError as exc:
+      raise HTTPException(
+          status_code=400, detail={"message": str(exc), "report": exc.report}
+      )
+  except ValueError as exc:
+      raise HTTPException(status_code=409, detail=str(exc))
+  return {
+      "status": "ok",
+      "data_version": data_service.version,
+      "depth_changes": changes,
+  }
+
+
+@router.delete("/admin/prerequisites")
+def remove_prerequisite(
+  course_id: str = Query(...),
+  prereq_id: str = Query(...),
+  services=Depends(get_services),
+):
+  """Remove a prerequisite edge; returns the courses whose depth changes."""
+  data_service, *_ = services
+  try:
+      changes = data_service.remove_prerequisite(course_id, prereq_id)
+  except KeyError:
+      raise HTTPException(status_code=404, detail="Prerequisite edge not found")
+  return {
+      "status": "ok",
+      "data_version": data_service.version,
+      "depth_changes": changes,
+  }
\ No newline at end of file
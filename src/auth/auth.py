@@ -1,12 +1,15 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 import hashlib
+import threading
+import time
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
 
 from ..utils.config_loader import load_settings
+from ..utils.metrics import cache_lookup
 from ..services.data_service import DataService  # NEW: needed to read students table
 
 # ---------- Simple hashing (for demo / local use only) ----------
@@ -44,6 +47,8 @@ _fake_users_db: Dict[str, Dict] = {
         "hashed_password": hash_password("faculty123"),
         "role": "faculty",
         "student_id": None,
+        # Set to a department code to scope this account's rows to it
+        "department": None,
     },
     "advisor": {
         "username": "advisor",
@@ -55,12 +60,53 @@ _fake_users_db: Dict[str, Dict] = {
 }
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+# Same scheme for endpoints that also serve anonymous callers
+oauth2_optional_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
+
+# Shared demo password for student accounts; change here if you want a different one.
+_STUDENT_PASSWORD_HASH = hash_password("student123")
 
 
 def get_user(username: str) -> Optional[Dict]:
     return _fake_users_db.get(username)
 
 
+class _StudentIndex:
+    """
+    student_id -> display name for the current students table, as a dict.
+    Rebuilt only when the students table object changes (i.e. after an
+    upload replaces it), so lookups are O(1) whatever the number of students.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table: Any = None
+        self._names: Dict[str, str] = {}
+
+    def current_table(self) -> Any:
+        return DataService.instance().get_table("students")
+
+    def lookup(self, student_id: str) -> Tuple[Optional[str], Any]:
+        """Return (display name or None if unknown, the students table used)."""
+        table = self.current_table()
+        if table is not self._table:
+            with self._lock:
+                if table is not self._table:
+                    first = table.drop_duplicates("student_id")
+                    ids = first["student_id"]
+                    names = (
+                        first["name"].where(first["name"].notna(), ids)
+                        if "name" in first.columns
+                        else ids
+                    )
+                    self._names = dict(zip(ids, names))
+                    self._table = table
+        return self._names.get(student_id), table
+
+
+_students = _StudentIndex()
+
+
 def _maybe_make_student_user(username: str) -> Optional[Dict]:
     """
     If `username` matches a student_id in the students table,
@@ -79,25 +125,14 @@ def _maybe_make_student_user(username: str) -> Optional[Dict]:
     if not username.upper().startswith("S"):
         return None
 
-    # Look up in the data
-    data_service = DataService.instance()
-    students_df = data_service.get_table("students")
-
-    match = students_df[students_df["student_id"] == username]
-    if match.empty:
+    full_name, _ = _students.lookup(username)
+    if full_name is None:
         return None
 
-    full_name = (
-        match["name"].iloc[0]
-        if "name" in match.columns and not match["name"].isna().iloc[0]
-        else username
-    )
-
     return {
         "username": username,
         "full_name": full_name,
-        # Shared demo password; change here if you want a different one.
-        "hashed_password": hash_password("student123"),
+        "hashed_password": _STUDENT_PASSWORD_HASH,
         "role": "student",
         "student_id": username,
     }
@@ -131,6 +166,8 @@ def _get_auth_settings():
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt  # imported lazily to keep app startup fast
+
     auth_cfg = _get_auth_settings()
     to_encode = data.copy()
     expire = datetime.utcnow() + (
@@ -145,7 +182,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class _TokenCache:
+    """
+    Small LRU cache of verified token -> user, so repeated requests with the
+    same bearer token skip JWT decoding and the user lookup. An entry lives
+    at most `auth.token_cache_seconds` and never past the token's own expiry;
+    student entries are dropped as soon as the students table is replaced.
+    Past `max_size` entries, the least recently used token is evicted.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict, Any]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Dict]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires, user, students = entry
+        if time.time() >= expires or (
+            students is not None and students is not _students.current_table()
+        ):
+            with self._lock:
+                self._entries.pop(token, None)
+            return None
+        with self._lock:
+            if token in self._entries:
+                self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: Dict, exp: Optional[float], students: Any) -> None:
+        ttl = float(_get_auth_settings().get("token_cache_seconds", 60))
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        if exp is not None:
+            expires = min(expires, float(exp))
+        with self._lock:
+            self._entries[token] = (expires, user, students)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = _TokenCache()
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
+    cached = _token_cache.get(token)
+    cache_lookup("auth_token", cached is not None)
+    if cached is not None:
+        return cached
+
+    from jose import JWTError, jwt  # imported lazily to keep app startup fast
+
     auth_cfg = _get_auth_settings()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -162,18 +256,35 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
 
         # Try fixed users first
         user = get_user(username)
+        students = None
         if user is None:
             # If not a fixed user, try to reconstruct a dynamic student user
+            students = _students.current_table()
             user = _maybe_make_student_user(username)
 
         if user is None:
             raise credentials_exception
 
+        _token_cache.put(token, user, payload.get("exp"), students)
         return user
     except JWTError:
         raise credentials_exception
 
 
+async def get_optional_user(
+    token: Optional[str] = Depends(oauth2_optional_scheme),
+) -> Optional[Dict]:
+    """
+    The current user when a bearer token is sent, else None. Used by public
+    endpoints that scope their rows for signed-in principals. An invalid or
+    expired token is rejected with 401, not treated as anonymous (which
+    would lift the sender's scope).
+    """
+    if not token:
+        return None
+    return await get_current_user(token)
+
+
 def require_role(*roles: str):
     """
     Dependency factory: require that current_user['role'] is in roles.
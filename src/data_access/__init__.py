@@ -1,5 +1,6 @@
 """
-Data access helpers: CSV loaders and validation functions.
+Data access helpers: CSV loaders, per-table validators and the
+cross-table integrity checks.
 """
 
 from .loaders import load_csvs
@@ -7,11 +8,17 @@ from .validators import (
     validate_students,
     validate_courses,
     validate_enrollments,
+    validate_prerequisites,
 )
+from .integrity import ValidationIssue, ValidationReport, validate_dataset
 
 __all__ = [
     "load_csvs",
     "validate_students",
     "validate_courses",
     "validate_enrollments",
+    "validate_prerequisites",
+    "ValidationIssue",
+    "ValidationReport",
+    "validate_dataset",
 ]
\ No newline at end of file
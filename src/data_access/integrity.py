@@ -0,0 +1,275 @@
+"""
+Cross-table referential and domain validation for a full set of tables.
+
+Every check is vectorized: each key column is factorized once into integer
+codes plus its distinct values, so foreign-key lookups, enum and format
+checks only touch the distinct values (a hash join), and duplicate
+detection runs over packed int64 keys instead of string tuples.
+"""
+
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STATUSES = ("completed", "in_progress", "withdrawn")
+DEFAULT_TERM_PATTERN = r"\d{4}-(Spring|Summer|Fall|Winter)"
+
+
+@dataclass
+class ValidationIssue:
+    """
+    One failed check. `rows` holds up to `max_rows` 0-based row positions
+    (excluding the CSV header) and `values` a matching sample of offending
+    values; `count` is the total number of offending rows.
+    """
+    table: str
+    check: str
+    columns: List[str]
+    message: str
+    count: int
+    severity: str = "error"
+    rows: List[int] = field(default_factory=list)
+    values: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class ValidationReport:
+    issues: List[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[ValidationIssue]:
+        return [i for i in self.issues if i.severity == "error"]
+
+    @property
+    def warnings(self) -> List[ValidationIssue]:
+        return [i for i in self.issues if i.severity == "warning"]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        if not self.issues:
+            return "All checks passed"
+        return "; ".join(
+            f"{i.table}: {i.message} ({i.count} row(s))" for i in self.issues
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "error_count": len(self.errors),
+            "warning_count": len(self.warnings),
+            "issues": [asdict(i) for i in self.issues],
+        }
+
+
+class _Column:
+    """A column factorized once: integer codes (-1 for NaN) and distinct values."""
+
+    def __init__(self, series: pd.Series):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        self.codes = codes
+        self.uniques = pd.Index(uniques)
+        self.series = series
+
+    def mask_for_bad_uniques(self, bad: np.ndarray) -> np.ndarray:
+        """Row mask for rows whose value is one of the flagged distinct values."""
+        if not bad.any():
+            return np.zeros(len(self.codes), dtype=bool)
+        lookup = np.append(bad, False)  # code -1 (NaN) maps to the last slot
+        return lookup[self.codes]
+
+
+class _Validator:
+    def __init__(
+        self,
+        tables: Mapping[str, pd.DataFrame],
+        max_rows: int,
+        statuses: Iterable[str],
+        term_pattern: Optional[str],
+    ):
+        self.tables = tables
+        self.max_rows = max_rows
+        self.statuses = pd.Index(list(statuses))
+        self.term_re = re.compile(term_pattern) if term_pattern else None
+        self.report = ValidationReport()
+        self._columns: Dict[Tuple[str, str], _Column] = {}
+
+    def column(self, table: str, name: str) -> _Column:
+        key = (table, name)
+        if key not in self._columns:
+            self._columns[key] = _Column(self.tables[table][name])
+        return self._columns[key]
+
+    def add(
+        self,
+        table: str,
+        check: str,
+        columns: List[str],
+        message: str,
+        mask: np.ndarray,
+        severity: str = "error",
+    ) -> None:
+        count = int(mask.sum())
+        if not count:
+            return
+        rows = np.flatnonzero(mask)[: self.max_rows]
+        sample = self.tables[table][columns].iloc[rows].astype(object)
+        sample = sample.where(sample.notna(), None)  # NaN is not valid JSON
+        if len(columns) == 1:
+            values = sample[columns[0]].tolist()
+        else:
+            values = sample.to_dict(orient="records")
+        self.report.issues.append(
+            ValidationIssue(
+                table=table,
+                check=check,
+                columns=columns,
+                message=message,
+                count=count,
+                severity=severity,
+                rows=rows.tolist(),
+                values=values,
+            )
+        )
+
+    # ---------- Checks ----------
+
+    def foreign_key(self, table: str, column: str, ref_table: str, ref_column: str) -> None:
+        col = self.column(table, column)
+        known = self.tables[ref_table][ref_column]
+        bad = ~col.uniques.isin(known)
+        self.add(
+            table,
+            "foreign_key",
+            [column],
+            f"{column} not found in {ref_table}.{ref_column}",
+            col.mask_for_bad_uniques(np.asarray(bad)),
+        )
+
+    def unique(self, table: str, columns: List[str], severity: str = "error") -> None:
+        cols = [self.column(table, name) for name in columns]
+        radix = [len(c.uniques) + 1 for c in cols]
+        if np.prod(radix, dtype=float) < 2**62:
+            # Pack the per-column codes into one int64 key per row.
+            key = np.zeros(len(self.tables[table]), dtype=np.int64)
+            for col, base in zip(cols, radix):
+                key = key * base + (col.codes + 1)
+            mask = pd.Series(key).duplicated(keep="first").to_numpy()
+        else:
+            mask = self.tables[table].duplicated(subset=columns).to_numpy()
+        self.add(
+            table,
+            "duplicate",
+            columns,
+            f"duplicate ({', '.join(columns)})",
+            mask,
+            severity=severity,
+        )
+
+    def enum(self, table: str, column: str, allowed: pd.Index) -> None:
+        col = self.column(table, column)
+        bad = ~col.uniques.isin(allowed)
+        self.add(
+            table,
+            "enum",
+            [column],
+            f"{column} not one of {list(allowed)}",
+            col.mask_for_bad_uniques(np.asarray(bad)),
+        )
+
+    def pattern(self, table: str, column: str) -> None:
+        col = self.column(table, column)
+        bad = np.array(
+            [not self.term_re.fullmatch(str(v)) for v in col.uniques], dtype=bool
+        )
+        self.add(
+            table,
+            "format",
+            [column],
+            f"{column} does not match {self.term_re.pattern!r}",
+            col.mask_for_bad_uniques(bad),
+        )
+
+    def not_null(self, table: str, column: str) -> None:
+        self.add(
+            table,
+            "not_null",
+            [column],
+            f"missing {column}",
+            (self.column(table, column).codes < 0),
+        )
+
+    def run(self) -> ValidationReport:
+        t = self.tables
+        if "students" in t:
+            self.not_null("students", "student_id")
+            self.unique("students", ["student_id"])
+        if "courses" in t:
+            self.not_null("courses", "course_id")
+            self.unique("courses", ["course_id"])
+            credits = pd.to_numeric(t["courses"]["credits"], errors="coerce")
+            self.add(
+                "courses", "range", ["credits"], "negative credits",
+                (credits < 0).to_numpy(),
+            )
+            if "pass_threshold" in t["courses"].columns:
+                threshold = pd.to_numeric(t["courses"]["pass_threshold"], errors="coerce")
+                self.add(
+                    "courses", "range", ["pass_threshold"], "pass_threshold outside 0-100",
+                    ((threshold < 0) | (threshold > 100)).to_numpy(),
+                )
+        if "enrollments" in t:
+            self.not_null("enrollments", "student_id")
+            self.not_null("enrollments", "course_id")
+            if "students" in t:
+                self.foreign_key("enrollments", "student_id", "students", "student_id")
+            if "courses" in t:
+                self.foreign_key("enrollments", "course_id", "courses", "course_id")
+            self.unique("enrollments", ["student_id", "course_id", "term"])
+            self.enum("enrollments", "status", self.statuses)
+            if self.term_re is not None:
+                self.pattern("enrollments", "term")
+        if "prerequisites" in t:
+            self.not_null("prerequisites", "course_id")
+            self.not_null("prerequisites", "prereq_id")
+        if "prerequisites" in t and "courses" in t:
+            self.foreign_key("prerequisites", "course_id", "courses", "course_id")
+            self.foreign_key("prerequisites", "prereq_id", "courses", "course_id")
+            pr = t["prerequisites"]
+            self.add(
+                "prerequisites", "self_reference", ["course_id", "prereq_id"],
+                "course lists itself as a prerequisite",
+                (pr["course_id"] == pr["prereq_id"]).to_numpy(),
+            )
+            self.unique("prerequisites", ["course_id", "prereq_id"], severity="warning")
+        return self.report
+
+
+def validate_dataset(
+    tables: Mapping[str, pd.DataFrame],
+    max_rows: int = 20,
+    statuses: Iterable[str] = DEFAULT_STATUSES,
+    term_pattern: Optional[str] = DEFAULT_TERM_PATTERN,
+) -> ValidationReport:
+    """
+    Run all referential and domain checks over whichever of students,
+    courses, enrollments and prerequisites are present in `tables`
+    (columns are assumed to exist; see validators.py for that).
+
+    - foreign keys: enrollments.student_id/course_id, prerequisites.course_id/prereq_id
+      (a missing key is reported as not_null)
+    - duplicates: student_id, course_id, (student_id, course_id, term);
+      duplicate prerequisite edges are a warning
+    - domain: enrollment status in `statuses`, term matches `term_pattern`
+      (set to None to skip), non-negative credits, pass_threshold within
+      0-100 (when the column exists), no self-prerequisites
+
+    Each issue lists at most `max_rows` offending rows, so the report stays
+    small regardless of input size.
+    """
+    return _Validator(tables, max_rows, statuses, term_pattern).run()
@@ -1,15 +1,69 @@
+import json
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 import pandas as pd
 
+from ..utils.logging import get_logger
 
-def load_csvs(base_dir: Path) -> Dict[str, pd.DataFrame]:
-    students = pd.read_csv(base_dir / "students.csv")
-    courses = pd.read_csv(base_dir / "courses.csv")
-    enrollments = pd.read_csv(base_dir / "enrollments.csv")
+logger = get_logger(__name__)
+
+
+def _cache_format() -> str:
+    """Feather (columnar, memory-mappable) when pyarrow is installed, else pickle."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "pickle"
+    return "feather"
+
+
+def _read_cached_csv(csv_path: Path, cache_dir: Optional[Path]) -> pd.DataFrame:
+    """
+    Read `csv_path`, going through a binary cache in `cache_dir` when given.
+    The cache entry is reused only while the CSV's size and mtime match.
+    """
+    if cache_dir is None:
+        return pd.read_csv(csv_path)
+
+    fmt = _cache_format()
+    stat = csv_path.stat()
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "format": fmt}
+    data_path = cache_dir / f"{csv_path.stem}.{fmt}"
+    meta_path = cache_dir / f"{csv_path.stem}.json"
+
+    try:
+        if json.loads(meta_path.read_text(encoding="utf-8")) == source:
+            if fmt == "feather":
+                return pd.read_feather(data_path)
+            return pd.read_pickle(data_path)
+    except (OSError, ValueError):
+        pass  # missing or stale cache entry: fall back to the CSV
+    except Exception:
+        logger.warning("Ignoring unreadable cache entry %s", data_path)
+
+    df = pd.read_csv(csv_path)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_suffix(data_path.suffix + ".tmp")
+        if fmt == "feather":
+            df.to_feather(tmp)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, data_path)
+        meta_path.write_text(json.dumps(source), encoding="utf-8")
+    except Exception as exc:
+        logger.warning("Could not write cache for %s: %s", csv_path.name, exc)
+    return df
+
+
+def load_csvs(base_dir: Path, cache_dir: Optional[Path] = None) -> Dict[str, pd.DataFrame]:
+    students = _read_cached_csv(base_dir / "students.csv", cache_dir)
+    courses = _read_cached_csv(base_dir / "courses.csv", cache_dir)
+    enrollments = _read_cached_csv(base_dir / "enrollments.csv", cache_dir)
     prereq_path = base_dir / "prerequisites.csv"
     if prereq_path.exists():
-        prereqs = pd.read_csv(prereq_path)
+        prereqs = _read_cached_csv(prereq_path, cache_dir)
     else:
         prereqs = pd.DataFrame(columns=["course_id", "prereq_id"])
     return {
@@ -17,4 +71,4 @@ def load_csvs(base_dir: Path) -> Dict[str, pd.DataFrame]:
         "courses": courses,
         "enrollments": enrollments,
         "prerequisites": prereqs,
-    }
\ No newline at end of file
+    }
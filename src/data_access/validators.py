@@ -19,7 +19,12 @@ def validate_courses(df: pd.DataFrame) -> None:
         raise ValueError("Negative credits in courses.csv")
 
 
-def validate_enrollments(df: pd.DataFrame) -> None:
+def validate_enrollments(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Check required columns and return a normalized copy: grade and
+    attendance_pct coerced to numbers clipped to 0–100, missing status
+    filled with "completed". The input DataFrame is left untouched.
+    """
     required = {
         "student_id",
         "course_id",
@@ -31,8 +36,17 @@ def validate_enrollments(df: pd.DataFrame) -> None:
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"enrollments.csv missing columns: {missing}")
+    df = df.copy()
     df["grade"] = pd.to_numeric(df["grade"], errors="coerce").clip(0, 100)
     df["attendance_pct"] = (
         pd.to_numeric(df["attendance_pct"], errors="coerce").clip(0, 100)
     )
-    df["status"] = df["status"].fillna("completed")
\ No newline at end of file
+    df["status"] = df["status"].fillna("completed")
+    return df
+
+
+def validate_prerequisites(df: pd.DataFrame) -> None:
+    required = {"course_id", "prereq_id"}
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"prerequisites.csv missing required columns: {missing}")
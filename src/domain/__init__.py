@@ -7,6 +7,7 @@ from .course import Course
 from .enrollment import Enrollment
 from .grade_scale import GradeScale, GradeBand, default_scale
 from .gradebook import Gradebook
+from .pass_thresholds import PassThresholds
 
 __all__ = [
     "Student",
@@ -16,4 +17,5 @@ __all__ = [
     "GradeBand",
     "default_scale",
     "Gradebook",
+    "PassThresholds",
 ]
\ No newline at end of file
@@ -11,4 +11,6 @@ class Course:
     title: str
     credits: int
     department: Optional[str] = None
-    level: Optional[int] = None
\ No newline at end of file
+    level: Optional[int] = None
+    # Passing grade for this course; None uses the department/default threshold
+    pass_threshold: Optional[float] = None
\ No newline at end of file
@@ -1,6 +1,8 @@
 import pandas as pd
 from typing import Optional
 from .grade_scale import GradeScale
+from ..utils.metrics import cache_lookup
+from ..utils.perf import timed
 
 
 class Gradebook:
@@ -20,6 +22,7 @@ class Gradebook:
         self.courses = courses.copy()
         self.scale = scale
         self.repeat_policy = repeat_policy
+        self._gpa_table: Optional[pd.DataFrame] = None
 
     def _apply_repeat_policy(self, df: pd.DataFrame) -> pd.DataFrame:
         # For repeated courses, either keep latest attempt or highest grade.
@@ -50,11 +53,18 @@ class Gradebook:
         merged["quality_points"] = merged["points"] * merged["credits"]
         return merged
 
+    @timed()
     def compute_gpa_table(self) -> pd.DataFrame:
         """
         Returns DataFrame with columns:
         student_id, total_credits, quality_points, gpa
+
+        The result is computed once per Gradebook and shared by callers,
+        so treat it as read-only.
         """
+        cache_lookup("gradebook", self._gpa_table is not None)
+        if self._gpa_table is not None:
+            return self._gpa_table
         merged = self._merged()
         grouped = merged.groupby("student_id").agg(
             total_credits=("credits", "sum"),
@@ -63,8 +73,10 @@ class Gradebook:
         grouped["gpa"] = (grouped["quality_points"] / grouped["total_credits"]).round(
             2
         )
-        return grouped.reset_index()
+        self._gpa_table = grouped.reset_index()
+        return self._gpa_table
 
+    @timed()
     def student_gpa(self, student_id: str) -> Optional[float]:
         tbl = self.compute_gpa_table()
         row = tbl[tbl["student_id"] == student_id]
@@ -72,6 +84,7 @@ class Gradebook:
             return None
         return float(row["gpa"].iloc[0])
 
+    @timed()
     def term_gpa(self, student_id: str, term: str) -> Optional[float]:
         df = self.enrollments.copy()
         df = df[
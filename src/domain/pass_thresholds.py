@@ -0,0 +1,90 @@
+from typing import Any, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class PassThresholds:
+    """
+    Passing grade per course. A completed enrollment with a grade below its
+    course's threshold is a D/F/W outcome; at or above it, a pass.
+
+    Most specific first:
+    - the course's own `pass_threshold` column in courses.csv (optional)
+    - the department's entry in `department_thresholds`
+    - `default` (risk.dfw_grade_threshold)
+
+    Course thresholds are resolved once per courses table. `for_enrollments`
+    joins them onto an enrollments table as one vector (one get_indexer and
+    take), cached per table, so callers compare grades against it in a
+    single vectorized operation.
+    """
+
+    COLUMN = "pass_threshold"
+
+    def __init__(
+        self,
+        courses: Optional[pd.DataFrame],
+        default: float = 60.0,
+        department_thresholds: Optional[Mapping[str, float]] = None,
+    ):
+        self.default = float(default)
+        if courses is None or "course_id" not in courses.columns:
+            courses = pd.DataFrame({"course_id": []})
+        courses = courses.drop_duplicates("course_id")
+        if self.COLUMN in courses.columns:
+            own = pd.to_numeric(courses[self.COLUMN], errors="coerce")
+        else:
+            own = pd.Series(np.nan, index=courses.index)
+        if department_thresholds and "department" in courses.columns:
+            by_dept = {k: float(v) for k, v in department_thresholds.items()}
+            own = own.fillna(courses["department"].map(by_dept))
+        self.course_ids = pd.Index(courses["course_id"])
+        # NaN where the course has no threshold of its own
+        self._specific = own.to_numpy(dtype=float)
+        self._joined: Optional[tuple] = None
+
+    @classmethod
+    def from_config(
+        cls, courses: Optional[pd.DataFrame], cfg: Mapping[str, Any]
+    ) -> "PassThresholds":
+        """Build from the `risk` section of settings.yaml."""
+        return cls(
+            courses,
+            default=float(cfg.get("dfw_grade_threshold", 60.0)),
+            department_thresholds=cfg.get("department_pass_thresholds") or {},
+        )
+
+    def for_courses(self, course_ids: Any) -> np.ndarray:
+        """Passing grade of each course id (the default for unknown courses)."""
+        pos = self.course_ids.get_indexer(pd.Index(course_ids))
+        return self._resolve(self._gather(pos), self.default)
+
+    def for_enrollments(
+        self, enrollments: pd.DataFrame, default: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Passing grade of each enrollment row. `default` replaces the
+        configured default for courses without a threshold of their own
+        (used by what-if simulations).
+        """
+        joined = self._joined
+        if joined is None or joined[0] is not enrollments:
+            specific = self._gather(self.course_ids.get_indexer(enrollments["course_id"]))
+            # The table itself is kept so its identity cannot be reused meanwhile
+            joined = self._joined = (
+                enrollments, specific, self._resolve(specific, self.default)
+            )
+        if default is None or float(default) == self.default:
+            return joined[2]
+        return self._resolve(joined[1], float(default))
+
+    def _gather(self, pos: np.ndarray) -> np.ndarray:
+        out = np.full(len(pos), np.nan)
+        found = pos >= 0
+        out[found] = self._specific[pos[found]]
+        return out
+
+    @staticmethod
+    def _resolve(specific: np.ndarray, default: float) -> np.ndarray:
+        return np.where(np.isnan(specific), default, specific)
\ No newline at end of file
@@ -3,5 +3,6 @@ Graph-related data structures and algorithms (prerequisite graph).
 """
 
 from .prereq_graph import PrereqGraph
+from .closure import TransitiveClosure
 
-__all__ = ["PrereqGraph"]
\ No newline at end of file
+__all__ = ["PrereqGraph", "TransitiveClosure"]
\ No newline at end of file
@@ -0,0 +1,83 @@
+from typing import List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .closure import TransitiveClosure
+
+
+class CurriculumStats:
+    """
+    Per-course curriculum metrics for a prerequisite graph, as arrays over
+    the graph's node ids:
+
+    - depth: longest prerequisite chain (0 if none, -1 on/behind a cycle)
+    - parent: the prerequisite preceding the course on its critical path
+      (a longest chain), -1 if none
+    - prereq_credits: credits of all direct and indirect prerequisites
+    - downstream: number of courses that transitively require the course
+
+    Depths come from the graph's level-by-level topological pass, so a
+    critical-path parent is any prerequisite exactly one level lower; the
+    parents of all courses are picked in one vectorized step. Credit sums
+    and downstream counts are reductions over the closure's CSR rows.
+    """
+
+    def __init__(self, closure: TransitiveClosure, credits: Mapping[str, float]):
+        graph = closure.graph
+        self.ids = closure.ids
+        self.index = closure._index
+        n = len(self.ids)
+
+        topo = graph.topological()
+        self.depth = np.fromiter(
+            (topo.depths[c] for c in self.ids), dtype=np.int64, count=n
+        )
+
+        # Critical-path parent: first prerequisite one level below the course
+        src = np.repeat(np.arange(n), np.diff(graph.fwd_ptr))
+        dst = graph.fwd_idx
+        on_path = (self.depth[src] > 0) & (self.depth[dst] == self.depth[src] - 1)
+        self.parent = np.full(n, -1, dtype=np.int64)
+        heads, first = np.unique(src[on_path], return_index=True)
+        self.parent[heads] = dst[on_path][first]
+
+        self.credits = np.fromiter(
+            (float(credits.get(c) or 0.0) for c in self.ids), dtype=float, count=n
+        )
+        owners = np.repeat(np.arange(n), np.diff(closure.anc_ptr))
+        self.prereq_credits = np.bincount(
+            owners, weights=self.credits[closure.anc_idx], minlength=n
+        )
+        self.downstream = np.diff(closure.desc_ptr)
+
+    def min_terms(self, credit_cap: float) -> np.ndarray:
+        """
+        Lower bound on terms needed to complete each course with at most
+        `credit_cap` credits per term: one term per chain level, and enough
+        terms to fit the course plus all its prerequisites. -1 on cycles.
+        """
+        by_chain = self.depth + 1
+        by_load = np.ceil((self.credits + self.prereq_credits) / credit_cap)
+        return np.where(self.depth < 0, -1, np.maximum(by_chain, by_load)).astype(np.int64)
+
+    def critical_path(self, course_id: str) -> Optional[List[str]]:
+        """Longest prerequisite chain ending at `course_id`, first course first."""
+        i = self.index.get(course_id)
+        if i is None:
+            return None
+        path = []
+        while i >= 0:
+            path.append(self.ids[i])
+            i = int(self.parent[i])
+        return path[::-1]
+
+    def to_frame(self, credit_cap: float) -> pd.DataFrame:
+        return pd.DataFrame({
+            "course_id": self.ids,
+            "depth": self.depth,
+            "credits": self.credits,
+            "prereq_credits": self.prereq_credits,
+            "min_terms": self.min_terms(credit_cap),
+            "downstream": self.downstream,
+        })
\ No newline at end of file
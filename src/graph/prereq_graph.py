@@ -1,58 +1,469 @@
-from typing import Dict, List, Set
+import heapq
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utils.exceptions import PrerequisiteCycleError
+
+
+@dataclass(frozen=True)
+class TopoResult:
+    """
+    Result of one topological pass over a PrereqGraph.
+
+    - order: courses in prerequisite-first order (acyclic part only)
+    - depths: longest prerequisite chain per course (0 if none); courses on
+      a cycle, or depending on one, have no defined depth and get -1
+    - dependents: number of prerequisite edges pointing at each course
+    - cyclic: courses that could not be ordered (on or behind a cycle)
+    """
+    order: List[str]
+    depths: Dict[str, int]
+    dependents: Dict[str, int]
+    cyclic: Set[str] = field(default_factory=set)
+
+    @property
+    def has_cycle(self) -> bool:
+        return bool(self.cyclic)
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, n: int):
+    """Compressed sparse rows: (indptr[n+1], indices) grouping `cols` by `rows`."""
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32, copy=False)
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenate the CSR rows of `nodes` without a Python loop."""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return indices[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(total)]
+
+
+class _AdjacencyView(Mapping):
+    """Read-only `course_id -> [prereq_id, ...]` view over the CSR arrays."""
+
+    def __init__(self, graph: "PrereqGraph"):
+        self._graph = graph
+
+    def __getitem__(self, course_id: str) -> List[str]:
+        g = self._graph
+        ids = g.ids
+        return [ids[j] for j in g._prereqs(g.index[course_id])]
+
+    def __contains__(self, course_id: object) -> bool:
+        return course_id in self._graph.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._graph.ids)
+
+    def __len__(self) -> int:
+        return len(self._graph.ids)
 
 
 class PrereqGraph:
     """
     Directed graph where edges go: course -> prerequisite.
     Provides cycle detection and depth computation.
+
+    Course ids are interned to dense int32 node ids (`ids` / `index`) and
+    edges are stored as forward (course -> prereqs) and reverse
+    (prereq -> dependents) CSR arrays, so neighbour lookups in either
+    direction are O(degree). `adj` and `nodes` remain available as views.
+
+    Edges can also be edited one at a time: inserts are kept in a small
+    overlay and deletes as tombstones next to the CSR arrays, which are
+    only rebuilt when a whole-graph algorithm needs them. Once a
+    topological pass has run on an acyclic graph, depths and dependents
+    counts are maintained in place by `insert_edge` / `remove_edge`,
+    touching only the affected dependents; `insert_edge` rejects edges
+    that would close a cycle.
     """
 
     def __init__(self):
-        self.adj: Dict[str, List[str]] = {}
-        self.nodes: Set[str] = set()
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._src = np.zeros(0, dtype=np.int32)
+        self._dst = np.zeros(0, dtype=np.int32)
+        self._csr_stale = False
+        self.fwd_ptr = np.zeros(1, dtype=np.int64)
+        self.fwd_idx = np.zeros(0, dtype=np.int32)
+        self.rev_ptr = np.zeros(1, dtype=np.int64)
+        self.rev_idx = np.zeros(0, dtype=np.int32)
+        # Edits since the CSR arrays were last rebuilt
+        self._pending: List[Tuple[int, int]] = []
+        self._fwd_extra: Dict[int, List[int]] = {}
+        self._rev_extra: Dict[int, List[int]] = {}
+        self._removed: Set[Tuple[int, int]] = set()
+        # Incrementally maintained results of the last topological pass:
+        # depths only while the graph is acyclic, dependents counts always
+        self._depth: Optional[np.ndarray] = None
+        self._ndep: Optional[np.ndarray] = None
+        self._topo: Optional[TopoResult] = None
+        # Last full pass on a cyclic graph
+        self._kahn_depths: Optional[np.ndarray] = None
+        self._kahn_cyclic: Set[str] = set()
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        course_col: str = "course_id",
+        prereq_col: str = "prereq_id",
+    ) -> "PrereqGraph":
+        """Build the graph from an edge DataFrame in one vectorized step."""
+        graph = cls()
+        edges = df[[course_col, prereq_col]].dropna()
+        if edges.empty:
+            return graph
+        # Interleave (course, prereq) per row so node ids follow first
+        # appearance, exactly as repeated add_edge() calls would.
+        pairs = edges.astype(str).to_numpy().ravel()
+        codes, uniques = pd.factorize(pairs)
+        graph.ids = [str(u) for u in uniques]
+        graph.index = {cid: i for i, cid in enumerate(graph.ids)}
+        codes = codes.astype(np.int32).reshape(-1, 2)
+        graph._src = codes[:, 0].copy()
+        graph._dst = codes[:, 1].copy()
+        graph._csr_stale = True
+        return graph
+
+    def copy(self) -> "PrereqGraph":
+        """
+        Independent copy for editing. Edge and CSR arrays are never modified
+        in place, so they are shared; only ids and pending edits are copied.
+        """
+        g = PrereqGraph.__new__(PrereqGraph)
+        g.__dict__.update(self.__dict__)
+        g.ids = list(self.ids)
+        g.index = dict(self.index)
+        g._pending = list(self._pending)
+        g._fwd_extra = {k: list(v) for k, v in self._fwd_extra.items()}
+        g._rev_extra = {k: list(v) for k, v in self._rev_extra.items()}
+        g._removed = set(self._removed)
+        g._depth = None if self._depth is None else self._depth.copy()
+        g._ndep = None if self._ndep is None else self._ndep.copy()
+        return g
+
+    # ---------- Construction ----------
+
+    def _intern(self, course_id: str) -> int:
+        i = self.index.get(course_id)
+        if i is None:
+            i = len(self.ids)
+            self.ids.append(course_id)
+            self.index[course_id] = i
+            self._topo = None
+            if self._depth is not None:
+                self._depth = np.append(self._depth, 0)
+            if self._ndep is not None:
+                self._ndep = np.append(self._ndep, 0)
+        return i
 
     def add_course(self, course_id: str) -> None:
-        self.nodes.add(course_id)
-        self.adj.setdefault(course_id, [])
+        self._intern(course_id)
 
     def add_edge(self, course_id: str, prereq_id: str) -> None:
-        self.add_course(course_id)
-        self.add_course(prereq_id)
-        self.adj[course_id].append(prereq_id)
+        """Add an edge without cycle rejection (a cycle is reported by has_cycle)."""
+        i, j = self._intern(course_id), self._intern(prereq_id)
+        if self._depth is not None and self._reaches(j, i):
+            self._depth = None  # graph becomes cyclic: depths need a full pass
+        self._insert(i, j)
+
+    def _ensure_built(self) -> None:
+        """Fold pending edits into the edge arrays and rebuild the CSR."""
+        # Courses added without an edge leave the CSR arrays too short
+        grown = len(self.fwd_ptr) != len(self.ids) + 1
+        if not (self._csr_stale or self._pending or self._removed or grown):
+            return
+        src, dst = self._src, self._dst
+        if self._removed:
+            n = len(self.ids)
+            key = src.astype(np.int64) * n + dst
+            gone = np.fromiter(
+                (i * n + j for i, j in self._removed), dtype=np.int64,
+                count=len(self._removed),
+            )
+            keep = ~np.isin(key, gone)
+            src, dst = src[keep], dst[keep]
+        if self._pending:
+            extra = np.asarray(self._pending, dtype=np.int32).reshape(-1, 2)
+            src = np.concatenate([src, extra[:, 0]])
+            dst = np.concatenate([dst, extra[:, 1]])
+        self._src, self._dst = src, dst
+        self._pending, self._fwd_extra, self._rev_extra = [], {}, {}
+        self._removed = set()
+        n = len(self.ids)
+        self.fwd_ptr, self.fwd_idx = _csr(self._src, self._dst, n)
+        self.rev_ptr, self.rev_idx = _csr(self._dst, self._src, n)
+        self._csr_stale = False
+
+    # ---------- Neighbours (CSR plus pending edits) ----------
+
+    def _row(self, ptr, idx, extra, i: int, reverse: bool) -> List[int]:
+        out = idx[ptr[i]:ptr[i + 1]].tolist() if i + 1 < len(ptr) else []
+        if self._removed:
+            out = [
+                k for k in out
+                if ((k, i) if reverse else (i, k)) not in self._removed
+            ]
+        return out + extra.get(i, [])
+
+    def _prereqs(self, i: int) -> List[int]:
+        if self._csr_stale:
+            self._ensure_built()
+        return self._row(self.fwd_ptr, self.fwd_idx, self._fwd_extra, i, False)
+
+    def _dependents(self, i: int) -> List[int]:
+        if self._csr_stale:
+            self._ensure_built()
+        return self._row(self.rev_ptr, self.rev_idx, self._rev_extra, i, True)
+
+    # ---------- Views ----------
+
+    @property
+    def adj(self) -> _AdjacencyView:
+        return _AdjacencyView(self)
+
+    @property
+    def nodes(self):
+        return self.adj.keys()
+
+    @property
+    def edge_count(self) -> int:
+        if self._removed:
+            self._ensure_built()
+        return len(self._src) + len(self._pending)
 
     def get_prereqs(self, course_id: str) -> List[str]:
-        return self.adj.get(course_id, [])
+        if course_id not in self.index:
+            return []
+        return self.adj[course_id]
 
-    def has_cycle(self) -> bool:
-        visited, stack = set(), set()
-
-        def dfs(u: str) -> bool:
-            visited.add(u)
-            stack.add(u)
-            for v in self.adj.get(u, []):
-                if v not in visited and dfs(v):
-                    return True
-                if v in stack:
-                    return True
-            stack.remove(u)
-            return False
+    def get_dependents(self, course_id: str) -> List[str]:
+        """Courses that list `course_id` as a direct prerequisite, in O(degree)."""
+        i = self.index.get(course_id)
+        if i is None:
+            return []
+        ids = self.ids
+        return [ids[j] for j in self._dependents(i)]
 
-        return any(dfs(node) for node in self.nodes if node not in visited)
+    def has_edge(self, course_id: str, prereq_id: str) -> bool:
+        i, j = self.index.get(course_id), self.index.get(prereq_id)
+        return i is not None and j is not None and j in self._prereqs(i)
 
-    def depth(self, course_id: str) -> int:
+    # ---------- Incremental edits ----------
+
+    def find_path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        A prerequisite chain from `source` down to `target` (both included),
+        or None. With maintained depths, only courses deeper than `target`
+        are explored, since no other course can require it.
+        """
+        i, j = self.index.get(source), self.index.get(target)
+        if i is None or j is None:
+            return [source] if source == target else None
+        parent = self._search(i, j)
+        if parent is None:
+            return None
+        path, k = [], j
+        while k != -1:
+            path.append(self.ids[k])
+            k = parent[k]
+        return path[::-1]
+
+    def _reaches(self, i: int, j: int) -> bool:
+        return self._search(i, j) is not None
+
+    def _search(self, i: int, j: int) -> Optional[Dict[int, int]]:
+        """BFS from i along prerequisite edges; parent links if j is reached."""
+        depth = self._depth
+        if i != j and depth is not None and depth[i] <= depth[j]:
+            return None
+        parent = {i: -1}
+        frontier = [i]
+        while frontier:
+            nxt = []
+            for u in frontier:
+                if u == j:
+                    return parent
+                for k in self._prereqs(u):
+                    if k in parent:
+                        continue
+                    if depth is not None and k != j and depth[k] <= depth[j]:
+                        continue
+                    parent[k] = u
+                    nxt.append(k)
+            frontier = nxt
+        return None
+
+    def insert_edge(self, course_id: str, prereq_id: str) -> Dict[str, int]:
+        """
+        Add `prereq_id` as a prerequisite of `course_id`.
+
+        Raises PrerequisiteCycleError (with the cycle as a course path) if
+        `prereq_id` already requires `course_id`, directly or indirectly.
+        Returns {course_id: new depth} for every course whose depth changed
+        (empty while depths are not being maintained).
+        """
+        path = self.find_path(prereq_id, course_id)
+        if path is not None:
+            raise PrerequisiteCycleError(course_id, prereq_id, [course_id] + path)
+        return self._insert(self._intern(course_id), self._intern(prereq_id))
+
+    def _insert(self, i: int, j: int) -> Dict[str, int]:
+        self._pending.append((i, j))
+        self._fwd_extra.setdefault(i, []).append(j)
+        self._rev_extra.setdefault(j, []).append(i)
+        self._topo = None
+        if self._ndep is not None:
+            self._ndep[j] += 1
+        if self._depth is None or self._depth[i] > self._depth[j]:
+            return {}
+        return self._propagate([i])
+
+    def remove_edge(self, course_id: str, prereq_id: str) -> Dict[str, int]:
+        """
+        Remove every `course_id -> prereq_id` edge. Raises KeyError if there
+        is none. Returns {course_id: new depth} for courses whose depth changed.
         """
-        Longest chain of prerequisites (0 if none).
+        i, j = self.index.get(course_id), self.index.get(prereq_id)
+        count = self._prereqs(i).count(j) if i is not None and j is not None else 0
+        if not count:
+            raise KeyError(f"{course_id} does not require {prereq_id}")
+        if j in self._fwd_extra.get(i, []):
+            self._fwd_extra[i] = [k for k in self._fwd_extra[i] if k != j]
+            self._rev_extra[j] = [k for k in self._rev_extra[j] if k != i]
+            self._pending = [e for e in self._pending if e != (i, j)]
+        self._removed.add((i, j))
+        self._topo = None
+        if self._ndep is not None:
+            self._ndep[j] -= count
+        if self._depth is None:
+            return {}  # cyclic: the next topological pass recomputes depths
+        return self._propagate([i])
+
+    def _propagate(self, seeds: List[int]) -> Dict[str, int]:
+        """
+        Re-derive depths from prerequisites, starting at `seeds` and moving
+        on to dependents only while a course's depth actually changes.
+        """
+        depth = self._depth
+        before: Dict[int, int] = {}
+        heap = [(int(depth[i]), i) for i in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            _, u = heapq.heappop(heap)
+            queued.discard(u)
+            pres = self._prereqs(u)
+            new = int(depth[pres].max()) + 1 if pres else 0
+            if new == depth[u]:
+                continue
+            before.setdefault(u, int(depth[u]))
+            depth[u] = new
+            for x in self._dependents(u):
+                if x not in queued:
+                    heapq.heappush(heap, (int(depth[x]), x))
+                    queued.add(x)
+        ids = self.ids
+        return {ids[u]: int(depth[u]) for u, d in before.items() if depth[u] != d}
+
+    # ---------- Algorithms ----------
+
+    def reach_mask(self, sources: np.ndarray, reverse: bool = False) -> np.ndarray:
+        """
+        Boolean mask over node ids of everything reachable from `sources`
+        (including them): prerequisites by default, dependents if `reverse`.
+        Frontier-at-a-time BFS over the CSR arrays.
+        """
+        self._ensure_built()
+        ptr, idx = (self.rev_ptr, self.rev_idx) if reverse else (self.fwd_ptr, self.fwd_idx)
+        seen = np.zeros(len(self.ids), dtype=bool)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        seen[frontier] = True
+        while frontier.size:
+            nxt = _gather(ptr, idx, frontier)
+            nxt = np.unique(nxt[~seen[nxt]])
+            seen[nxt] = True
+            frontier = nxt
+        return seen
+
+    def topological(self) -> TopoResult:
+        """
+        Kahn-style pass computing order, depths, dependents and cycle
+        membership together in O(V + E), without recursion. Nodes are
+        released level by level, so a node's level is exactly its longest
+        prerequisite chain. Cached until the graph changes; after edits to
+        an acyclic graph the result is rebuilt from the maintained depths.
         """
-        memo: Dict[str, int] = {}
+        if self._topo is not None:
+            return self._topo
+        if self._depth is None or self._ndep is None:
+            self._kahn()
+        depths, ndep = self._depth, self._ndep
+        cyclic: Set[str] = set()
+        if depths is None:
+            depths, cyclic = self._kahn_depths, self._kahn_cyclic
+        ids = self.ids
+        acyclic_nodes = np.flatnonzero(depths >= 0)
+        # Level order, ascending node id within a level (as Kahn releases them)
+        order = acyclic_nodes[np.argsort(depths[acyclic_nodes], kind="stable")]
+        self._topo = TopoResult(
+            order=[ids[i] for i in order.tolist()],
+            depths=dict(zip(ids, depths.tolist())),
+            dependents=dict(zip(ids, ndep.tolist())),
+            cyclic=cyclic,
+        )
+        return self._topo
 
-        def rec(c: str) -> int:
-            if c in memo:
-                return memo[c]
-            pres = self.adj.get(c, [])
-            if not pres:
-                memo[c] = 0
-            else:
-                memo[c] = 1 + max(rec(p) for p in pres)
-            return memo[c]
+    def _kahn(self) -> None:
+        self._ensure_built()
+        n = len(self.ids)
 
-        return rec(course_id)
\ No newline at end of file
+        remaining = np.diff(self.fwd_ptr)
+        depths = np.full(n, -1, dtype=np.int64)
+        frontier = np.flatnonzero(remaining == 0)
+        level = 0
+        while frontier.size:
+            depths[frontier] = level
+            unlocked = _gather(self.rev_ptr, self.rev_idx, frontier)
+            if not unlocked.size:
+                break
+            np.subtract.at(remaining, unlocked, 1)
+            ready = unlocked[remaining[unlocked] == 0]
+            # duplicate edges can list a released node more than once
+            frontier = np.unique(ready) if ready.size > 1 else ready
+            level += 1
+
+        self._ndep = np.diff(self.rev_ptr)
+        stuck = np.flatnonzero(remaining > 0)
+        if stuck.size:
+            self._depth = None
+            self._kahn_depths = depths
+            self._kahn_cyclic = {self.ids[i] for i in stuck.tolist()}
+        else:
+            self._depth = depths
+
+    def has_cycle(self) -> bool:
+        if self._depth is not None and self._ndep is not None:
+            return False
+        return self.topological().has_cycle
+
+    def depth(self, course_id: str) -> int:
+        """
+        Longest chain of prerequisites (0 if none, -1 if on/behind a cycle).
+        """
+        i = self.index.get(course_id)
+        if i is not None and self._depth is not None:
+            return int(self._depth[i])
+        return self.topological().depths.get(course_id, 0)
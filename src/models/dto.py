@@ -1,5 +1,5 @@
-from typing import List, Optional, Dict
-from pydantic import BaseModel
+from typing import Annotated, List, Optional, Dict
+from pydantic import BaseModel, Field
 
 
 class GPAEntry(BaseModel):
@@ -50,6 +50,34 @@ class RiskEntry(BaseModel):
     dfw_count: Optional[int] = None
 
 
+class RiskPolicy(BaseModel):
+    # Unset fields keep the configured value (settings.yaml `risk`)
+    gpa_threshold: Optional[float] = None
+    attendance_threshold: Optional[float] = None
+    dfw_grade_threshold: Optional[float] = None
+    gpa_weight: Optional[float] = Field(None, ge=0)
+    attendance_weight: Optional[float] = Field(None, ge=0)
+    dfw_weight: Optional[float] = Field(None, ge=0)
+
+
+class RiskSimulationRequest(BaseModel):
+    # Policy field -> values; every combination becomes a scenario
+    grid: Dict[str, Annotated[List[float], Field(max_length=100)]] = {}
+    # Explicit scenarios, after the grid ones (RiskService.MAX_SCENARIOS)
+    scenarios: List[RiskPolicy] = Field([], max_length=2000)
+    bins: int = Field(20, ge=1, le=200)         # score histogram bins
+    delta_limit: int = Field(50, ge=0, le=1000) # ids listed per delta
+
+
+class InProgressUpdate(BaseModel):
+    # Keyed by (student_id, course_id, term); unset fields keep their value
+    student_id: str
+    course_id: str
+    term: str
+    attendance_pct: Optional[float] = Field(None, ge=0, le=100)
+    grade: Optional[float] = Field(None, ge=0, le=100)  # provisional grade
+
+
 class GraphSummary(BaseModel):
     cycle_detected: bool
     # Map of course_id -> depth in prerequisite graph
@@ -61,4 +89,66 @@ class GraphSummary(BaseModel):
         title: Optional[str] = None
 
     # Top gateway candidates (course_id + number of dependents)
-    gateway_candidates: Optional[List[GatewayCandidate]] = None
\ No newline at end of file
+    gateway_candidates: Optional[List[GatewayCandidate]] = None
+
+
+class ClosureEntry(BaseModel):
+    course_id: str
+    distance: int                   # 1 = direct prerequisite
+    title: Optional[str] = None
+
+
+class PrereqClosure(BaseModel):
+    course_id: str
+    title: Optional[str] = None
+    # All direct and indirect prerequisites, nearest first
+    prerequisites: List[ClosureEntry]
+
+
+class UnlockClosure(BaseModel):
+    course_id: str
+    title: Optional[str] = None
+    # All courses that directly or indirectly require course_id, nearest first
+    unlocks: List[ClosureEntry]
+
+
+class GatewayImpact(BaseModel):
+    course_id: str
+    title: Optional[str] = None
+    department: Optional[str] = None
+    reach: int                      # courses that transitively require this one
+    enrollments: int                # completed enrollments
+    dfw_count: int
+    dfw_rate: Optional[float] = None
+    impact: int                     # reach * enrollments * dfw_rate
+
+
+class PrereqEdge(BaseModel):
+    course_id: str
+    prereq_id: str
+
+
+class CurriculumCourse(BaseModel):
+    course_id: str
+    title: Optional[str] = None
+    depth: int                      # longest prerequisite chain, -1 on a cycle
+    credits: float
+    prereq_credits: float           # credits of all direct + indirect prerequisites
+    min_terms: int                  # lower bound on terms to complete, -1 on a cycle
+    downstream: int                 # courses that transitively require this one
+    dfw_rate: Optional[float] = None
+    bottleneck_score: float         # dfw_rate * downstream
+
+
+class CurriculumSummary(BaseModel):
+    credit_cap: float
+    cycle_detected: bool
+    courses: List[CurriculumCourse]
+    # Highest bottleneck_score first
+    bottlenecks: List[CurriculumCourse]
+
+
+class CourseCriticalPath(CurriculumCourse):
+    credit_cap: float
+    # Longest prerequisite chain ending at the course, first course first
+    critical_path: List[str]
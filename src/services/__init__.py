@@ -5,13 +5,23 @@ Service layer for analytics, risk scoring, graph analysis, data loading, and dat
 from .analytics_service import AnalyticsService
 from .risk_service import RiskService
 from .graph_service import GraphService
+from .eligibility_service import EligibilityService
+from .scope_service import DataScope, ScopeService
+from .early_warning_service import EarlyWarningService
+from .dashboard_service import DashboardService
 from .loader_service import LoaderService
-from .data_service import DataService
+from .data_service import DataService, DataGeneration
 
 __all__ = [
     "AnalyticsService",
     "RiskService",
     "GraphService",
+    "EligibilityService",
+    "ScopeService",
+    "DataScope",
+    "EarlyWarningService",
+    "DashboardService",
     "LoaderService",
     "DataService",
+    "DataGeneration",
 ]
\ No newline at end of file
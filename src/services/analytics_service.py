@@ -1,12 +1,27 @@
+import numpy as np
 import pandas as pd
-from typing import Dict, Optional
-from scipy import stats
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence, Tuple
 from ..domain.gradebook import Gradebook
+from ..domain.pass_thresholds import PassThresholds
+from ..utils.config_loader import load_settings
+from ..utils.metrics import INFLIGHT, cache_lookup
+from ..utils.perf import timed
+from .ranking import RankedIndex
+
+if TYPE_CHECKING:
+    from .scope_service import DataScope
 
 
 class AnalyticsService:
     """
     Provides high-level analytics built on top of Gradebook and raw tables.
+
+    Unfiltered intermediate results are memoized per instance, so a service
+    built once per data version can be warmed up ahead of requests.
+    Returned DataFrames are shared and should be treated as read-only.
+
+    Pass and D/F/W outcomes compare each completed grade with its course's
+    passing grade (PassThresholds; configured from settings when not given).
     """
 
     def __init__(
@@ -15,66 +30,174 @@ class AnalyticsService:
         students: pd.DataFrame,
         courses: pd.DataFrame,
         enrollments: pd.DataFrame,
+        pass_thresholds: Optional[PassThresholds] = None,
     ):
         self.gradebook = gradebook
         self.students = students
         self.courses = courses
         self.enrollments = enrollments
+        self.pass_thresholds = pass_thresholds or PassThresholds.from_config(
+            courses, load_settings().get("risk", {})
+        )
+        self._cache: Dict[Any, Any] = {}
+
+    def _cached(self, key: Any, build: Callable[[], Any]) -> Any:
+        hit = key in self._cache
+        cache_lookup("analytics", hit)
+        if not hit:
+            with INFLIGHT.track(kind="analytics"):
+                self._cache[key] = build()
+        return self._cache[key]
+
+    def _outcomes(self) -> Dict[str, np.ndarray]:
+        """Per enrollment row: completed, passed and dfw masks."""
+        return self._cached("outcomes", self._compute_outcomes)
+
+    def _compute_outcomes(self) -> Dict[str, np.ndarray]:
+        enr = self.enrollments
+        grade = enr["grade"].to_numpy(dtype=float)
+        threshold = self.pass_thresholds.for_enrollments(enr)
+        return {
+            "completed": (enr["status"] == "completed").to_numpy(),
+            "passed": grade >= threshold,
+            "dfw": grade < threshold,
+        }
+
+    def _known_term(self, term: Optional[str]) -> bool:
+        """Whether per-term results for `term` may be cached (no term, or one in the data)."""
+        if not term:
+            return True
+        terms = self._cached("terms", lambda: frozenset(self.enrollments["term"].dropna().unique()))
+        return term in terms
 
+    def _completed_rows(
+        self, outcome: str | Sequence[str], term: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Completed enrollments (optionally of one term) with outcome column(s)."""
+        masks = self._outcomes()
+        mask = masks["completed"]
+        if term:
+            mask = mask & (self.enrollments["term"] == term).to_numpy()
+        outcomes = (outcome,) if isinstance(outcome, str) else outcome
+        return self.enrollments[mask].assign(**{o: masks[o][mask] for o in outcomes})
+
+    @timed()
     def gpa_table(
         self,
         major: Optional[str] = None,
         cohort_year: Optional[int] = None,
+        scope: Optional["DataScope"] = None,
     ) -> pd.DataFrame:
         """
-        Optionally filter GPA table by major and/or cohort_year.
+        Optionally filter GPA table by major and/or cohort_year, and restrict
+        it to the students of a DataScope.
         """
-        tbl = self.gradebook.compute_gpa_table()
-        merged = tbl.merge(self.students, on="student_id", how="left")
+        merged = self._cached(
+            "gpa_table",
+            lambda: self.gradebook.compute_gpa_table().merge(
+                self.students, on="student_id", how="left"
+            ),
+        )
+        if scope is not None:
+            merged = scope.per_student(merged)
         if major:
             merged = merged[merged["major"] == major]
         if cohort_year is not None:
             merged = merged[merged["cohort_year"] == cohort_year]
         return merged
 
+    @timed()
     def pass_rates(
         self,
         department: Optional[str] = None,
         term: Optional[str] = None,
     ) -> pd.DataFrame:
-        df = self.enrollments.copy()
-        df = df[df["status"] == "completed"]
-        if term:
-            df = df[df["term"] == term]
-        df["passed"] = df["grade"] >= 60
-        rates = df.groupby("course_id")["passed"].mean().reset_index()
-        rates.rename(columns={"passed": "pass_rate"}, inplace=True)
-        merged = rates.merge(self.courses, on="course_id", how="left")
+        """Pass rate per course: course_id, pass_rate, course columns."""
+        merged = self._term_rates(term).drop(columns=["completed", "dfw_rate"])
         if department:
             merged = merged[merged["department"] == department]
         return merged
 
+    @timed()
     def dfw_rates(
         self,
         department: Optional[str] = None,
         term: Optional[str] = None,
     ) -> pd.DataFrame:
-        df = self.enrollments.copy()
-        df = df[df["status"] == "completed"]
-        if term:
-            df = df[df["term"] == term]
-        df["dfw"] = df["grade"] < 60
-        rates = df.groupby("course_id")["dfw"].mean().reset_index()
-        rates.rename(columns={"dfw": "dfw_rate"}, inplace=True)
-        merged = rates.merge(self.courses, on="course_id", how="left")
+        """D/F/W rate per course: course_id, dfw_rate, course columns."""
+        merged = self._term_rates(term).drop(columns=["completed", "pass_rate"])
         if department:
             merged = merged[merged["department"] == department]
         return merged
 
+    @timed()
+    def course_rates(
+        self,
+        department: Optional[str] = None,
+        term: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Pass and DFW rates per course from one pass over the completed
+        enrollments: course columns plus completed, pass_rate, dfw_rate.
+        """
+        merged = self._term_rates(term)
+        if department:
+            merged = merged[merged["department"] == department]
+        return merged
+
+    def _term_rates(self, term: Optional[str]) -> pd.DataFrame:
+        """
+        The per-course rates table of one term (all terms without one) that
+        pass_rates(), dfw_rates() and course_rates() read.
+        """
+        if not self._known_term(term):
+            # Unknown term: an empty result, not cached.
+            return self._course_rates_for_term(term)
+        return self._cached(
+            ("course_rates", term or None),
+            lambda: self._course_rates_for_term(term),
+        )
+
+    def _course_rates_for_term(self, term: Optional[str]) -> pd.DataFrame:
+        df = self._completed_rows(("passed", "dfw"), term)
+        rates = (
+            df.groupby("course_id")
+            .agg(
+                completed=("passed", "size"),
+                pass_rate=("passed", "mean"),
+                dfw_rate=("dfw", "mean"),
+            )
+            .reset_index()
+        )
+        return rates.merge(self.courses, on="course_id", how="left")
+
+    @timed()
+    def course_term_outcomes(self) -> pd.DataFrame:
+        """
+        Completed enrollments and D/F/W outcomes per (course_id, term):
+        columns course_id, term, enrollments, dfw_count.
+        """
+        return self._cached("course_term_outcomes", self._course_term_outcomes)
+
+    def _course_term_outcomes(self) -> pd.DataFrame:
+        return (
+            self._completed_rows("dfw")
+            .groupby(["course_id", "term"], sort=False)
+            .agg(enrollments=("dfw", "size"), dfw_count=("dfw", "sum"))
+            .reset_index()
+        )
+
+    @timed()
     def attendance_grade_correlation(self) -> Dict[str, float | None]:
+        return self._cached("attendance_corr", self._attendance_grade_correlation)
+
+    def _attendance_grade_correlation(self) -> Dict[str, float | None]:
         df = self.enrollments.dropna(subset=["attendance_pct", "grade"])
         if len(df) < 3:
             return {"pearson": None, "spearman": None}
+        # scipy.stats is the slowest import in the app; load it on first use.
+        from scipy import stats
+
         pearson, _ = stats.pearsonr(df["attendance_pct"], df["grade"])
         spearman_result = stats.spearmanr(df["attendance_pct"], df["grade"])
         return {
@@ -82,7 +205,11 @@ class AnalyticsService:
             "spearman": round(float(spearman_result.correlation), 3),
         }
 
+    @timed()
     def cohort_gpa_summary(self) -> pd.DataFrame:
+        return self._cached("cohort_gpa", self._cohort_gpa_summary)
+
+    def _cohort_gpa_summary(self) -> pd.DataFrame:
         gpa_tbl = self.gradebook.compute_gpa_table()
         merged = gpa_tbl.merge(self.students, on="student_id", how="left")
         return (
@@ -91,20 +218,26 @@ class AnalyticsService:
             .reset_index()
         )
 
-    def student_summary_table(self) -> pd.DataFrame:
+    @timed()
+    def student_summary_table(self, scope: Optional["DataScope"] = None) -> pd.DataFrame:
         """
         Return one row per student with:
         - GPA (from gradebook)
         - Avg attendance across completed enrollments
-        - DFW_count (# of completed enrollments with grade < 60)
+        - DFW_count (# of completed enrollments below the course's passing grade)
         - Credits attempted (sum of course credits across completed enrollments)
         - Basic student info (name, major, cohort_year)
+
+        With `scope`, only that DataScope's students are returned.
         """
+        table = self._cached("student_summary", self._student_summary_table)
+        return table if scope is None else scope.per_student(table)
+
+    def _student_summary_table(self) -> pd.DataFrame:
         gpa_tbl = self.gradebook.compute_gpa_table()  # student_id, total_credits, quality_points, gpa
 
         # Work on completed enrollments
-        enr = self.enrollments.copy()
-        enr = enr[enr["status"] == "completed"]
+        enr = self._completed_rows("dfw")
 
         # Merge with courses to get credits
         courses = self.courses[["course_id", "credits"]].copy()
@@ -117,10 +250,9 @@ class AnalyticsService:
             .rename("avg_attendance")
         )
 
-        # DFW count per student (grade < 60)
-        dfw_mask = enr["grade"] < 60
+        # DFW count per student (grade below the course's passing grade)
         dfw_count = (
-            enr[dfw_mask]
+            enr[enr["dfw"]]
             .groupby("student_id")["course_id"]
             .count()
             .rename("dfw_count")
@@ -150,4 +282,208 @@ class AnalyticsService:
         summary["dfw_count"] = summary["dfw_count"].fillna(0).astype(int)
         summary["credits_attempted"] = summary["credits_attempted"].fillna(0.0)
 
-        return summary
\ No newline at end of file
+        return summary
+
+    SUMMARY_SORT_KEYS = ("gpa", "avg_attendance", "dfw_count", "credits_attempted", "total_credits")
+
+    @timed()
+    def student_summary_page(
+        self,
+        sort_by: str = "gpa",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        major: Optional[str] = None,
+        cohort_year: Optional[int] = None,
+        student_ids: Optional[Sequence[str]] = None,
+        scope: Optional["DataScope"] = None,
+    ) -> Tuple[pd.DataFrame, int, Optional[str]]:
+        """
+        One page of the student summary sorted by any of SUMMARY_SORT_KEYS:
+        (rows, matching count, next-page cursor or None). The orders are
+        precomputed per key and data version, so an unfiltered top-k costs
+        O(k). Raises ValueError for an unknown sort key or a bad cursor.
+        """
+        table = self.student_summary_table()
+        ranking = self._cached(
+            "student_summary_ranking",
+            lambda: RankedIndex(
+                table["student_id"].to_numpy(),
+                {key: table[key].to_numpy(dtype=float) for key in self.SUMMARY_SORT_KEYS},
+            ),
+        )
+        rows = None
+        if scope is not None:
+            rows = scope.positions(table)
+        if student_ids is not None:
+            wanted = ranking.positions_of(student_ids)
+            rows = wanted if rows is None else np.intersect1d(rows, wanted)
+        if major or cohort_year is not None:
+            keep = np.ones(len(table), dtype=bool)
+            if major:
+                keep &= (table["major"] == major).to_numpy()
+            if cohort_year is not None:
+                keep &= (table["cohort_year"] == cohort_year).to_numpy()
+            matching = np.flatnonzero(keep)
+            rows = matching if rows is None else np.intersect1d(rows, matching)
+        positions, total, next_cursor = ranking.select(
+            sort_by, descending, offset, limit, cursor, rows
+        )
+        return table.take(positions), total, next_cursor
+
+    # ---------- Distributions ----------
+
+    # metric -> (first edge, bin width, bins); the last bin is open-ended
+    DISTRIBUTION_BINS = {
+        "gpa": (0.0, 0.25, 16),
+        "avg_attendance": (0.0, 5.0, 20),
+        "dfw_count": (0.0, 1.0, 11),
+        "credits_attempted": (0.0, 15.0, 11),
+    }
+    DISTRIBUTION_GROUPS = ("major", "cohort_year", "department")
+
+    def _student_department_table(self) -> pd.DataFrame:
+        """
+        One row per (student, course department) with the student's GPA,
+        average attendance, DFW count and credits attempted over that
+        department's completed enrollments (every attempt counts).
+        """
+        enr = self._completed_rows("dfw")
+        courses = self.courses.drop_duplicates("course_id")[["course_id", "credits", "department"]]
+        enr = enr.merge(courses, on="course_id", how="left")
+        enr = enr[enr["department"].notna()]
+        credits = enr["credits"].fillna(0.0)
+        points = enr["grade"].map(self.gradebook.scale.to_points)
+        pairs = (
+            enr.assign(credits=credits, quality_points=points * credits)
+            .groupby(["student_id", "department"], sort=False)
+            .agg(
+                avg_attendance=("attendance_pct", "mean"),
+                dfw_count=("dfw", "sum"),
+                credits_attempted=("credits", "sum"),
+                quality_points=("quality_points", "sum"),
+            )
+            .reset_index()
+        )
+        pairs["gpa"] = (
+            pairs["quality_points"] / pairs["credits_attempted"].where(pairs["credits_attempted"] > 0)
+        ).round(2)
+        return pairs
+
+    def _binned(self, group_by: Optional[str]) -> Dict[str, Any]:
+        """
+        Per distribution unit (student, or student x department): group
+        codes, group labels, and each metric's bin index (-1 when missing)
+        and value. Built once per data version and grouping.
+        """
+        if group_by == "department":
+            table = self._cached("student_departments", self._student_department_table)
+        else:
+            table = self.student_summary_table()
+        if group_by:
+            codes, labels = pd.factorize(table[group_by], sort=True)
+            labels = labels.tolist()
+            if (codes < 0).any():
+                # Rows without a value form their own (null) group
+                codes = np.where(codes < 0, len(labels), codes)
+                labels.append(None)
+        else:
+            codes, labels = np.zeros(len(table), dtype=np.intp), [None]
+        bins: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for metric, (start, width, count) in self.DISTRIBUTION_BINS.items():
+            values = table[metric].to_numpy(dtype=float)
+            index = np.clip(np.floor((values - start) / width), 0, count - 1)
+            bins[metric] = (np.where(np.isnan(values), -1, index).astype(np.intp), values)
+        return {"table": table, "codes": codes, "labels": labels, "bins": bins}
+
+    @timed()
+    def distributions(
+        self,
+        metrics: Optional[Sequence[str]] = None,
+        group_by: Optional[str] = None,
+        scope: Optional["DataScope"] = None,
+    ) -> Dict[str, Any]:
+        """
+        Pre-binned histograms of per-student metrics (DISTRIBUTION_BINS),
+        overall or per major / cohort_year / department. Grouped by
+        department, each student counts once per department they completed
+        courses in, with metrics over that department's courses.
+
+        Every histogram is one np.bincount over (group, bin) codes that are
+        precomputed per data version; the unscoped result is cached. Metrics
+        are returned once each, in DISTRIBUTION_BINS order.
+        Raises ValueError for an unknown metric or grouping.
+        """
+        requested = set(metrics or self.DISTRIBUTION_BINS)
+        unknown = sorted(requested - set(self.DISTRIBUTION_BINS))
+        if unknown:
+            raise ValueError(
+                f"Unknown metric(s) {', '.join(unknown)}; expected any of "
+                f"{', '.join(self.DISTRIBUTION_BINS)}"
+            )
+        # Unique, in DISTRIBUTION_BINS order, so the cache key set stays small
+        metrics = [m for m in self.DISTRIBUTION_BINS if m in requested]
+        if group_by is not None and group_by not in self.DISTRIBUTION_GROUPS:
+            raise ValueError(
+                f"Unknown group_by {group_by!r}; expected one of "
+                f"{', '.join(self.DISTRIBUTION_GROUPS)}"
+            )
+        if scope is None:
+            return self._cached(
+                ("distributions", tuple(metrics), group_by),
+                lambda: self._distributions(metrics, group_by, None),
+            )
+        return self._distributions(metrics, group_by, scope)
+
+    def _distributions(
+        self,
+        metrics: Sequence[str],
+        group_by: Optional[str],
+        scope: Optional["DataScope"],
+    ) -> Dict[str, Any]:
+        binned = self._cached(("distribution_bins", group_by), lambda: self._binned(group_by))
+        codes, labels = binned["codes"], binned["labels"]
+        rows = None
+        if scope is not None:
+            rows = scope.positions(binned["table"])
+            if group_by == "department":
+                # Only departments of the scope's own enrollments
+                dept = self.courses.drop_duplicates("course_id").set_index("course_id")["department"]
+                visible = pd.unique(scope.enrollments()["course_id"].map(dept).dropna())
+                allowed = np.isin(np.asarray(labels, dtype=object), visible)
+                rows = rows[allowed[codes[rows]]]
+            codes = codes[rows]
+        n_groups = len(labels)
+        units = np.bincount(codes, minlength=n_groups) if n_groups else np.zeros(0, dtype=int)
+        out: Dict[str, Any] = {}
+        for metric in metrics:
+            start, width, count = self.DISTRIBUTION_BINS[metric]
+            index, values = binned["bins"][metric]
+            if rows is not None:
+                index, values = index[rows], values[rows]
+            present = index >= 0
+            cells = np.bincount(
+                codes[present] * count + index[present], minlength=n_groups * count
+            ).reshape(n_groups, count)
+            counted = cells.sum(axis=1)
+            sums = np.bincount(codes[present], weights=values[present], minlength=n_groups)
+            out[metric] = {
+                "edges": [round(start + width * i, 4) for i in range(count + 1)],
+                "groups": [
+                    {
+                        "group": labels[g],
+                        "count": int(counted[g]),
+                        "missing": int(units[g] - counted[g]),
+                        "mean": round(float(sums[g] / counted[g]), 3) if counted[g] else None,
+                        "counts": cells[g].tolist(),
+                    }
+                    for g in range(n_groups)
+                    if units[g]
+                ],
+            }
+        return {
+            "group_by": group_by,
+            "unit": "student_department" if group_by == "department" else "student",
+            "distributions": out,
+        }
\ No newline at end of file
@@ -0,0 +1,142 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import pandas as pd
+
+from ..utils.perf import timed
+from .analytics_service import AnalyticsService
+from .risk_service import RiskService
+
+if TYPE_CHECKING:
+    from .scope_service import DataScope
+
+
+def _records(df: pd.DataFrame, columns: List[str]) -> List[Dict[str, Any]]:
+    """Rows as dicts of the given columns (those present), NaN as None."""
+    present = [c for c in columns if c in df.columns]
+    out = df[present].astype(object)
+    return out.where(out.notna(), None).to_dict(orient="records")
+
+
+class DashboardService:
+    """
+    One payload per dashboard page, assembled from the snapshot's analytics
+    and risk services.
+
+    Each bundle reads the per-version intermediates those services already
+    cache: the student summary and its sorted orders, the at-risk list, the
+    binned distributions and the course rates. Each one is computed once per
+    data version, whichever bundle or endpoint asks first. A bundle costs
+    one request and slices of cached data, and carries only the fields its
+    page renders.
+    """
+
+    LEADERBOARD_COLUMNS = [
+        "student_id", "name", "major", "cohort_year", "gpa", "total_credits",
+        "avg_attendance", "dfw_count", "credits_attempted",
+    ]
+    COURSE_COLUMNS = [
+        "course_id", "title", "department", "level", "completed", "pass_rate", "dfw_rate",
+    ]
+
+    def __init__(self, analytics: AnalyticsService, risk: RiskService):
+        self.analytics = analytics
+        self.risk = risk
+
+    @timed()
+    def overview(
+        self,
+        leaderboard_limit: int = 50,
+        risk_limit: int = 20,
+        scope: Optional["DataScope"] = None,
+    ) -> Dict[str, Any]:
+        """
+        KPIs, the first GPA leaderboard page, the highest-risk students,
+        the cohort GPA trend and the GPA histogram.
+        """
+        dist = self.analytics.distributions(metrics=["gpa"], scope=scope)["distributions"]["gpa"]
+        overall = dist["groups"][0] if dist["groups"] else None
+        board, board_total, board_cursor = self.analytics.student_summary_page(
+            sort_by="gpa", limit=leaderboard_limit, scope=scope
+        )
+        at_risk, risk_total, _ = self.risk.at_risk_page(limit=risk_limit, scope=scope)
+        cohorts = self.analytics.cohort_gpa_summary().dropna(subset=["cohort_year"])
+        return {
+            "kpis": {
+                "students": overall["count"] + overall["missing"] if overall else 0,
+                "avg_gpa": overall["mean"] if overall else None,
+                "at_risk": risk_total,
+            },
+            "gpa_leaderboard": {
+                "rows": _records(board, self.LEADERBOARD_COLUMNS),
+                "total": board_total,
+                "next_cursor": board_cursor,
+            },
+            "at_risk": {"rows": at_risk, "total": risk_total},
+            "cohort_gpa": [
+                {
+                    "cohort_year": int(row.cohort_year),
+                    "mean": float(row.mean),
+                    "median": float(row.median),
+                    "count": int(row.count),
+                }
+                for row in cohorts.itertuples()
+            ],
+            "gpa_distribution": {
+                "edges": dist["edges"],
+                "counts": overall["counts"] if overall else [],
+            },
+        }
+
+    @timed()
+    def advisor(
+        self,
+        major: Optional[str] = None,
+        cohort_year: Optional[int] = None,
+        limit: int = 100,
+        scope: Optional["DataScope"] = None,
+    ) -> Dict[str, Any]:
+        """
+        The highest-risk students for the filters, with the summary columns
+        the advisor table shows (one row per student, risk order).
+        """
+        at_risk, total, _ = self.risk.at_risk_page(
+            limit=limit, major=major, cohort_year=cohort_year, scope=scope
+        )
+        summary, _, _ = self.analytics.student_summary_page(
+            student_ids=[r["student_id"] for r in at_risk]
+        )
+        details = {
+            r["student_id"]: r
+            for r in _records(summary, ["student_id", "major", "cohort_year", "credits_attempted"])
+        }
+        rows = []
+        for entry in at_risk:
+            extra = details.get(entry["student_id"], {})
+            rows.append(
+                {
+                    **entry,
+                    "major": extra.get("major"),
+                    "cohort_year": extra.get("cohort_year"),
+                    "credits_attempted": extra.get("credits_attempted"),
+                }
+            )
+        return {
+            "filters": {"major": major, "cohort_year": cohort_year},
+            "rows": rows,
+            "total": total,
+        }
+
+    @timed()
+    def faculty(
+        self,
+        department: Optional[str] = None,
+        term: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Pass and DFW rates per course, from one pass over the enrollments."""
+        rates = self.analytics.course_rates(department=department, term=term)
+        if "level" in rates.columns:
+            rates = rates.assign(level=rates["level"].astype("Int64"))
+        return {
+            "filters": {"department": department, "term": term},
+            "courses": _records(rates, self.COURSE_COLUMNS),
+        }
\ No newline at end of file
@@ -1,70 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import IO, Dict, Iterable, Iterator, Mapping, Optional, Any, Union
 from datetime import datetime
+import threading
+import time
+import weakref
 
 import pandas as pd
 
 from ..data_access.loaders import load_csvs
+from ..graph.prereq_graph import PrereqGraph
 from ..data_access.validators import (
     validate_students,
     validate_courses,
     validate_enrollments,
+    validate_prerequisites,
+)
+from ..data_access.integrity import (
+    DEFAULT_STATUSES,
+    DEFAULT_TERM_PATTERN,
+    ValidationReport,
+    validate_dataset,
 )
 from ..utils.config_loader import load_settings
+from ..utils.exceptions import DataValidationError
+from ..utils import metrics
+from ..utils.perf import timed
 from ..utils.logging import get_logger
+from .early_warning_service import EarlyWarningService
+from .snapshot import ServiceSnapshot, WARMUP_STAGES, build_snapshot
 
 logger = get_logger(__name__)
 
+_INGEST_ROWS = metrics.registry.counter(
+    "spa_ingest_rows_total", "Rows parsed and validated from uploads.", ["table"]
+)
+_INGEST_SECONDS = metrics.registry.counter(
+    "spa_ingest_seconds_total", "Time spent parsing and validating uploads.", ["table"]
+)
+_INGEST_RATE = metrics.registry.gauge(
+    "spa_ingest_rows_per_second", "Throughput of the latest upload per table.", ["table"]
+)
+
+
+@dataclass(frozen=True, eq=False)
+class DataGeneration:
+    """
+    One immutable, published version of all tables.
+
+    Writers never modify a generation: they build a new tables mapping and
+    publish it as the next generation. Readers hold a reference (ideally via
+    DataService.lease()) for the duration of a request, so they always see
+    a consistent set of tables; the generation is freed by the garbage
+    collector once it is no longer current and its last reader is done.
+    """
+    version: int
+    tables: Mapping[str, pd.DataFrame]
+    loaded_at: datetime
+
 
 class DataService:
     """
     Singleton-like service that holds in-memory DataFrames for
     students, courses, enrollments, and prerequisites.
     Supports reloads from disk and from uploaded CSV files.
+
+    Data is published as immutable DataGeneration objects; a writer builds
+    the next generation off to the side and swaps it in atomically, so
+    concurrent requests never see half-replaced tables.
+
+    Every new generation schedules a warm-up: a background thread builds a
+    ServiceSnapshot (services plus their precomputed aggregates) for it
+    while requests keep being served from the previous snapshot, which is
+    then swapped out.
     """
 
+    TABLES = ("students", "courses", "enrollments", "prerequisites")
+
     _instance: Optional["DataService"] = None
+    _instance_lock = threading.Lock()
+
+    # How long a request waits for the very first snapshot before
+    # building one itself on the request path.
+    FIRST_SNAPSHOT_WAIT_SECONDS = 30.0
 
     def __init__(self) -> None:
         settings = load_settings()
         self.base_dir = Path(settings["app"]["data_dir"])
-        self.datasets: Dict[str, pd.DataFrame] = {}
-        self.last_loaded: Optional[datetime] = None
+        cache_dir = settings["app"].get("data_cache_dir")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.background_warmup = bool(settings["app"].get("background_warmup", True))
+        self.validation_cfg: Dict[str, Any] = settings.get("validation", {})
+        self._validation: Optional[ValidationReport] = None
+        self._generation: Optional[DataGeneration] = None
+        self._live: "weakref.WeakValueDictionary[int, DataGeneration]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._readers: Dict[int, int] = {}
+        self._snapshot: Optional[ServiceSnapshot] = None
+        self._snapshot_ready = threading.Event()
+        # _write_lock serializes writers; _lock guards snapshot/warm-up state
+        # and reader counts.
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._warmup: Dict[str, Any] = {"state": "idle"}
+        self._memory: Dict[int, Dict[str, int]] = {}
+        self._last_build_seconds: Optional[float] = None
+        # In-progress updates outlive data versions; rebased on each snapshot
+        self.early_warning = EarlyWarningService()
+        metrics.registry.register_collector(self._collect_metrics)
         self.reload_from_disk()
 
     @classmethod
     def instance(cls) -> "DataService":
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
+    # ---------- Generations ----------
+
+    def current(self) -> DataGeneration:
+        """Return the currently published generation."""
+        return self._generation
+
+    @property
+    def datasets(self) -> Mapping[str, pd.DataFrame]:
+        return self._generation.tables if self._generation else MappingProxyType({})
+
+    @property
+    def version(self) -> int:
+        return self._generation.version if self._generation else 0
+
+    @property
+    def last_loaded(self) -> Optional[datetime]:
+        return self._generation.loaded_at if self._generation else None
+
+    def _publish(self, tables: Dict[str, pd.DataFrame]) -> DataGeneration:
+        """Publish `tables` as the next generation. Caller holds _write_lock."""
+        generation = DataGeneration(
+            version=self.version + 1,
+            tables=MappingProxyType(dict(tables)),
+            loaded_at=datetime.utcnow(),
+        )
+        self._live[generation.version] = generation
+        self._generation = generation
+        self._schedule_warmup(generation)
+        return generation
+
+    @timed()
     def reload_from_disk(self) -> None:
-        """Load all CSVs from the configured data directory."""
+        """
+        Load all CSVs from the configured data directory. Integrity problems
+        in files on disk are logged rather than rejected, so the app still
+        starts; uploads are held to the strict checks.
+        """
         logger.info("Reloading data from disk: %s", self.base_dir)
-        self.datasets = load_csvs(self.base_dir)
-        self._validate_all()
-        self.last_loaded = datetime.utcnow()
+        tables = self._validate_all(load_csvs(self.base_dir, self.cache_dir))
+        with self._write_lock:
+            self._check_integrity(tables, strict=False)
+            self._publish(tables)
 
-    def _validate_all(self) -> None:
-        validate_students(self.datasets["students"])
-        validate_courses(self.datasets["courses"])
-        validate_enrollments(self.datasets["enrollments"])
+    def _validate_all(self, tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        validate_students(tables["students"])
+        validate_courses(tables["courses"])
+        out = dict(tables)
+        out["enrollments"] = validate_enrollments(tables["enrollments"])
+        return out
 
-    def get_datasets(self) -> Dict[str, pd.DataFrame]:
+    def _check_integrity(
+        self,
+        tables: Mapping[str, pd.DataFrame],
+        strict: bool = True,
+        only: Optional[Iterable[str]] = None,
+    ) -> ValidationReport:
+        """
+        Run the cross-table checks on a candidate set of tables. With
+        `strict`, any error raises DataValidationError carrying the report.
+        With `only`, just those tables are checked, and the last full report
+        stays the one shown in status().
+        """
+        cfg = self.validation_cfg
+        if only is not None:
+            tables = {name: tables[name] for name in only}
+        report = validate_dataset(
+            tables,
+            max_rows=int(cfg.get("max_rows_per_issue", 20)),
+            statuses=cfg.get("statuses", DEFAULT_STATUSES),
+            term_pattern=cfg.get("term_pattern", DEFAULT_TERM_PATTERN),
+        )
+        for issue in report.issues:
+            logger.warning(
+                "Validation %s in %s: %s (%d row(s))",
+                issue.severity, issue.table, issue.message, issue.count,
+            )
+        if strict and not report.ok:
+            raise DataValidationError(
+                f"Integrity check failed: {report.summary()}", report.to_dict()
+            )
+        if only is None:
+            self._validation = report
+        return report
+
+    def get_datasets(self) -> Mapping[str, pd.DataFrame]:
         return self.datasets
 
     def get_table(self, name: str) -> pd.DataFrame:
-        if name not in self.datasets:
+        tables = self.datasets
+        if name not in tables:
             raise ValueError(f"Unknown table: {name}")
-        return self.datasets[name]
+        return tables[name]
 
-    def replace_table_from_file(self, name: str, file_path: Path) -> None:
-        """
-        Replace one table (students/courses/enrollments/prerequisites)
-        from an uploaded CSV file, validate, and update cache.
-        """
-        logger.info("Replacing table '%s' from file %s", name, file_path)
-        df = pd.read_csv(file_path)
+    def _read_table(
+        self, name: str, source: Union[Path, IO[bytes]]
+    ) -> pd.DataFrame:
+        """Parse one uploaded table and run its single-table validation."""
+        if name not in self.TABLES:
+            raise ValueError(f"Unknown table: {name}")
+        start = time.perf_counter()
+        df = pd.read_csv(source)
 
         # Validate by table
         if name == "students":
@@ -72,24 +230,292 @@ class DataService:
         elif name == "courses":
             validate_courses(df)
         elif name == "enrollments":
-            validate_enrollments(df)
-        elif name == "prerequisites":
-            required = {"course_id", "prereq_id"}
-            missing = required - set(df.columns)
-            if missing:
-                raise ValueError(
-                    f"prerequisites.csv missing required columns: {missing}"
-                )
+            df = validate_enrollments(df)
         else:
-            raise ValueError(f"Unknown table: {name}")
+            validate_prerequisites(df)
+        elapsed = time.perf_counter() - start
+        _INGEST_ROWS.inc(len(df), table=name)
+        _INGEST_SECONDS.inc(elapsed, table=name)
+        _INGEST_RATE.set(len(df) / elapsed if elapsed > 0 else 0.0, table=name)
+        return df
 
-        self.datasets[name] = df
-        self.last_loaded = datetime.utcnow()
+    @timed()
+    def replace_table_from_file(self, name: str, file_path: Path) -> None:
+        """
+        Replace one table (students/courses/enrollments/prerequisites)
+        from an uploaded CSV file, validate, and publish a new generation.
+        """
+        logger.info("Replacing table '%s' from file %s", name, file_path)
+        df = self._read_table(name, file_path)
+
+        with self._write_lock:
+            tables = dict(self.datasets)
+            tables[name] = df
+            self._check_integrity(tables)
+            self._publish(tables)
         logger.info("Table '%s' replaced successfully.", name)
 
+    @timed()
+    def replace_tables(
+        self, sources: Mapping[str, Union[Path, IO[bytes]]]
+    ) -> Dict[str, int]:
+        """
+        Replace several tables in one transaction.
+
+        All sources are parsed and validated in parallel, then checked
+        against each other (and against the current version of any table not
+        supplied) for referential integrity. Only if everything passes are
+        they published together as a single new generation, which triggers
+        a single warm-up. Returns the row count of each replaced table.
+        """
+        unknown = set(sources) - set(self.TABLES)
+        if unknown:
+            raise ValueError(f"Unknown table(s): {sorted(unknown)}")
+        if not sources:
+            raise ValueError("No tables supplied")
+        logger.info("Replacing tables %s in one transaction", sorted(sources))
+
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            futures = {
+                name: pool.submit(self._read_table, name, source)
+                for name, source in sources.items()
+            }
+            parsed: Dict[str, pd.DataFrame] = {}
+            for name, future in futures.items():
+                try:
+                    parsed[name] = future.result()
+                except Exception as exc:
+                    raise ValueError(f"{name}: {exc}") from exc
+
+        with self._write_lock:
+            tables = dict(self.datasets)
+            tables.update(parsed)
+            self._check_integrity(tables)
+            self._publish(tables)
+        logger.info("Tables %s replaced successfully.", sorted(parsed))
+        return {name: len(df) for name, df in parsed.items()}
+
+    def _editable_graph(self, prereqs: pd.DataFrame) -> PrereqGraph:
+        """A private copy of the graph for `prereqs`, with depths computed."""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.data["prerequisites"] is prereqs:
+            graph = snapshot.graph.graph.copy()
+        else:
+            graph = PrereqGraph.from_frame(prereqs)
+        graph.topological()
+        return graph
+
+    @timed()
+    def add_prerequisite(self, course_id: str, prereq_id: str) -> Dict[str, int]:
+        """
+        Add one prerequisite edge and publish a new generation.
+
+        The edge is first tried on a copy of the current graph, so an edge
+        that would close a cycle raises PrerequisiteCycleError (carrying the
+        cycle) before anything is published. Only courses and prerequisites
+        are re-validated. Returns {course_id: new depth} for affected courses.
+        """
+        with self._write_lock:
+            tables = dict(self.datasets)
+            prereqs = tables["prerequisites"]
+            graph = self._editable_graph(prereqs)
+            if graph.has_edge(course_id, prereq_id):
+                raise ValueError(f"{prereq_id} is already a prerequisite of {course_id}")
+            changes = graph.insert_edge(course_id, prereq_id)
+            edge = pd.DataFrame({"course_id": [course_id], "prereq_id": [prereq_id]})
+            tables["prerequisites"] = pd.concat([prereqs, edge], ignore_index=True)
+            self._check_integrity(tables, only=("courses", "prerequisites"))
+            self._publish(tables)
+        logger.info("Added prerequisite %s -> %s", course_id, prereq_id)
+        return changes
+
+    @timed()
+    def remove_prerequisite(self, course_id: str, prereq_id: str) -> Dict[str, int]:
+        """
+        Remove a prerequisite edge (all duplicates of it) and publish a new
+        generation. Raises KeyError if there is no such edge. Returns
+        {course_id: new depth} for affected courses.
+        """
+        with self._write_lock:
+            tables = dict(self.datasets)
+            prereqs = tables["prerequisites"]
+            changes = self._editable_graph(prereqs).remove_edge(course_id, prereq_id)
+            match = (prereqs["course_id"].astype(str) == course_id) & (
+                prereqs["prereq_id"].astype(str) == prereq_id
+            )
+            tables["prerequisites"] = prereqs[~match].reset_index(drop=True)
+            self._publish(tables)
+        logger.info("Removed prerequisite %s -> %s", course_id, prereq_id)
+        return changes
+
+    # ---------- Snapshot warm-up ----------
+
+    def _schedule_warmup(self, generation: DataGeneration) -> None:
+        """Start building the snapshot for `generation`."""
+        with self._lock:
+            self._warmup = {
+                "state": "running",
+                "version": generation.version,
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "stages_total": len(WARMUP_STAGES),
+                "stages_done": 0,
+                "timings": {},
+                "error": None,
+            }
+        if self.background_warmup:
+            threading.Thread(
+                target=self._run_warmup,
+                args=(generation,),
+                name=f"warmup-v{generation.version}",
+                daemon=True,
+            ).start()
+        else:
+            self._run_warmup(generation)
+
+    def _run_warmup(self, generation: DataGeneration) -> None:
+        version = generation.version
+
+        def on_stage(name: str, seconds: float) -> None:
+            with self._lock:
+                if self._warmup.get("version") == version:
+                    self._warmup["stages_done"] += 1
+                    self._warmup["timings"][name] = seconds
+
+        start = time.perf_counter()
+        try:
+            with metrics.INFLIGHT.track(kind="snapshot_warmup"):
+                snapshot = build_snapshot(
+                    generation, on_stage=on_stage, previous=self._snapshot
+                )
+                self.early_warning.sync(snapshot)
+        except Exception as exc:
+            logger.exception("Warm-up for data version %s failed", version)
+            with self._lock:
+                if self._warmup.get("version") == version:
+                    self._warmup["state"] = "failed"
+                    self._warmup["error"] = str(exc)
+                    self._warmup["finished_at"] = datetime.utcnow().isoformat()
+            return
+
+        elapsed = round(time.perf_counter() - start, 4)
+        with self._lock:
+            self._swap_snapshot(snapshot)
+            if self._warmup.get("version") == version:
+                self._warmup["state"] = "ready"
+                self._warmup["total_seconds"] = elapsed
+                self._warmup["finished_at"] = datetime.utcnow().isoformat()
+            self._last_build_seconds = elapsed
+        logger.info("Snapshot for data version %s ready in %.3fs", version, elapsed)
+
+    def _swap_snapshot(self, snapshot: ServiceSnapshot) -> None:
+        """Install `snapshot` unless a newer one is already serving. Caller holds _lock."""
+        if self._snapshot is None or self._snapshot.version < snapshot.version:
+            self._snapshot = snapshot
+            self._snapshot_ready.set()
+
+    @timed()
+    def get_snapshot(self) -> ServiceSnapshot:
+        """
+        Return the latest ready snapshot. While a newer one is warming up,
+        the previous snapshot keeps serving.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        warmup_failed = self._warmup.get("state") == "failed"
+        if not warmup_failed and self._snapshot_ready.wait(
+            self.FIRST_SNAPSHOT_WAIT_SECONDS
+        ):
+            return self._snapshot
+
+        # Warm-up failed or is too slow: build on the request path.
+        snapshot = build_snapshot(self.current())
+        with self._lock:
+            self._swap_snapshot(snapshot)
+            return self._snapshot
+
+    def early_warnings(self) -> EarlyWarningService:
+        """The early-warning state, rebased on the latest snapshot if needed."""
+        self.early_warning.sync(self.get_snapshot())
+        return self.early_warning
+
+    @contextmanager
+    def lease(self) -> Iterator[ServiceSnapshot]:
+        """
+        Pin the current snapshot (and its data generation) for the duration
+        of a request. Publishing newer generations meanwhile never affects it.
+        """
+        snapshot = self.get_snapshot()
+        version = snapshot.version
+        with self._lock:
+            self._readers[version] = self._readers.get(version, 0) + 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                self._readers[version] -= 1
+                if not self._readers[version]:
+                    del self._readers[version]
+
+    def _table_memory(self, generation: DataGeneration) -> Dict[str, int]:
+        """Deep memory usage per table, computed once per generation."""
+        memory = self._memory.get(generation.version)
+        if memory is None:
+            memory = {
+                name: int(df.memory_usage(index=True, deep=True).sum())
+                for name, df in generation.tables.items()
+            }
+            self._memory = {generation.version: memory}
+        return memory
+
+    def _collect_metrics(self) -> Iterable[metrics.Family]:
+        """Scrape-time gauges for /metrics: table sizes, data version and age, warm-up."""
+        generation = self.current()
+        if generation is None:
+            return
+        tables = generation.tables
+        memory = self._table_memory(generation)
+        yield ("spa_table_rows", "gauge", "Rows per table in the current data version.",
+               [("", {"table": n}, len(df)) for n, df in tables.items()])
+        yield ("spa_table_memory_bytes", "gauge", "Deep memory usage per table.",
+               [("", {"table": n}, b) for n, b in memory.items()])
+        yield ("spa_data_version", "gauge", "Current data version.",
+               [("", {}, generation.version)])
+        snapshot = self._snapshot
+        yield ("spa_serving_version", "gauge", "Data version of the snapshot serving requests.",
+               [("", {}, snapshot.version if snapshot else 0)])
+        age = (datetime.utcnow() - generation.loaded_at).total_seconds()
+        yield ("spa_data_age_seconds", "gauge", "Seconds since the current data was loaded.",
+               [("", {}, age)])
+        with self._lock:
+            timings = dict(self._warmup.get("timings", {}))
+            build = self._last_build_seconds
+            readers = sum(self._readers.values())
+        yield ("spa_snapshot_build_seconds", "gauge", "Duration of the last finished warm-up.",
+               [("", {}, build)] if build is not None else [])
+        yield ("spa_snapshot_stage_seconds", "gauge", "Stage durations of the latest warm-up.",
+               [("", {"stage": s}, t) for s, t in timings.items()])
+        yield ("spa_active_leases", "gauge", "Requests currently holding a snapshot lease.",
+               [("", {}, readers)])
+
     def status(self) -> Dict[str, object]:
-        """Return basic status about current datasets."""
+        """Return basic status about current datasets and snapshot warm-up."""
+        snapshot = self._snapshot
+        generation = self.current()
+        with self._lock:
+            warmup = dict(self._warmup)
+            warmup["timings"] = dict(warmup.get("timings", {}))
+            live = {
+                str(v): self._readers.get(v, 0) for v in sorted(self._live.keys())
+            }
         return {
-            "last_loaded": self.last_loaded.isoformat() if self.last_loaded else None,
+            "last_loaded": generation.loaded_at.isoformat() if generation else None,
             "tables": {name: len(df) for name, df in self.datasets.items()},
-        }
\ No newline at end of file
+            "data_version": self.version,
+            "serving_version": snapshot.version if snapshot else None,
+            "warmup": warmup,
+            # version -> active readers for every generation still in memory
+            "live_generations": live,
+            "validation": self._validation.to_dict() if self._validation else None,
+        }
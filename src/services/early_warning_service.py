@@ -0,0 +1,367 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..domain.grade_scale import GradeScale, default_scale
+from ..utils import metrics
+from ..utils.perf import timed
+from .risk_service import RiskService
+
+if TYPE_CHECKING:
+    from .scope_service import DataScope
+    from .snapshot import ServiceSnapshot
+
+_UPDATES = metrics.registry.counter(
+    "spa_early_warning_updates_total",
+    "In-progress enrollment updates by outcome.",
+    ["result"],
+)
+
+# An in-progress enrollment's contribution: (row, attendance, grade, credits, pass threshold)
+Entry = Tuple[int, float, float, float, float]
+
+
+def _iso(ts: float) -> Optional[str]:
+    """UTC ISO timestamp, or None for -inf (flagged when the data was loaded)."""
+    if not np.isfinite(ts):
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+class EarlyWarningService:
+    """
+    Early-warning risk from in-progress enrollments, kept up to date
+    incrementally.
+
+    The baseline per-student metrics come from the snapshot's RiskService
+    (completed enrollments only). In-progress enrollments are folded in as
+    per-student running sums:
+    - attendance: every in-progress attendance counts as one more value in
+      the student's average attendance;
+    - provisional GPA: a provisional grade adds its course's credits and
+      quality points, like another completed attempt;
+    - DFW: a provisional grade below the course's passing grade counts as a
+      D/F/W.
+
+    The in-progress rows of the enrollments table seed these sums. `apply()`
+    takes updates keyed by (student_id, course_id, term). It replaces that
+    enrollment's previous contribution, then re-evaluates the risk flags and
+    score of only the students it touched. When a student goes from not
+    flagged to flagged, the time is recorded, and `newly_at_risk(since)`
+    reads that record.
+
+    The state outlives data versions: `sync()` rebases it on a new snapshot
+    and re-applies the updates received so far, except those whose
+    enrollment is now completed.
+    """
+
+    def __init__(self, scale: GradeScale = default_scale):
+        self.scale = scale
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None
+        self.rebased_at: Optional[float] = None
+        # Updates received so far, replayed on rebase: key -> (attendance, grade)
+        self._updates: Dict[Tuple[Any, Any, Any], Tuple[float, float]] = {}
+
+    # ---------- Baseline ----------
+
+    def sync(self, snapshot: "ServiceSnapshot") -> None:
+        """Rebase on `snapshot` if it is newer than the current baseline."""
+        if self.version is not None and snapshot.version <= self.version:
+            return
+        with self._lock:
+            if self.version is None or snapshot.version > self.version:
+                self._rebase(snapshot)
+
+    @timed()
+    def _rebase(self, snapshot: "ServiceSnapshot") -> None:
+        risk: RiskService = snapshot.risk
+        enrollments = snapshot.data["enrollments"]
+        courses = snapshot.data["courses"].drop_duplicates("course_id")
+        base = risk.metric_arrays()
+        ids = base["student_id"]
+        n = len(ids)
+        previous = (self._ids, self._flagged, self._became) if self.version is not None else None
+
+        self.risk = risk
+        self.policy = risk.policy()
+        self._ids = ids
+        self._row_index = pd.Index(ids)
+        self._row_of: Dict[Any, int] = dict(zip(ids.tolist(), range(n)))
+        self._names = (
+            risk._student_metrics["name"].to_numpy()
+            if "name" in risk._student_metrics.columns
+            else np.full(n, None, dtype=object)
+        )
+        self._course_index = pd.Index(courses["course_id"])
+        self._credits = pd.to_numeric(courses["credits"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        self._thresholds = risk.pass_thresholds.for_courses(self._course_index)
+        self._term_index = pd.Index(pd.unique(enrollments["term"].dropna()))
+
+        # Completed-only baseline
+        self._base_gpa = base["gpa"]
+        self._base_attendance = base["avg_attendance"]
+        self._base_dfw = base["dfw_count"].astype(float)
+        self._base_credits = np.nan_to_num(base["total_credits"])
+        self._base_qp = np.nan_to_num(base["quality_points"])
+        rows = self._row_index.get_indexer(enrollments["student_id"])
+        att = enrollments["attendance_pct"].to_numpy(dtype=float)
+        status = enrollments["status"].to_numpy()
+        done = (status == "completed") & (rows >= 0) & ~np.isnan(att)
+        self._base_att_sum = np.bincount(rows[done], weights=att[done], minlength=n)
+        self._base_att_n = np.bincount(rows[done], minlength=n).astype(float)
+
+        # In-progress rows of the table seed the running sums
+        seed = (status == "in_progress") & (rows >= 0)
+        courses_of = self._course_index.get_indexer(enrollments["course_id"])
+        terms_of = self._term_index.get_indexer(enrollments["term"])
+        seed &= (courses_of >= 0) & (terms_of >= 0)
+        keys = self._key_codes(rows[seed], courses_of[seed], terms_of[seed])
+        order = np.argsort(keys, kind="stable")
+        self._seed_keys = keys[order]
+        self._seed_attendance = att[seed][order]
+        self._seed_grade = enrollments["grade"].to_numpy(dtype=float)[seed][order]
+        self._seed_rows = rows[seed][order]
+        self._seed_courses = courses_of[seed][order]
+        self._entries: Dict[Tuple[Any, Any, Any], Entry] = {}
+
+        self._ip_att_sum = np.zeros(n)
+        self._ip_att_n = np.zeros(n)
+        self._ip_credits = np.zeros(n)
+        self._ip_qp = np.zeros(n)
+        self._ip_dfw = np.zeros(n)
+        self._add_seed()
+
+        # Replay updates whose enrollment is not completed in the new data
+        completed = set(
+            zip(
+                *(enrollments.loc[status == "completed", c].tolist()
+                  for c in ("student_id", "course_id", "term"))
+            )
+        ) if self._updates else set()
+        replay = {k: v for k, v in self._updates.items() if k not in completed}
+        self._updates = {}
+        self._apply_updates(
+            [(k[0], k[1], k[2], v[0], v[1]) for k, v in replay.items()]
+        )
+
+        low_gpa, low_att, has_dfw, score = self._evaluate(np.arange(n))
+        self._flagged = low_gpa | low_att | has_dfw
+        self._score = score
+        # When each flagged student became at risk; -inf when flagged at load
+        self._became = np.where(self._flagged, -np.inf, np.nan)
+        self.rebased_at = time.time()
+        if previous is not None:
+            old_ids, old_flagged, old_became = previous
+            pos = pd.Index(old_ids).get_indexer(ids)
+            known = pos >= 0
+            was = np.zeros(n, dtype=bool)
+            was[known] = old_flagged[pos[known]]
+            carried = np.full(n, np.nan)
+            carried[known] = old_became[pos[known]]
+            self._became = np.where(
+                self._flagged & was, carried,
+                np.where(self._flagged, self.rebased_at, np.nan),
+            )
+        self.version = snapshot.version
+
+    def _key_codes(self, rows: np.ndarray, courses: np.ndarray, terms: np.ndarray) -> np.ndarray:
+        n_courses, n_terms = len(self._course_index) + 1, len(self._term_index) + 1
+        return (rows.astype(np.int64) * n_courses + courses) * n_terms + terms
+
+    def _add_seed(self) -> None:
+        rows, courses = self._seed_rows, self._seed_courses
+        att, grade = self._seed_attendance, self._seed_grade
+        n = len(self._ids)
+        has_att = ~np.isnan(att)
+        self._ip_att_sum += np.bincount(rows[has_att], weights=att[has_att], minlength=n)
+        self._ip_att_n += np.bincount(rows[has_att], minlength=n)
+        graded = ~np.isnan(grade)
+        credits = self._credits[courses[graded]]
+        points = np.array([self.scale.to_points(g) for g in grade[graded].tolist()])
+        self._ip_credits += np.bincount(rows[graded], weights=credits, minlength=n)
+        self._ip_qp += np.bincount(rows[graded], weights=points * credits, minlength=n)
+        dfw = grade[graded] < self._thresholds[courses[graded]]
+        self._ip_dfw += np.bincount(rows[graded][dfw], minlength=n)
+
+    # ---------- Updates ----------
+
+    def _contribute(self, entry: Entry, sign: float) -> None:
+        row, attendance, grade, credits, threshold = entry
+        if attendance == attendance:  # not NaN
+            self._ip_att_sum[row] += sign * attendance
+            self._ip_att_n[row] += sign
+        if grade == grade:
+            self._ip_credits[row] += sign * credits
+            self._ip_qp[row] += sign * credits * self.scale.to_points(grade)
+            if grade < threshold:
+                self._ip_dfw[row] += sign
+
+    def _apply_updates(
+        self, updates: Sequence[Tuple[Any, Any, Any, Optional[float], Optional[float]]]
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Fold updates into the running sums; returns touched rows and rejects."""
+        if not updates:
+            return [], []
+        sids, cids, terms, atts, grades = zip(*updates)
+        courses = self._course_index.get_indexer(pd.Index(cids, dtype=object))
+        term_codes = self._term_index.get_indexer(pd.Index(terms, dtype=object))
+        rows = np.array([self._row_of.get(s, -1) for s in sids], dtype=np.int64)
+        # Position of each key among the seeded in-progress rows, or -1
+        keys = self._key_codes(rows, courses, term_codes)
+        at = np.searchsorted(self._seed_keys, keys)
+        at[at >= len(self._seed_keys)] = 0
+        seeded = (
+            (rows >= 0) & (courses >= 0) & (term_codes >= 0)
+            & (len(self._seed_keys) > 0)
+        )
+        if len(self._seed_keys):
+            seeded &= self._seed_keys[at] == keys
+
+        touched: List[int] = []
+        rejected: List[Dict[str, Any]] = []
+        for i, (sid, cid, term, attendance, grade) in enumerate(updates):
+            row, course = int(rows[i]), int(courses[i])
+            if row < 0 or course < 0:
+                rejected.append({
+                    "index": i,
+                    "reason": (
+                        "student_id not scored (unknown or no completed enrollments)"
+                        if row < 0 else "unknown course_id"
+                    ),
+                })
+                continue
+            key = (sid, cid, term)
+            previous = self._entries.get(key)
+            if previous is None and seeded[i]:
+                j = int(at[i])
+                previous = (
+                    row, float(self._seed_attendance[j]), float(self._seed_grade[j]),
+                    float(self._credits[course]), float(self._thresholds[course]),
+                )
+            if previous is not None:
+                self._contribute(previous, -1.0)
+            # Fields not sent keep their previous value
+            entry = (
+                row,
+                float(attendance) if attendance is not None else (previous[1] if previous else np.nan),
+                float(grade) if grade is not None else (previous[2] if previous else np.nan),
+                float(self._credits[course]),
+                float(self._thresholds[course]),
+            )
+            self._contribute(entry, 1.0)
+            self._entries[key] = entry
+            self._updates[key] = (entry[1], entry[2])
+            touched.append(row)
+        return touched, rejected
+
+    def _evaluate(self, rows: np.ndarray):
+        """Flags and score of `rows` from baseline plus in-progress sums."""
+        att_n = self._ip_att_n[rows]
+        attendance = np.where(
+            att_n > 0,
+            (self._base_att_sum[rows] + self._ip_att_sum[rows])
+            / np.maximum(self._base_att_n[rows] + att_n, 1),
+            self._base_attendance[rows],
+        )
+        credits = self._ip_credits[rows]
+        gpa = np.where(
+            credits > 0,
+            np.round(
+                (self._base_qp[rows] + self._ip_qp[rows])
+                / np.maximum(self._base_credits[rows] + credits, 1e-9),
+                2,
+            ),
+            self._base_gpa[rows],
+        )
+        dfw = self._base_dfw[rows] + self._ip_dfw[rows]
+        self._last_metrics = (gpa, attendance, dfw)
+        return RiskService._evaluate(gpa, attendance, dfw, self.policy)
+
+    @timed()
+    def apply(
+        self, updates: Sequence[Tuple[Any, Any, Any, Optional[float], Optional[float]]]
+    ) -> Dict[str, Any]:
+        """
+        Apply (student_id, course_id, term, attendance_pct, grade) updates in
+        order. None leaves that field as it was. Re-evaluates only the touched
+        students. Returns the students who became at risk or were cleared.
+        """
+        with self._lock:
+            touched, rejected = self._apply_updates(updates)
+            now = time.time()
+            newly: List[Any] = []
+            cleared: List[Any] = []
+            if touched:
+                rows = np.unique(np.asarray(touched, dtype=np.int64))
+                low_gpa, low_att, has_dfw, score = self._evaluate(rows)
+                flagged = low_gpa | low_att | has_dfw
+                was = self._flagged[rows]
+                self._flagged[rows] = flagged
+                self._score[rows] = score
+                up, down = rows[flagged & ~was], rows[was & ~flagged]
+                self._became[up] = now
+                self._became[down] = np.nan
+                newly, cleared = self._ids[up].tolist(), self._ids[down].tolist()
+        _UPDATES.inc(len(updates) - len(rejected), result="applied")
+        if rejected:
+            _UPDATES.inc(len(rejected), result="rejected")
+        return {
+            "applied": len(updates) - len(rejected),
+            "rejected": rejected,
+            "students_updated": len(set(touched)),
+            "newly_at_risk": newly,
+            "cleared": cleared,
+            "as_of": _iso(now),
+        }
+
+    # ---------- Feed ----------
+
+    @timed()
+    def newly_at_risk(
+        self,
+        since: Optional[datetime] = None,
+        limit: int = 100,
+        scope: Optional["DataScope"] = None,
+    ) -> Dict[str, Any]:
+        """
+        Students at risk now who became at risk after `since` (naive
+        datetimes are UTC; None includes those flagged when the data was
+        loaded), most recent first, at most `limit`.
+        """
+        if since is not None:
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            cutoff = since.timestamp()
+        with self._lock:
+            became = self._became
+            flagged = self._flagged if since is None else self._flagged & (became > cutoff)
+            rows = np.flatnonzero(flagged)
+            if scope is not None:
+                rows = rows[[scope.allows(s) for s in self._ids[rows].tolist()]]
+            rows = rows[np.argsort(-became[rows], kind="stable")]
+            total = len(rows)
+            rows = rows[:limit]
+            low_gpa, low_att, has_dfw, score = self._evaluate(rows)
+            gpa, attendance, dfw = self._last_metrics
+            students = [
+                {
+                    "student_id": self._ids[r],
+                    "name": self._names[r],
+                    "flags": [
+                        f for f, on in zip(RiskService.FLAGS, (low_gpa[i], low_att[i], has_dfw[i]))
+                        if on
+                    ],
+                    "score": float(score[i]),
+                    "gpa": float(gpa[i]),
+                    "avg_attendance": float(attendance[i]),
+                    "dfw_count": int(dfw[i]),
+                    "became_at_risk_at": _iso(became[r]),
+                }
+                for i, r in enumerate(rows.tolist())
+            ]
+        return {"as_of": _iso(time.time()), "total": total, "students": students}
\ No newline at end of file
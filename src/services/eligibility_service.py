@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from ..domain.pass_thresholds import PassThresholds
+from ..graph.prereq_graph import PrereqGraph
+from ..utils.config_loader import load_settings
+from ..utils.perf import timed
+
+
+def _bit_matrix(rows: np.ndarray, cols: np.ndarray, n_rows: int, n_cols: int) -> np.ndarray:
+    """Packed boolean matrix (n_rows x ceil(n_cols / 8) uint8) with the given bits set."""
+    bits = np.zeros((n_rows, (n_cols + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits, (rows, cols >> 3), (0x80 >> (cols & 7)).astype(np.uint8))
+    return bits
+
+
+class EligibilityService:
+    """
+    Which catalog courses each student may take next, for all students at once.
+
+    A course is eligible for a student when every direct prerequisite has a
+    completed enrollment with a grade at or above that course's passing
+    grade (PassThresholds) and the student has not passed the course itself
+    yet.
+
+    Passed courses are kept as a bit matrix (course x student, packed 8
+    students per byte). The eligible students of a course are the bitwise
+    AND of its prerequisites' rows, so the whole student x course matrix is
+    one reduceat per chunk of courses; no per-student graph walks. Courses
+    without prerequisites ("open" courses) are not stored in the matrix.
+    A prerequisite missing from the catalog can never be satisfied.
+    """
+
+    # Courses per AND-reduce block; bounds the temporary gathered rows
+    CHUNK_COURSES = 256
+
+    @timed()
+    def __init__(
+        self,
+        students: pd.DataFrame,
+        courses: pd.DataFrame,
+        enrollments: pd.DataFrame,
+        graph: PrereqGraph,
+        pass_thresholds: Optional[PassThresholds] = None,
+    ):
+        self.pass_thresholds = pass_thresholds or PassThresholds.from_config(
+            courses, load_settings().get("risk", {})
+        )
+
+        self.student_ids = pd.Index(students["student_id"].dropna().unique())
+        self.course_ids = pd.Index(courses["course_id"].dropna().unique())
+        titles = courses.drop_duplicates("course_id").set_index("course_id")
+        self.course_titles: Dict[Any, Any] = (
+            titles["title"].to_dict() if "title" in titles.columns else {}
+        )
+        n_students, n_courses = len(self.student_ids), len(self.course_ids)
+
+        done = enrollments[
+            (enrollments["status"] == "completed").to_numpy()
+            & (
+                pd.to_numeric(enrollments["grade"], errors="coerce").to_numpy(dtype=float)
+                >= self.pass_thresholds.for_enrollments(enrollments)
+            )
+        ]
+        s = self.student_ids.get_indexer(done["student_id"])
+        c = self.course_ids.get_indexer(done["course_id"])
+        keep = (s >= 0) & (c >= 0)
+        # One extra all-zero row stands in for prerequisites not in the catalog
+        self._passed = _bit_matrix(c[keep], s[keep], n_courses + 1, n_students)
+
+        # Direct prerequisite edges from the graph's CSR, in catalog positions
+        graph._ensure_built()
+        to_catalog = self.course_ids.get_indexer(pd.Index(graph.ids, dtype=object))
+        src = to_catalog[np.repeat(np.arange(len(graph.ids)), np.diff(graph.fwd_ptr))]
+        pre = to_catalog[graph.fwd_idx]
+        keep = src >= 0
+        src, pre = src[keep], pre[keep]
+        pre[pre < 0] = n_courses
+        order = np.argsort(src, kind="stable")
+        src, pre = src[order], pre[order]
+
+        self._gated, starts = np.unique(src, return_index=True)
+        self._open = np.setdiff1d(np.arange(n_courses), self._gated)
+        self._eligible = self._compute(pre, starts)
+
+    def _compute(self, pre: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        gated = self._gated
+        eligible = np.empty((len(gated), self._passed.shape[1]), dtype=np.uint8)
+        bounds = np.append(starts, len(pre))
+        for lo in range(0, len(gated), self.CHUNK_COURSES):
+            hi = min(lo + self.CHUNK_COURSES, len(gated))
+            rows = self._passed[pre[bounds[lo]:bounds[hi]]]
+            block = np.bitwise_and.reduceat(rows, starts[lo:hi] - bounds[lo], axis=0)
+            eligible[lo:hi] = block & ~self._passed[gated[lo:hi]]
+        return eligible
+
+    @timed()
+    def eligible_courses(
+        self, student_id: str, include_open: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Courses `student_id` is newly eligible for (all prerequisites passed),
+        in catalog order. With `include_open`, courses without prerequisites
+        that the student has not passed are included too. None if unknown.
+        """
+        pos = self.student_ids.get_indexer([student_id])[0]
+        if pos < 0:
+            return None
+        byte, bit = pos >> 3, 0x80 >> (pos & 7)
+        found = self._gated[np.flatnonzero(self._eligible[:, byte] & bit)]
+        if include_open:
+            not_passed = (self._passed[self._open, byte] & bit) == 0
+            found = np.sort(np.concatenate([found, self._open[not_passed]]))
+        out = []
+        for cid in self.course_ids[found]:
+            item = {"course_id": cid}
+            title = self.course_titles.get(cid)
+            if title:
+                item["title"] = title
+            out.append(item)
+        return out
+
+    def iter_csv(
+        self,
+        students_per_block: int = 8192,
+        student_ids: Optional[Sequence[Any]] = None,
+    ) -> Iterator[str]:
+        """
+        Stream every (student_id, course_id) eligibility pair as CSV text,
+        grouped by student. Open courses are not listed. `student_ids`
+        restricts the rows to those students; None means every student.
+        """
+        yield "student_id,course_id\n"
+        n_students = len(self.student_ids)
+        allowed = None
+        if student_ids is not None:
+            allowed = self.student_ids.isin(student_ids)
+        step = max(1, students_per_block // 8)
+        for b0 in range(0, self._eligible.shape[1], step):
+            if allowed is not None and not allowed[8 * b0:8 * (b0 + step)].any():
+                continue
+            block = self._eligible[:, b0:b0 + step]
+            bits = np.unpackbits(block, axis=1, count=min(8 * step, n_students - 8 * b0))
+            stu, crs = np.nonzero(bits.T)
+            if allowed is not None:
+                keep = allowed[stu + 8 * b0]
+                stu, crs = stu[keep], crs[keep]
+            if not stu.size:
+                continue
+            frame = pd.DataFrame({
+                "student_id": self.student_ids[stu + 8 * b0],
+                "course_id": self.course_ids[self._gated[crs]],
+            })
+            yield frame.to_csv(index=False, header=False)
\ No newline at end of file
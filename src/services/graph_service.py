@@ -1,34 +1,101 @@
+import gzip
+import hashlib
+import heapq
+import json
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Set, Tuple
 from ..graph.prereq_graph import PrereqGraph
+from ..graph.closure import TransitiveClosure
+from ..graph.curriculum import CurriculumStats
+from ..utils.config_loader import load_settings
+from ..utils.metrics import cache_lookup
+from ..utils.perf import timed
 
 
 class GraphService:
     """
     Wraps PrereqGraph into dataset-aware operations.
+
+    Built from a `previous` service, a small prerequisite change (at most
+    INCREMENTAL_MAX_FRACTION of the edges) is applied as edge edits to a
+    copy of the previous graph instead of rebuilding it.
     """
 
-    def __init__(self, prereqs_df: pd.DataFrame, courses_df: pd.DataFrame = None):
-        self.graph = PrereqGraph()
-        for _, row in prereqs_df.iterrows():
-            self.graph.add_edge(row["course_id"], row["prereq_id"])
-        # Optional mapping of course_id -> title
+    INCREMENTAL_MAX_FRACTION = 0.05
+
+    @timed()
+    def __init__(
+        self,
+        prereqs_df: pd.DataFrame,
+        courses_df: pd.DataFrame = None,
+        previous: Optional["GraphService"] = None,
+    ):
+        self.prereqs_df = prereqs_df
+        self._previous = previous
+        self._changed: Optional[Set[str]] = None
+        self._closure: Optional[TransitiveClosure] = None
+        if previous is not None and previous.prereqs_df is prereqs_df:
+            # Prerequisites unchanged: share the graph and its closure, but
+            # don't keep the previous service (and its caches) alive
+            self.graph = previous.graph
+            self._closure = previous._closure
+            self._previous = None
+        elif previous is not None:
+            delta = _edge_delta(previous.prereqs_df, prereqs_df)
+            self._changed = set(delta["course_id"])
+            limit = max(64, self.INCREMENTAL_MAX_FRACTION * len(previous.prereqs_df))
+            if len(delta) <= limit:
+                self.graph = _apply_delta(previous.graph.copy(), delta)
+            else:
+                self.graph = PrereqGraph.from_frame(prereqs_df)
+        else:
+            self.graph = PrereqGraph.from_frame(prereqs_df)
+        # Optional mapping of course_id -> title (falling back to name)
         self.course_titles = {}
+        self.course_departments: Dict[str, Any] = {}
         if courses_df is not None:
-            for _, r in courses_df.iterrows():
-                cid = r.get("course_id")
-                title = r.get("title") or r.get("name") or None
-                if cid:
-                    self.course_titles[str(cid)] = title
+            cats = courses_df[courses_df["course_id"].notna()]
+            ids = cats["course_id"].astype(str)
+            keep = (ids != "").to_numpy()
+            title = pd.Series(np.nan, index=cats.index, dtype=object)
+            for col in ("title", "name"):
+                if col in cats.columns:
+                    vals = cats[col]
+                    title = title.where(title.notna(), vals.where(vals.notna() & (vals != "")))
+            title = title.astype(object).where(title.notna(), None)
+            self.course_titles = dict(zip(ids[keep], title[keep]))
+            if "department" in cats.columns:
+                dept = cats["department"].astype(object).where(cats["department"].notna(), None)
+                self.course_departments = dict(zip(ids[keep], dept[keep]))
+        self.course_credits: Dict[str, float] = {}
+        if courses_df is not None and "credits" in courses_df.columns:
+            credits = pd.to_numeric(courses_df["credits"], errors="coerce")
+            self.course_credits = dict(
+                zip(courses_df["course_id"].astype(str), credits.fillna(0.0))
+            )
+        cfg = load_settings().get("curriculum", {})
+        self.default_credit_cap: float = float(cfg.get("max_credits_per_term", 18))
+        self.default_gateway_k: int = int(cfg.get("gateway_top_k", 50))
+        self._summary: Optional[Dict[str, Any]] = None
+        self._curriculum_stats: Optional[CurriculumStats] = None
+        self._curriculum: Dict[float, pd.DataFrame] = {}
+        self._listing: Optional[PrereqListing] = None
+        self._impact: Dict[Optional[str], pd.DataFrame] = {}
 
+    @timed()
     def summary(self) -> Dict[str, Any]:
-        cycle = self.graph.has_cycle()
-        depths = {c: self.graph.depth(c) for c in self.graph.nodes}
-        dependents = {c: 0 for c in self.graph.nodes}
-        for course, pres in self.graph.adj.items():
-            for p in pres:
-                dependents[p] = dependents.get(p, 0) + 1
-        gateways = sorted(dependents.items(), key=lambda x: -x[1])[:5]
+        """Cycle flag, per-course depths and top gateway candidates (cached)."""
+        if self._summary is None:
+            self._summary = self._compute_summary()
+        return self._summary
+
+    def _compute_summary(self) -> Dict[str, Any]:
+        # One linear topological pass gives cycle flag, depths and dependents
+        topo = self.graph.topological()
+        cycle = topo.has_cycle
+        depths = topo.depths
+        gateways = heapq.nlargest(5, topo.dependents.items(), key=lambda x: x[1])
         # Convert to list of dicts for stable JSON / pydantic parsing
         gateway_list = []
         for c, cnt in gateways:
@@ -44,6 +111,163 @@ class GraphService:
             "gateway_candidates": gateway_list,
         }
 
+    @property
+    @timed()
+    def closure(self) -> TransitiveClosure:
+        """
+        Transitive-closure index of the graph, built on first use. When this
+        service replaces a previous one, only courses whose prerequisite
+        lists changed (and their dependents) are recomputed.
+        """
+        if self._closure is None:
+            prev = self._previous
+            if prev is not None and prev._closure is not None:
+                self._closure = TransitiveClosure(
+                    self.graph, previous=prev._closure, changed=self._changed
+                )
+            else:
+                self._closure = TransitiveClosure(self.graph)
+            self._previous = None  # don't keep older generations alive
+        return self._closure
+
+    def has_course(self, course_id: str) -> bool:
+        return course_id in self.graph.index or course_id in self.course_titles
+
+    def _with_titles(self, rows) -> List[Dict[str, Any]]:
+        out = []
+        for cid, dist in rows:
+            item = {"course_id": cid, "distance": dist}
+            title = self.course_titles.get(cid)
+            if title:
+                item["title"] = title
+            out.append(item)
+        return out
+
+    @timed()
+    def all_prerequisites(
+        self, course_id: str, max_distance: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Direct and indirect prerequisites of a course, nearest first."""
+        return self._with_titles(self.closure.ancestors(course_id, max_distance))
+
+    @timed()
+    def unlocked_by(
+        self, course_id: str, max_distance: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Every course that (transitively) requires `course_id`, nearest first."""
+        return self._with_titles(self.closure.descendants(course_id, max_distance))
+
+    @property
+    def curriculum_stats(self) -> CurriculumStats:
+        if self._curriculum_stats is None:
+            self._curriculum_stats = CurriculumStats(self.closure, self.course_credits)
+        return self._curriculum_stats
+
+    @timed()
+    def curriculum(
+        self, dfw_rates: pd.DataFrame, credit_cap: Optional[float] = None
+    ) -> pd.DataFrame:
+        """
+        One row per course (graph and catalog) with depth, credits,
+        prereq_credits, min_terms under `credit_cap` credits per term,
+        downstream (courses transitively requiring it), dfw_rate and
+        bottleneck_score = dfw_rate * downstream. Cached for the default
+        credit cap (other caps are computed per call); `dfw_rates` must come
+        from the same data version.
+        """
+        cap = float(credit_cap or self.default_credit_cap)
+        if cap != self.default_credit_cap:
+            return self._compute_curriculum(dfw_rates, cap)
+        cache_lookup("graph_curriculum", cap in self._curriculum)
+        if cap not in self._curriculum:
+            self._curriculum[cap] = self._compute_curriculum(dfw_rates, cap)
+        return self._curriculum[cap]
+
+    def _compute_curriculum(self, dfw_rates: pd.DataFrame, cap: float) -> pd.DataFrame:
+        df = self.curriculum_stats.to_frame(cap)
+        # Catalog courses outside the graph: no prerequisites, no dependents
+        isolated = [c for c in self.course_titles if c not in self.graph.index]
+        if isolated:
+            credits = np.array([self.course_credits.get(c, 0.0) for c in isolated])
+            df = pd.concat([df, pd.DataFrame({
+                "course_id": isolated,
+                "depth": 0,
+                "credits": credits,
+                "prereq_credits": 0.0,
+                "min_terms": np.maximum(1, np.ceil(credits / cap)).astype(np.int64),
+                "downstream": 0,
+            })], ignore_index=True)
+        df["title"] = df["course_id"].map(self.course_titles)
+        rates = dfw_rates[["course_id", "dfw_rate"]].drop_duplicates("course_id")
+        df = df.merge(rates, on="course_id", how="left")
+        df["bottleneck_score"] = (df["dfw_rate"].fillna(0.0) * df["downstream"]).round(4)
+        return df
+
+    @timed()
+    def gateway_impact(
+        self,
+        outcomes: pd.DataFrame,
+        term: Optional[str] = None,
+        department: Optional[str] = None,
+        k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-`k` gateway courses by impact = downstream reach x enrollments
+        x DFW rate (i.e. reach x number of D/F/W outcomes), highest first.
+
+        `outcomes` is AnalyticsService.course_term_outcomes() of the same
+        data version; `term` restricts it to one term. The per-term table is
+        cached for the terms present in `outcomes` (an unknown term has no
+        outcomes to rank); top-k selection is an argpartition, not a full sort.
+        """
+        term = term or None
+        if term is not None and not (outcomes["term"] == term).any():
+            return []
+        table = self._impact.get(term)
+        cache_lookup("graph_impact", table is not None)
+        if table is None:
+            table = self._impact[term] = self._impact_table(outcomes, term)
+        rows = np.flatnonzero(table["impact"].to_numpy() > 0)
+        if department:
+            rows = rows[table["department"].to_numpy()[rows] == department]
+        k = k or self.default_gateway_k
+        impact = table["impact"].to_numpy()[rows]
+        if len(rows) > k:
+            top = np.argpartition(-impact, k - 1)[:k]
+            rows, impact = rows[top], impact[top]
+        rows = rows[np.lexsort((rows, -impact))]
+        out = table.iloc[rows]
+        return out.astype(object).where(out.notna(), None).to_dict(orient="records")
+
+    def _impact_table(self, outcomes: pd.DataFrame, term: Optional[str]) -> pd.DataFrame:
+        if term:
+            outcomes = outcomes[outcomes["term"] == term]
+        totals = outcomes.groupby("course_id")[["enrollments", "dfw_count"]].sum()
+        closure = self.closure
+        table = pd.DataFrame({
+            "course_id": closure.ids,
+            "reach": np.diff(closure.desc_ptr),
+        }).join(totals, on="course_id")
+        table[["enrollments", "dfw_count"]] = (
+            table[["enrollments", "dfw_count"]].fillna(0).astype(np.int64)
+        )
+        table["dfw_rate"] = (
+            table["dfw_count"] / table["enrollments"].where(table["enrollments"] > 0)
+        ).round(4)
+        table["impact"] = table["reach"] * table["dfw_count"]
+        table["title"] = table["course_id"].map(self.course_titles)
+        table["department"] = table["course_id"].map(self.course_departments)
+        return table
+
+    @property
+    @timed()
+    def full_listing(self) -> "PrereqListing":
+        """Serialized /graph/prerequisites/full payload (built once per instance)."""
+        if self._listing is None:
+            self._listing = PrereqListing(self)
+        return self._listing
+
+    @timed()
     def adjacency(self) -> Dict[str, Any]:
         # Return adjacency with optional titles for each prerequisite
         out: Dict[str, Any] = {}
@@ -56,4 +280,112 @@ class GraphService:
                     item["title"] = title
                 lst.append(item)
             out[course] = lst
-        return out
\ No newline at end of file
+        return out
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class PrereqListing:
+    """
+    Every course with its title and direct prerequisites, in the
+    /graph/prerequisites/full JSON shape, serialized once per data version.
+
+    Each course is stored as one pre-encoded JSON fragment, so the full
+    body is a precomputed bytes object (plus its gzip and ETag) and a page
+    or a department filter is a join over the selected fragments.
+    """
+
+    def __init__(self, service: "GraphService"):
+        graph = service.graph
+        titles = service.course_titles
+        graph._ensure_built()
+
+        def ref(cid: str, with_null_title: bool = False) -> Dict[str, Any]:
+            item: Dict[str, Any] = {"course_id": cid}
+            title = titles.get(str(cid))
+            if title or with_null_title:
+                item["title"] = title
+            return item
+
+        # Each prerequisite reference is encoded once, then reused per edge
+        refs = [_dumps(ref(cid)) for cid in graph.ids]
+        ptr, idx = graph.fwd_ptr, graph.fwd_idx
+        fragments = []
+        for i, cid in enumerate(graph.ids):
+            head = _dumps(ref(cid))[:-1]
+            pres = ",".join(refs[j] for j in idx[ptr[i]:ptr[i + 1]].tolist())
+            fragments.append(f'{head},"prerequisites":[{pres}]}}'.encode("utf-8"))
+        ids = list(graph.ids)
+        # Catalog courses without any prerequisite edge
+        for cid in titles:
+            if cid not in graph.index:
+                item = ref(cid, with_null_title=True)
+                item["prerequisites"] = []
+                fragments.append(_dumps(item).encode("utf-8"))
+                ids.append(cid)
+
+        self.fragments = fragments
+        self.departments = np.array(
+            [service.course_departments.get(str(c)) for c in ids], dtype=object
+        )
+        self.body = self._join(fragments)
+        self.etag = _etag(self.body)
+        self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+
+    @staticmethod
+    def _join(fragments: List[bytes]) -> bytes:
+        return b"[" + b",".join(fragments) + b"]"
+
+    def select(
+        self,
+        department: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[bytes, str, int]:
+        """
+        JSON body and ETag for one department and/or page, plus the number
+        of courses matching before paging. Without arguments this is the
+        prebuilt body.
+        """
+        if department is None and offset == 0 and limit is None:
+            return self.body, self.etag, len(self.fragments)
+        rows = (
+            np.flatnonzero(self.departments == department)
+            if department is not None
+            else np.arange(len(self.fragments))
+        )
+        total = len(rows)
+        end = total if limit is None else offset + limit
+        fragments = self.fragments
+        body = self._join([fragments[i] for i in rows[offset:end].tolist()])
+        return body, _etag(body), total
+
+
+def _edge_delta(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    (course_id, prereq_id, old_count, new_count) for every prerequisite
+    edge whose number of occurrences differs between two edge frames.
+    """
+    cols = ["course_id", "prereq_id"]
+    a = old[cols].dropna().astype(str).value_counts().rename("old_count")
+    b = new[cols].dropna().astype(str).value_counts().rename("new_count")
+    both = pd.concat([a, b], axis=1).fillna(0).astype(int)
+    return both[both["old_count"] != both["new_count"]].reset_index()
+
+
+def _apply_delta(graph: PrereqGraph, delta: pd.DataFrame) -> PrereqGraph:
+    """Edit `graph` in place to match an _edge_delta(); removals go first."""
+    rows = list(delta.itertuples(index=False))
+    for course_id, prereq_id, old_count, _ in rows:
+        if old_count:
+            graph.remove_edge(course_id, prereq_id)
+    for course_id, prereq_id, _, new_count in rows:
+        for _ in range(new_count):
+            # uploads may introduce cycles; they are reported, not rejected
+            graph.add_edge(course_id, prereq_id)
+    return graph
\ No newline at end of file
@@ -23,7 +23,9 @@ class LoaderService:
         self.datasets: Dict[str, pd.DataFrame] = load_csvs(base_dir)
         validate_students(self.datasets["students"])
         validate_courses(self.datasets["courses"])
-        validate_enrollments(self.datasets["enrollments"])
+        self.datasets["enrollments"] = validate_enrollments(
+            self.datasets["enrollments"]
+        )
 
     def get_datasets(self) -> Dict[str, pd.DataFrame]:
         return self.datasets
\ No newline at end of file
@@ -0,0 +1,139 @@
+import base64
+import json
+import threading
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class RankedIndex:
+    """
+    Presorted row orders of one per-version table (at-risk list, student
+    summary), for top-k and paged reads.
+
+    Each sort key's order is an argsort computed on first use and kept with
+    its inverse (row -> rank). An unfiltered page is a slice of the order,
+    O(offset + k). A filtered or scoped page sorts the ranks of the allowed
+    rows instead of the rows themselves. Ties keep the table order and
+    missing values sort last in either direction.
+
+    Cursors are opaque and carry the sort and the last row's id and value.
+    The next page starts after that row. If the row is gone (e.g. a newer
+    data version), it starts after the value instead.
+    """
+
+    def __init__(self, ids: np.ndarray, keys: Mapping[str, np.ndarray]):
+        self.ids = ids
+        self._id_rows = pd.Index(ids)
+        self._keys = {name: np.asarray(values, dtype=float) for name, values in keys.items()}
+        self._lock = threading.Lock()
+        self._orders: Dict[Tuple[str, bool], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def sort_keys(self) -> Tuple[str, ...]:
+        return tuple(self._keys)
+
+    def positions_of(self, ids: Sequence[Any]) -> np.ndarray:
+        """Sorted positions of the given ids (unknown ids are skipped)."""
+        pos = self._id_rows.get_indexer_for(pd.Index(ids))
+        return np.unique(pos[pos >= 0])
+
+    def _order(self, sort_by: str, descending: bool) -> Tuple[np.ndarray, np.ndarray]:
+        if sort_by not in self._keys:
+            raise ValueError(
+                f"Unknown sort_by {sort_by!r}; expected one of {', '.join(self._keys)}"
+            )
+        key = (sort_by, descending)
+        hit = self._orders.get(key)
+        if hit is not None:
+            return hit
+        values = self._keys[sort_by]
+        order = np.argsort(-values if descending else values, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        with self._lock:
+            self._orders[key] = (order, rank)
+        return order, rank
+
+    def select(
+        self,
+        sort_by: str,
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, int, Optional[str]]:
+        """
+        Positions of one page, the number of matching rows, and the cursor
+        of the next page (None on the last page). `rows` restricts the
+        ranking to those positions; None means every row.
+        """
+        order, rank = self._order(sort_by, descending)
+        start = 0
+        if cursor is not None:
+            start = self._resume(cursor, sort_by, descending, order, rank)
+        if rows is None:
+            total = len(order)
+            ranks = None
+        else:
+            ranks = np.sort(rank[rows])
+            total = len(ranks)
+            start = int(np.searchsorted(ranks, start))
+        start += offset
+        stop = total if limit is None else min(start + limit, total)
+        start = min(start, stop)
+        if ranks is None:
+            positions = order[start:stop]
+        else:
+            positions = order[ranks[start:stop]]
+        next_cursor = None
+        if stop < total and len(positions):
+            last = positions[-1]
+            next_cursor = _encode(
+                sort_by, descending, self.ids[last], float(self._keys[sort_by][last])
+            )
+        return positions, total, next_cursor
+
+    def _resume(
+        self,
+        cursor: str,
+        sort_by: str,
+        descending: bool,
+        order: np.ndarray,
+        rank: np.ndarray,
+    ) -> int:
+        """Rank of the first row after the cursor's row."""
+        state = _decode(cursor)
+        if state.get("sort_by") != sort_by or state.get("descending") != descending:
+            raise ValueError("Cursor belongs to a different sort_by/order")
+        row = self._id_rows.get_indexer([state.get("after")])[0]
+        if row >= 0:
+            return int(rank[row]) + 1
+        value = float(state.get("value", np.nan))
+        values = self._keys[sort_by][order]
+        if descending:
+            values, value = -values, -value
+        return int(np.searchsorted(values, value, side="right"))
+
+
+def _encode(sort_by: str, descending: bool, after: Any, value: float) -> str:
+    after = after.item() if isinstance(after, np.generic) else after
+    state = {"sort_by": sort_by, "descending": descending, "after": after, "value": value}
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
\ No newline at end of file
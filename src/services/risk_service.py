@@ -1,7 +1,18 @@
+import itertools
+import math
+
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
+from ..domain.pass_thresholds import PassThresholds
 from ..utils.config_loader import load_settings
+from ..utils.metrics import cache_lookup
+from ..utils.perf import timed
+from .ranking import RankedIndex
+
+if TYPE_CHECKING:
+    from .scope_service import DataScope
 
 
 class RiskService:
@@ -9,7 +20,8 @@ class RiskService:
     Computes risk flags and a composite risk score for students based on:
     - GPA
     - Attendance
-    - DFW history (grades < dfw_grade_threshold)
+    - DFW history (completed grades below the course's passing grade;
+      PassThresholds, default dfw_grade_threshold)
 
     Risk rules (from config):
     - LOW_GPA:         GPA < gpa_threshold
@@ -27,14 +39,39 @@ class RiskService:
           + dfw_weight        * dfw_load
     """
 
-    def __init__(self, gpa_table: pd.DataFrame, enrollments: pd.DataFrame):
+    # Policy parameters a simulation scenario can set (the rest default to config)
+    POLICY_FIELDS = (
+        "gpa_threshold",
+        "attendance_threshold",
+        "dfw_grade_threshold",
+        "gpa_weight",
+        "attendance_weight",
+        "dfw_weight",
+    )
+    FLAGS = ("LOW_GPA", "LOW_ATTENDANCE", "DFW_HISTORY")
+    MAX_SCENARIOS = 2000
+    # Scenario x student cells evaluated per broadcast block (bounds memory)
+    SIMULATION_BLOCK_CELLS = 500_000
+
+    @timed()
+    def __init__(
+        self,
+        gpa_table: pd.DataFrame,
+        enrollments: pd.DataFrame,
+        pass_thresholds: Optional[PassThresholds] = None,
+    ):
         self.gpa_table = gpa_table.copy()
         self.enrollments = enrollments.copy()
 
         cfg = load_settings().get("risk", {})
         self.gpa_threshold: float = float(cfg.get("gpa_threshold", 2.0))
         self.attendance_threshold: float = float(cfg.get("attendance_threshold", 70.0))
-        self.dfw_cutoff: float = float(cfg.get("dfw_grade_threshold", 60.0))
+        # Without course data every course uses the configured default
+        self.pass_thresholds = pass_thresholds or PassThresholds(
+            None, default=float(cfg.get("dfw_grade_threshold", 60.0))
+        )
+        self.dfw_cutoff: float = self.pass_thresholds.default
+        self._source_enrollments = enrollments
 
         self.gpa_weight: float = float(cfg.get("gpa_weight", 1.0))
         self.attendance_weight: float = float(cfg.get("attendance_weight", 1.0))
@@ -42,6 +79,47 @@ class RiskService:
 
         # Precompute per-student attendance & dfw_count (joined with GPA)
         self._student_metrics = self._compute_student_risk_metrics()
+        self._at_risk: Optional[List[Dict[str, Any]]] = None
+        self._at_risk_rows: Optional[np.ndarray] = None
+        self._at_risk_score: Optional[np.ndarray] = None
+        self._at_risk_ranking: Optional[RankedIndex] = None
+
+        # The same metrics as aligned arrays, one entry per student row
+        metrics = self._student_metrics
+        self._ids = metrics["student_id"].to_numpy()
+        self._rows = pd.Index(self._ids)
+        self._gpa = metrics["gpa"].to_numpy(dtype=float)
+        self._attendance = metrics["avg_attendance"].to_numpy(dtype=float)
+        self._dfw = metrics["dfw_count"].to_numpy()
+        # DFW counts at other grade cutoffs are counted per call, not kept
+        self._graded: Optional[tuple] = None
+
+    def policy(self) -> Dict[str, float]:
+        """The configured thresholds and weights, keyed like POLICY_FIELDS."""
+        return {
+            "gpa_threshold": self.gpa_threshold,
+            "attendance_threshold": self.attendance_threshold,
+            "dfw_grade_threshold": self.dfw_cutoff,
+            "gpa_weight": self.gpa_weight,
+            "attendance_weight": self.attendance_weight,
+            "dfw_weight": self.dfw_weight,
+        }
+
+    def metric_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The per-student metrics behind the flags, as aligned arrays (one entry
+        per GPA-table student): student_id, gpa, avg_attendance, dfw_count,
+        total_credits and quality_points. Treat them as read-only.
+        """
+        metrics = self._student_metrics
+        return {
+            "student_id": self._ids,
+            "gpa": self._gpa,
+            "avg_attendance": self._attendance,
+            "dfw_count": self._dfw,
+            "total_credits": metrics["total_credits"].to_numpy(dtype=float),
+            "quality_points": metrics["quality_points"].to_numpy(dtype=float),
+        }
 
     def _compute_student_risk_metrics(self) -> pd.DataFrame:
         """
@@ -51,8 +129,9 @@ class RiskService:
         - dfw_count
         - any extra columns already in gpa_table (e.g., name, major, cohort_year)
         """
-        enr = self.enrollments.copy()
-        enr = enr[enr["status"] == "completed"]
+        completed = (self.enrollments["status"] == "completed").to_numpy()
+        enr = self.enrollments[completed]
+        threshold = self.pass_thresholds.for_enrollments(self._source_enrollments)
 
         # Attendance per student
         attendance = (
@@ -61,8 +140,8 @@ class RiskService:
             .rename("avg_attendance")
         )
 
-        # DFW count per student (grade < dfw_cutoff)
-        dfw_mask = enr["grade"] < self.dfw_cutoff
+        # DFW count per student (grade below the course's passing grade)
+        dfw_mask = enr["grade"].to_numpy(dtype=float) < threshold[completed]
         dfw_count = (
             enr[dfw_mask]
             .groupby("student_id")["course_id"]
@@ -81,60 +160,55 @@ class RiskService:
         metrics["dfw_count"] = metrics["dfw_count"].fillna(0).astype(int)
         return metrics
 
+    def _row(self, student_id: str) -> int:
+        """Row of a student in the metric arrays, -1 when unknown."""
+        return int(self._rows.get_indexer([student_id])[0])
+
     def risk_flags_for(self, student_id: str) -> List[str]:
         """
         Return textual flags like ["LOW_GPA", "LOW_ATTENDANCE", "DFW_HISTORY"].
         """
-        row = self._student_metrics[
-            self._student_metrics["student_id"] == student_id
-        ]
-        if row.empty:
+        i = self._row(student_id)
+        if i < 0:
             return []
-
-        row = row.iloc[0]
-        flags: List[str] = []
-
-        gpa = float(row["gpa"])
-        if gpa < self.gpa_threshold:
-            flags.append("LOW_GPA")
-
-        avg_att = float(row["avg_attendance"])
-        if avg_att < self.attendance_threshold:
-            flags.append("LOW_ATTENDANCE")
-
-        dfw_count = int(row["dfw_count"])
-        if dfw_count > 0:
-            flags.append("DFW_HISTORY")
-
-        return flags
+        low_gpa, low_att, has_dfw, _ = self._evaluate(
+            self._gpa[i], self._attendance[i], self._dfw[i], self.policy()
+        )
+        return [f for f, on in zip(self.FLAGS, (low_gpa, low_att, has_dfw)) if on]
 
     def risk_score_for(self, student_id: str) -> float:
         """
         Compute the composite risk score for a student.
         """
-        row = self._student_metrics[
-            self._student_metrics["student_id"] == student_id
-        ]
-        if row.empty:
+        i = self._row(student_id)
+        if i < 0:
             return 0.0
+        *_, score = self._evaluate(
+            self._gpa[i], self._attendance[i], self._dfw[i], self.policy()
+        )
+        return float(score)
 
-        row = row.iloc[0]
-        gpa = float(row["gpa"])
-        avg_att = float(row["avg_attendance"])
-        dfw_count = int(row["dfw_count"])
-
-        gpa_deficit = max(0.0, self.gpa_threshold - gpa)
-        attendance_deficit = max(0.0, self.attendance_threshold - avg_att) / 100.0
-        dfw_load = dfw_count
-
+    @staticmethod
+    def _evaluate(gpa, attendance, dfw_count, policy: Dict[str, Any]):
+        """
+        Flags and composite score under `policy`. Works elementwise, so
+        student arrays (n,) broadcast against scenario columns (s, 1).
+        A missing GPA raises no LOW_GPA flag and adds no GPA deficit.
+        """
+        low_gpa = gpa < policy["gpa_threshold"]
+        low_att = attendance < policy["attendance_threshold"]
+        has_dfw = dfw_count > 0
+        gpa_deficit = np.fmax(0.0, policy["gpa_threshold"] - gpa)
+        attendance_deficit = np.fmax(0.0, policy["attendance_threshold"] - attendance) / 100.0
         score = (
-            self.gpa_weight * gpa_deficit
-            + self.attendance_weight * attendance_deficit
-            + self.dfw_weight * dfw_load
+            policy["gpa_weight"] * gpa_deficit
+            + policy["attendance_weight"] * attendance_deficit
+            + policy["dfw_weight"] * dfw_count
         )
-        return float(score)
+        return low_gpa, low_att, has_dfw, score
 
-    def at_risk_students(self) -> List[Dict[str, Any]]:
+    @timed()
+    def at_risk_students(self, scope: Optional["DataScope"] = None) -> List[Dict[str, Any]]:
         """
         Return a list of students who have any risk flags, including:
         - student_id, name, gpa
@@ -142,25 +216,256 @@ class RiskService:
         - score (composite risk score)
         - avg_attendance, dfw_count (for convenience)
         Sorted by descending risk score.
+
+        The list is computed once per RiskService instance; with `scope`,
+        only that DataScope's students are returned.
         """
+        cache_lookup("risk", self._at_risk is not None)
+        if self._at_risk is None:
+            self._at_risk = self._compute_at_risk_students()
+        if scope is not None:
+            return scope.per_student_records(self._at_risk)
+        return list(self._at_risk)
+
+    def _compute_at_risk_students(self) -> List[Dict[str, Any]]:
+        low_gpa, low_att, has_dfw, score = self._evaluate(
+            self._gpa, self._attendance, self._dfw, self.policy()
+        )
+        flagged = np.flatnonzero(low_gpa | low_att | has_dfw)
+        # Highest score first; ties keep the GPA table order
+        order = flagged[np.argsort(-score[flagged], kind="stable")]
+
+        metrics = self._student_metrics
+        names = metrics["name"].to_numpy() if "name" in metrics.columns else None
+        gpa, attendance = self._gpa.tolist(), self._attendance.tolist()
+        dfw, scores = self._dfw.tolist(), score.tolist()
+        flag_columns = (low_gpa.tolist(), low_att.tolist(), has_dfw.tolist())
+
+        # Metric rows and scores of the list entries, for at_risk_page()
+        self._at_risk_rows, self._at_risk_score = order, score[order]
+        results: List[Dict[str, Any]] = []
+        for i in order.tolist():
+            results.append(
+                {
+                    "student_id": self._ids[i],
+                    "name": names[i] if names is not None else "",
+                    "gpa": gpa[i],
+                    "flags": [f for f, col in zip(self.FLAGS, flag_columns) if col[i]],
+                    "score": scores[i],
+                    "avg_attendance": attendance[i],
+                    "dfw_count": int(dfw[i]),
+                }
+            )
+        return results
+
+    # Sort keys of at_risk_page(); "score" is the list's own order
+    AT_RISK_SORT_KEYS = ("score", "gpa", "avg_attendance", "dfw_count")
+
+    def _ranking(self) -> RankedIndex:
+        if self._at_risk_ranking is None:
+            self.at_risk_students()
+            rows = self._at_risk_rows
+            self._at_risk_ranking = RankedIndex(
+                self._ids[rows],
+                {
+                    "score": self._at_risk_score,
+                    "gpa": self._gpa[rows],
+                    "avg_attendance": self._attendance[rows],
+                    "dfw_count": self._dfw[rows],
+                },
+            )
+        return self._at_risk_ranking
+
+    @timed()
+    def at_risk_page(
+        self,
+        sort_by: str = "score",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        major: Optional[str] = None,
+        cohort_year: Optional[int] = None,
+        scope: Optional["DataScope"] = None,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        One page of the at-risk list sorted by any of AT_RISK_SORT_KEYS:
+        (entries, matching count, next-page cursor or None). The orders are
+        precomputed per key, so an unfiltered top-k costs O(k).
+        Raises ValueError for an unknown sort key or a bad cursor.
+        """
+        ranking = self._ranking()
+        rows = None
+        if scope is not None:
+            rows = scope.record_positions(self._at_risk)
+        if major or cohort_year is not None:
+            metrics = self._student_metrics
+            keep = np.ones(len(ranking), dtype=bool)
+            if major:
+                keep &= metrics["major"].to_numpy()[self._at_risk_rows] == major
+            if cohort_year is not None:
+                keep &= metrics["cohort_year"].to_numpy()[self._at_risk_rows] == cohort_year
+            matching = np.flatnonzero(keep)
+            rows = matching if rows is None else np.intersect1d(rows, matching)
+        positions, total, next_cursor = ranking.select(
+            sort_by, descending, offset, limit, cursor, rows
+        )
+        return [self._at_risk[i] for i in positions.tolist()], total, next_cursor
+
+    # ---------- What-if simulation ----------
+
+    def _dfw_counts(self, cutoff: float) -> np.ndarray:
+        """
+        Per-student count of completed grades below the passing grade, with
+        `cutoff` as the default for courses without a threshold of their own.
+        Only the configured cutoff's counts are kept; simulations may send
+        any number of other cutoffs.
+        """
+        if cutoff == self.dfw_cutoff:
+            return self._dfw
+        if self._graded is None:
+            rows = self._rows.get_indexer(self.enrollments["student_id"])
+            keep = (self.enrollments["status"] == "completed").to_numpy() & (rows >= 0)
+            grades = self.enrollments["grade"].to_numpy(dtype=float)
+            self._graded = (keep, rows[keep], grades[keep])
+        keep, rows, grades = self._graded
+        threshold = self.pass_thresholds.for_enrollments(
+            self._source_enrollments, default=cutoff
+        )[keep]
+        return np.bincount(rows[grades < threshold], minlength=len(self._ids))
+
+    @classmethod
+    def expand_grid(
+        cls, grid: Dict[str, List[float]], extra: int = 0
+    ) -> List[Dict[str, float]]:
+        """
+        Cartesian product of per-field value lists, as scenario dicts.
+        `extra` counts scenarios sent alongside the grid; the total is
+        checked against MAX_SCENARIOS before the product is built.
+        """
+        unknown = sorted(set(grid) - set(cls.POLICY_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown policy fields: {', '.join(unknown)}")
+        fields = [f for f in cls.POLICY_FIELDS if grid.get(f)]
+        size = math.prod(len(grid[f]) for f in fields)
+        if size + extra > cls.MAX_SCENARIOS:
+            raise ValueError(f"At most {cls.MAX_SCENARIOS} scenarios per simulation")
+        return [
+            dict(zip(fields, values))
+            for values in itertools.product(*(grid[f] for f in fields))
+        ]
+
+    @timed()
+    def simulate(
+        self,
+        scenarios: List[Dict[str, float]],
+        bins: int = 20,
+        delta_limit: int = 50,
+        scope: Optional["DataScope"] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate alternative policies against the precomputed metric arrays.
+
+        Each scenario sets any of POLICY_FIELDS; unset fields keep the
+        configured value. `dfw_grade_threshold` is the default passing grade:
+        courses with their own or a department threshold keep it. Scenarios
+        are evaluated in blocks by broadcasting (scenarios, 1) policy columns
+        against (students,) metric arrays.
+        Each scenario reports its flagged count and per-flag counts, a
+        histogram of flagged students' scores (shared `score_bins` edges),
+        and the students it newly flags or clears compared with the current
+        policy (counts, plus up to `delta_limit` ids, highest score first).
+        The current policy is reported the same way as `current`.
+        """
+        if len(scenarios) > self.MAX_SCENARIOS:
+            raise ValueError(f"At most {self.MAX_SCENARIOS} scenarios per simulation")
+        current = self.policy()
+        policies = [current] + [{**current, **scenario} for scenario in scenarios]
+        columns = {
+            f: np.array([float(p[f]) for p in policies]) for f in self.POLICY_FIELDS
+        }
+        for f in ("gpa_weight", "attendance_weight", "dfw_weight"):
+            if (columns[f] < 0).any():
+                raise ValueError(f"{f} must not be negative")
+
+        rows = scope.positions(self._student_metrics) if scope is not None else slice(None)
+        gpa, attendance, ids = self._gpa[rows], self._attendance[rows], self._ids[rows]
+        cutoffs, cutoff_of = np.unique(columns["dfw_grade_threshold"], return_inverse=True)
+        dfw = np.stack([self._dfw_counts(float(c))[rows] for c in cutoffs])
+        n = len(ids)
+
+        # Shared histogram edges: 0 up to the largest score any scenario can give
+        bound = (
+            columns["gpa_weight"]
+            * np.fmax(0.0, columns["gpa_threshold"] - np.nanmin(gpa, initial=np.inf))
+            + columns["attendance_weight"]
+            * np.fmax(0.0, columns["attendance_threshold"] - attendance.min(initial=np.inf)) / 100.0
+            + columns["dfw_weight"] * dfw.max(axis=1, initial=0)[cutoff_of]
+        )
+        top = float(bound.max()) if n else 0.0
+        edges = np.linspace(0.0, top if top > 0 else 1.0, bins + 1)
+        width = edges[1] - edges[0]
+
+        base_flagged = base_score = None
         results: List[Dict[str, Any]] = []
+        block = max(1, self.SIMULATION_BLOCK_CELLS // max(n, 1))
+        for start in range(0, len(policies), block):
+            stop = min(start + block, len(policies))
+            k = stop - start
+            policy = {f: columns[f][start:stop, None] for f in self.POLICY_FIELDS}
+            low_gpa, low_att, has_dfw, score = self._evaluate(
+                gpa, attendance, dfw[cutoff_of[start:stop]], policy
+            )
+            flagged = low_gpa | low_att | has_dfw
+            if base_flagged is None:
+                base_flagged, base_score = flagged[0], score[0]
+
+            n_flagged = flagged.sum(axis=1)
+            flag_counts = [m.sum(axis=1) for m in (low_gpa, low_att, has_dfw)]
+            flagged_score = np.where(flagged, score, 0.0)
+            score_sum = flagged_score.sum(axis=1)
+            score_max = np.where(flagged, score, -np.inf).max(axis=1, initial=-np.inf)
+            bucket = np.minimum((score / width).astype(np.intp), bins - 1)
+            bucket += np.arange(k)[:, None] * bins
+            histogram = np.bincount(bucket[flagged], minlength=k * bins).reshape(k, bins)
+            added = flagged & ~base_flagged
+            removed = base_flagged & ~flagged
+
+            for j in range(k):
+                count = int(n_flagged[j])
+                results.append(
+                    {
+                        "policy": {f: float(columns[f][start + j]) for f in self.POLICY_FIELDS},
+                        "flagged": count,
+                        "flag_counts": {
+                            f: int(c[j]) for f, c in zip(self.FLAGS, flag_counts)
+                        },
+                        "score_mean": float(score_sum[j] / count) if count else None,
+                        "score_max": float(score_max[j]) if count else None,
+                        "score_histogram": histogram[j].tolist(),
+                        "newly_flagged": int(added[j].sum()),
+                        "no_longer_flagged": int(removed[j].sum()),
+                        "newly_flagged_ids": _top_ids(ids, added[j], score[j], delta_limit),
+                        "no_longer_flagged_ids": _top_ids(
+                            ids, removed[j], base_score, delta_limit
+                        ),
+                    }
+                )
+
+        return {
+            "students": n,
+            "score_bins": edges.tolist(),
+            "current": results[0],
+            "scenarios": results[1:],
+        }
+
 
-        for _, row in self._student_metrics.iterrows():
-            sid = row["student_id"]
-            flags = self.risk_flags_for(sid)
-            if not flags:
-                continue
-
-            entry = {
-                "student_id": sid,
-                "name": row.get("name", ""),
-                "gpa": float(row["gpa"]),
-                "flags": flags,
-                "score": self.risk_score_for(sid),
-                "avg_attendance": float(row["avg_attendance"]),
-                "dfw_count": int(row["dfw_count"]),
-            }
-            results.append(entry)
-
-        results.sort(key=lambda r: r["score"], reverse=True)
-        return results
\ No newline at end of file
+def _top_ids(ids: np.ndarray, mask: np.ndarray, score: np.ndarray, limit: int) -> List[Any]:
+    """Ids where `mask` is set, highest score first, at most `limit`."""
+    rows = np.flatnonzero(mask)
+    if limit <= 0 or not len(rows):
+        return []
+    if len(rows) > limit:
+        rows = rows[np.argpartition(-score[rows], limit - 1)[:limit]]
+    rows = rows[np.argsort(-score[rows], kind="stable")]
+    return ids[rows].tolist()
\ No newline at end of file
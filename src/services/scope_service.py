@@ -0,0 +1,201 @@
+from collections import OrderedDict
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..utils.metrics import cache_lookup
+
+_EMPTY = np.zeros(0, dtype=np.intp)
+
+
+def _row_groups(frame: pd.DataFrame, column: str) -> Dict[Any, np.ndarray]:
+    """value -> positions of the rows holding it (empty if the column is missing)."""
+    if column not in frame.columns or frame.empty:
+        return {}
+    return frame.groupby(column, sort=False, dropna=True).indices
+
+
+def _gather(groups: Dict[Any, np.ndarray], keys: Sequence[Any]) -> np.ndarray:
+    parts = [groups[k] for k in keys if k in groups]
+    return np.sort(np.concatenate(parts)) if parts else _EMPTY
+
+
+class DataScope:
+    """
+    The rows one principal may see, as precomputed row positions into the
+    students and enrollments tables of a snapshot. Scoping a table is a
+    `take`, not a boolean mask over the whole table.
+    """
+
+    # Per-student tables whose positions are remembered per scope
+    MAX_CACHED_TABLES = 8
+
+    def __init__(
+        self,
+        key: tuple,
+        students: pd.DataFrame,
+        enrollments: pd.DataFrame,
+        student_rows: np.ndarray,
+        enrollment_rows: np.ndarray,
+    ):
+        self.key = key
+        self._students = students
+        self._enrollments = enrollments
+        self.student_rows = student_rows
+        self.enrollment_rows = enrollment_rows
+        if "student_id" in students.columns:
+            ids = students["student_id"].to_numpy()[student_rows]
+        else:
+            ids = enrollments["student_id"].to_numpy()[enrollment_rows]
+        self.student_ids = pd.Index(pd.unique(ids))
+        self._id_set = frozenset(self.student_ids)
+        self._lock = threading.Lock()
+        self._positions: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def allows(self, student_id: Any) -> bool:
+        return student_id in self._id_set
+
+    def students(self) -> pd.DataFrame:
+        return self._students.take(self.student_rows)
+
+    def enrollments(self) -> pd.DataFrame:
+        return self._enrollments.take(self.enrollment_rows)
+
+    def _positions_in(self, table: Any, ids: Sequence[Any]) -> np.ndarray:
+        """Positions of this scope's students in a per-student table, cached per table."""
+        with self._lock:
+            hit = self._positions.get(id(table))
+            if hit is not None and hit[0] is table:
+                self._positions.move_to_end(id(table))
+                return hit[1]
+        pos = pd.Index(ids).get_indexer_for(self.student_ids)
+        pos = np.sort(pos[pos >= 0])
+        with self._lock:
+            # The table itself is kept so its id() cannot be reused meanwhile
+            self._positions[id(table)] = (table, pos)
+            while len(self._positions) > self.MAX_CACHED_TABLES:
+                self._positions.popitem(last=False)
+        return pos
+
+    def positions(self, frame: pd.DataFrame) -> np.ndarray:
+        """Positions of the in-scope rows of a table keyed by student_id."""
+        return self._positions_in(frame, frame["student_id"])
+
+    def per_student(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Rows of a table keyed by student_id (GPA table, summaries) in scope."""
+        return frame.take(self.positions(frame))
+
+    def record_positions(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Positions of the in-scope dicts of a list with a 'student_id' key."""
+        return self._positions_in(records, [r["student_id"] for r in records])
+
+    def per_student_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Same as per_student for a list of dicts with a 'student_id' key."""
+        pos = self.record_positions(records)
+        return [records[i] for i in pos.tolist()]
+
+
+class ScopeService:
+    """
+    Row-level scoping for one data version.
+
+    Row positions are grouped once per snapshot by student_id (students and
+    enrollments), by course department (enrollments) and, when the students
+    table has an `advisor_id` column, by advisor. A principal's DataScope is
+    assembled from those groups on first use and cached:
+
+    - admin (or anonymous callers): unrestricted, scope_for returns None
+    - student: their own rows
+    - advisor: their caseload (students.advisor_id == username); unrestricted
+      when the data has no advisor_id column
+    - faculty: enrollments in courses of user["department"] and those
+      students; unrestricted when the user has no department
+    - any other role: an empty scope
+    """
+
+    MAX_CACHED_SCOPES = 1024
+
+    def __init__(
+        self,
+        students: pd.DataFrame,
+        courses: pd.DataFrame,
+        enrollments: pd.DataFrame,
+    ):
+        self.students = students
+        self.enrollments = enrollments
+        self._student_rows = _row_groups(students, "student_id")
+        self._enrollment_rows = _row_groups(enrollments, "student_id")
+        self._advisor_rows = _row_groups(students, "advisor_id")
+        self.has_caseloads = "advisor_id" in students.columns
+
+        if courses is not None and "department" in courses.columns:
+            dept = courses.drop_duplicates("course_id").set_index("course_id")["department"]
+            by_dept = pd.DataFrame({"department": enrollments["course_id"].map(dept)})
+            self._department_rows = _row_groups(by_dept, "department")
+        else:
+            self._department_rows = {}
+
+        self._lock = threading.Lock()
+        self._scopes: "OrderedDict[tuple, DataScope]" = OrderedDict()
+
+    def student_enrollments(self, student_id: Any) -> pd.DataFrame:
+        """Enrollment rows of one student, by position."""
+        return self.enrollments.take(self._enrollment_rows.get(student_id, _EMPTY))
+
+    def student_record(self, student_id: Any) -> Optional[pd.Series]:
+        rows = self._student_rows.get(student_id)
+        if rows is None or not len(rows):
+            return None
+        return self.students.iloc[int(rows[0])]
+
+    def scope_for(self, user: Optional[Dict[str, Any]]) -> Optional[DataScope]:
+        """The DataScope of `user`, or None when the user may see every row."""
+        if user is None:
+            return None
+        role = user.get("role")
+        if role == "admin":
+            return None
+        if role == "student":
+            key = ("student", user.get("student_id") or user.get("username"))
+        elif role == "advisor":
+            if not self.has_caseloads:
+                return None
+            key = ("advisor", user.get("username"))
+        elif role == "faculty":
+            if not user.get("department"):
+                return None
+            key = ("department", user["department"])
+        else:
+            key = ("none", role)
+
+        with self._lock:
+            scope = self._scopes.get(key)
+            cache_lookup("scope", scope is not None)
+            if scope is not None:
+                self._scopes.move_to_end(key)
+                return scope
+        scope = self._build(key)
+        with self._lock:
+            self._scopes[key] = scope
+            while len(self._scopes) > self.MAX_CACHED_SCOPES:
+                self._scopes.popitem(last=False)
+        return scope
+
+    def _build(self, key: tuple) -> DataScope:
+        kind, value = key
+        if kind == "student":
+            student_rows = self._student_rows.get(value, _EMPTY)
+            enrollment_rows = self._enrollment_rows.get(value, _EMPTY)
+        elif kind == "advisor":
+            student_rows = self._advisor_rows.get(value, _EMPTY)
+            ids = pd.unique(self.students["student_id"].to_numpy()[student_rows])
+            enrollment_rows = _gather(self._enrollment_rows, ids)
+        elif kind == "department":
+            enrollment_rows = self._department_rows.get(value, _EMPTY)
+            ids = pd.unique(self.enrollments["student_id"].to_numpy()[enrollment_rows])
+            student_rows = _gather(self._student_rows, ids)
+        else:
+            student_rows = enrollment_rows = _EMPTY
+        return DataScope(key, self.students, self.enrollments, student_rows, enrollment_rows)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Mapping, Optional
+
+import pandas as pd
+
+from ..domain.grade_scale import default_scale
+from ..domain.gradebook import Gradebook
+from ..domain.pass_thresholds import PassThresholds
+from ..utils import perf
+from ..utils.config_loader import load_settings
+from .analytics_service import AnalyticsService
+from .risk_service import RiskService
+from .graph_service import GraphService
+from .eligibility_service import EligibilityService
+from .scope_service import ScopeService
+
+if TYPE_CHECKING:
+    from .data_service import DataGeneration
+
+# Warm-up stages in build order; used for progress reporting.
+WARMUP_STAGES = (
+    "gpa_table",
+    "student_summary",
+    "course_rates",
+    "at_risk",
+    "graph_summary",
+    "eligibility",
+    "scopes",
+)
+
+
+@dataclass
+class ServiceSnapshot:
+    """
+    Fully built services (and their warmed aggregates) for one
+    DataGeneration of the in-memory datasets.
+    """
+    generation: "DataGeneration"
+    gradebook: Gradebook
+    analytics: AnalyticsService
+    risk: RiskService
+    graph: GraphService
+    eligibility: EligibilityService
+    scopes: ScopeService
+    built_at: datetime = field(default_factory=datetime.utcnow)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def version(self) -> int:
+        return self.generation.version
+
+    @property
+    def data(self) -> Mapping[str, pd.DataFrame]:
+        return self.generation.tables
+
+
+def build_snapshot(
+    generation: "DataGeneration",
+    on_stage: Optional[Callable[[str, float], None]] = None,
+    previous: Optional[ServiceSnapshot] = None,
+) -> ServiceSnapshot:
+    """
+    Build every service for `generation` and precompute the dashboard aggregates
+    (GPA table, student summary, pass/DFW rates, at-risk list, graph summary,
+    course eligibility, row-scoping indexes).
+
+    `on_stage(name, seconds)` is called after each entry of WARMUP_STAGES.
+    Given the `previous` snapshot, the prerequisite graph and closure are
+    updated incrementally, and the grade/risk services are reused as-is when
+    students, courses and enrollments are the same tables as before (e.g.
+    after a prerequisites-only edit).
+    """
+    data = generation.tables
+    timings: Dict[str, float] = {}
+    reuse = previous is not None and all(
+        previous.data[name] is data[name]
+        for name in ("students", "courses", "enrollments")
+    )
+
+    def stage(name: str, fn: Callable[[], object]) -> None:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        perf.record(f"warmup.{name}", elapsed)
+        timings[name] = round(elapsed, 4)
+        if on_stage is not None:
+            on_stage(name, timings[name])
+
+    if reuse:
+        gradebook, analytics = previous.gradebook, previous.analytics
+    else:
+        gradebook = Gradebook(
+            enrollments=data["enrollments"],
+            courses=data["courses"],
+            scale=default_scale,
+        )
+        # Passing grades are resolved and joined onto enrollments once per
+        # version, then shared by analytics, risk and eligibility.
+        analytics = AnalyticsService(
+            gradebook=gradebook,
+            students=data["students"],
+            courses=data["courses"],
+            enrollments=data["enrollments"],
+            pass_thresholds=PassThresholds.from_config(
+                data["courses"], load_settings().get("risk", {})
+            ),
+        )
+    thresholds = analytics.pass_thresholds
+    stage("gpa_table", analytics.gpa_table)
+    stage("student_summary", analytics.student_summary_table)
+
+    def build_course_rates() -> None:
+        analytics.course_rates()
+        analytics.cohort_gpa_summary()
+        analytics.course_term_outcomes()
+
+    stage("course_rates", build_course_rates)
+
+    holder: Dict[str, object] = {}
+
+    def build_risk() -> None:
+        if reuse:
+            holder["risk"] = previous.risk
+            return
+        # gpa_tbl includes student metadata from AnalyticsService.gpa_table()
+        risk = RiskService(analytics.gpa_table(), data["enrollments"], thresholds)
+        risk.at_risk_students()
+        holder["risk"] = risk
+
+    def build_graph() -> None:
+        graph = GraphService(
+            data["prerequisites"],
+            data.get("courses"),
+            previous=previous.graph if previous is not None else None,
+        )
+        graph.summary()
+        graph.closure
+        graph.full_listing
+        graph.gateway_impact(analytics.course_term_outcomes())
+        holder["graph"] = graph
+
+    def build_eligibility() -> None:
+        holder["eligibility"] = EligibilityService(
+            data["students"],
+            data["courses"],
+            data["enrollments"],
+            holder["graph"].graph,
+            thresholds,
+        )
+
+    def build_scopes() -> None:
+        if reuse:
+            holder["scopes"] = previous.scopes
+            return
+        holder["scopes"] = ScopeService(
+            data["students"], data["courses"], data["enrollments"]
+        )
+
+    stage("at_risk", build_risk)
+    stage("graph_summary", build_graph)
+    stage("eligibility", build_eligibility)
+    stage("scopes", build_scopes)
+
+    return ServiceSnapshot(
+        generation=generation,
+        gradebook=gradebook,
+        analytics=analytics,
+        risk=holder["risk"],
+        graph=holder["graph"],
+        eligibility=holder["eligibility"],
+        scopes=holder["scopes"],
+        timings=timings,
+    )
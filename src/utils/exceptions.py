@@ -1,6 +1,28 @@
+from typing import Any, Dict, List, Optional
+
+
 class AppError(Exception):
     """Base application error."""
 
 
 class DataValidationError(AppError):
-    """Raised when data validation fails."""
\ No newline at end of file
+    """Raised when data validation fails."""
+
+    def __init__(self, message: str, report: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        # Structured details (e.g. ValidationReport.to_dict()), if available
+        self.report = report
+
+
+class PrerequisiteCycleError(AppError, ValueError):
+    """Raised when a prerequisite edge would create a cycle."""
+
+    def __init__(self, course_id: str, prereq_id: str, path: List[str]):
+        super().__init__(
+            f"{prereq_id} cannot be a prerequisite of {course_id}: "
+            f"it would create the cycle {' -> '.join(path)}"
+        )
+        self.course_id = course_id
+        self.prereq_id = prereq_id
+        # The cycle as a course path, first course repeated at the end
+        self.path = path
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Lightweight request and stage timing.
+
+`timed(name)` wraps a function or method and `stage(name)` times a block.
+While a request is handled by the API's PerfMiddleware, every timed call
+adds its duration to that request's stage totals (held in a contextvar, so
+sync endpoints running in the threadpool still report into their request).
+The registry keeps, per route and per stage, a rolling window of durations
+for p50/p95/p99, and per route a cumulative latency histogram for the
+Prometheus export. `reset()` clears the windows but not the histograms, so
+exported counters never go backwards.
+
+Timing is off until `configure()` enables it (`perf.enabled` in settings);
+a disabled `timed` wrapper costs one attribute check per call.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import numpy as np
+
+from . import metrics
+
+# Upper bounds (seconds) of the cumulative latency buckets; the last is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Settings:
+    enabled = False
+    server_timing = True
+    window = 1024
+
+
+_settings = _Settings()
+
+
+def configure(settings: Mapping[str, Any]) -> None:
+    """Apply the `perf` section of settings.yaml."""
+    cfg = settings.get("perf", {}) or {}
+    _settings.enabled = bool(cfg.get("enabled", True))
+    _settings.server_timing = bool(cfg.get("server_timing", True))
+    _settings.window = int(cfg.get("window", 1024))
+
+
+def enabled() -> bool:
+    return _settings.enabled
+
+
+def server_timing_enabled() -> bool:
+    return _settings.enabled and _settings.server_timing
+
+
+class RequestTimer:
+    """Stage totals of one request: name -> [seconds, calls]."""
+
+    __slots__ = ("stages", "endpoint_done")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, List[float]] = {}
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar("perf_request", default=None)
+
+
+def start_request() -> Any:
+    """Begin collecting stages for the current request; returns a reset token."""
+    return _current.set(RequestTimer())
+
+
+def current_request() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+def end_request(token: Any) -> None:
+    _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a stage duration to the current request (if any) and the registry."""
+    if not _settings.enabled:
+        return
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+    registry.observe_stage(name, seconds)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator: time each call as stage `name` (default: the qualified name)."""
+
+    def decorate(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _settings.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    if not _settings.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+class _Window:
+    """Rolling window of recent durations plus running count and total."""
+
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, size: int):
+        self.samples: deque = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        recent = np.fromiter(self.samples, dtype=float, count=len(self.samples))
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if recent.size else (0.0,) * 3
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(1000 * float(p50), 3),
+            "p95_ms": round(1000 * float(p95), 3),
+            "p99_ms": round(1000 * float(p99), 3),
+            "max_ms": round(1000 * float(recent.max()), 3) if recent.size else 0.0,
+        }
+
+
+class _Histogram:
+    """Cumulative bucket counts (bounds in BUCKETS), count and sum."""
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+class _RouteStats:
+    __slots__ = ("latency", "stages", "errors")
+
+    def __init__(self, size: int):
+        self.latency = _Window(size)
+        self.stages: Dict[str, _Window] = {}
+        self.errors = 0
+
+
+class PerfRegistry:
+    """Process-wide latency statistics per route and per stage."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[str, _RouteStats] = {}
+        self._stages: Dict[str, _Window] = {}
+        # Exported as Prometheus counters; not cleared by reset()
+        self._histograms: Dict[str, _Histogram] = {}
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            window = self._stages.get(name)
+            if window is None:
+                window = self._stages[name] = _Window(_settings.window)
+            window.add(seconds)
+
+    def observe_request(
+        self, route: str, status: int, seconds: float, timer: Optional[RequestTimer]
+    ) -> None:
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = _RouteStats(_settings.window)
+            stats.latency.add(seconds)
+            histogram = self._histograms.get(route)
+            if histogram is None:
+                histogram = self._histograms[route] = _Histogram()
+            histogram.add(seconds)
+            if status >= 500:
+                stats.errors += 1
+            if timer is not None:
+                for name, (total, _) in timer.stages.items():
+                    window = stats.stages.get(name)
+                    if window is None:
+                        window = stats.stages[name] = _Window(_settings.window)
+                    window.add(total)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """p50/p95/p99 per route (with its stage breakdown) and per stage."""
+        with self._lock:
+            routes = {
+                route: {
+                    **stats.latency.summary(),
+                    "errors": stats.errors,
+                    "stages": {n: w.summary() for n, w in sorted(stats.stages.items())},
+                }
+                for route, stats in sorted(self._routes.items())
+            }
+            stages = {n: w.summary() for n, w in sorted(self._stages.items())}
+        return {"enabled": _settings.enabled, "routes": routes, "stages": stages}
+
+    def histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Cumulative latency bucket counts per route (bounds in BUCKETS)."""
+        with self._lock:
+            return {
+                route: {"buckets": list(h.buckets), "count": h.count, "sum": h.total}
+                for route, h in self._histograms.items()
+            }
+
+    def reset(self) -> None:
+        """Clear the rolling windows (the exported histograms keep counting)."""
+        with self._lock:
+            self._routes.clear()
+            self._stages.clear()
+
+
+registry = PerfRegistry()
+
+
+def _latency_histograms():
+    """Request latency per route as a Prometheus histogram (cumulative buckets)."""
+    samples = []
+    for route, h in sorted(registry.histograms().items()):
+        method, _, path = route.partition(" ")
+        labels = {"method": method, "route": path}
+        running = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), h["buckets"]):
+            running += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append(("_bucket", {**labels, "le": le}, running))
+        samples.append(("_sum", labels, h["sum"]))
+        samples.append(("_count", labels, h["count"]))
+    yield (
+        "spa_request_duration_seconds",
+        "histogram",
+        "API request latency by route.",
+        samples,
+    )
+
+
+metrics.registry.register_collector(_latency_histograms)
\ No newline at end of file
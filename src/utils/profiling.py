@@ -0,0 +1,379 @@
+"""
+On-demand sampling profiler for slow API requests.
+
+While profiling is switched on (`profiling.enabled` in settings, or at
+runtime through PUT /api/admin/profiles/config), a sampler thread records
+the stacks of the threads working on in-flight requests every
+`interval_ms`. When a request finishes, its samples are kept if it carried
+the debug header or took at least `threshold_ms`, and dropped otherwise.
+Kept profiles go to a bounded ring buffer and can be exported as collapsed
+stacks (flamegraph.pl, speedscope) or as a pstats file built from the
+samples.
+
+One request runs on several threads. The event loop does routing, JSON
+encoding and rendering; threadpool workers run get_services, the endpoint
+and response validation. The loop thread is attributed to a request through
+its running asyncio task, and worker threads through `attach()` blocks
+around those steps. While profiling is on, the interpreter's thread switch
+interval is lowered so that the sampler gets the GIL between samples.
+"""
+
+import asyncio
+import itertools
+import marshal
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+# Deepest stack recorded per sample (frames nearest the root are dropped)
+MAX_DEPTH = 200
+
+_DEFAULT_SWITCH_INTERVAL = sys.getswitchinterval()
+
+Stack = Tuple[Any, ...]  # code objects, root first
+
+
+class _Settings:
+    enabled = False
+    threshold_ms = 1000.0
+    interval_ms = 5.0
+    header = b"x-profile"
+    capacity = 20
+
+
+_settings = _Settings()
+
+
+def configure(settings: Mapping[str, Any]) -> None:
+    """Apply the `profiling` section of settings.yaml."""
+    cfg = settings.get("profiling", {}) or {}
+    _settings.threshold_ms = float(cfg.get("threshold_ms", 1000))
+    _settings.interval_ms = max(float(cfg.get("interval_ms", 5)), 0.5)
+    _settings.header = str(cfg.get("header", "X-Profile")).lower().encode("latin-1")
+    capacity = int(cfg.get("capacity", 20))
+    if capacity != _settings.capacity:
+        _settings.capacity = capacity
+        store.resize(capacity)
+    set_enabled(bool(cfg.get("enabled", False)))
+
+
+def enabled() -> bool:
+    return _settings.enabled
+
+
+def set_enabled(value: bool) -> None:
+    _settings.enabled = value
+    if value:
+        _sampler.start()
+    else:
+        _sampler.stop()
+
+
+def _switch_interval() -> float:
+    # The sampler needs the GIL to run; while profiling, busy request
+    # threads are asked to release it at least once per sampling interval.
+    return min(_DEFAULT_SWITCH_INTERVAL, _settings.interval_ms / 1000 / 2)
+
+
+def update(
+    enabled: Optional[bool] = None,
+    threshold_ms: Optional[float] = None,
+    interval_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Change the profiler at runtime (admin toggle); returns the new config."""
+    if threshold_ms is not None:
+        _settings.threshold_ms = float(threshold_ms)
+    if interval_ms is not None:
+        _settings.interval_ms = max(float(interval_ms), 0.5)
+        if _settings.enabled:
+            sys.setswitchinterval(_switch_interval())
+    if enabled is not None:
+        set_enabled(enabled)
+    return config()
+
+
+def config() -> Dict[str, Any]:
+    return {
+        "enabled": _settings.enabled,
+        "threshold_ms": _settings.threshold_ms,
+        "interval_ms": _settings.interval_ms,
+        "header": _settings.header.decode("latin-1"),
+        "capacity": _settings.capacity,
+    }
+
+
+def header_requested(headers: List[Tuple[bytes, bytes]]) -> bool:
+    """True when the ASGI headers carry the debug header with a truthy value."""
+    for name, value in headers:
+        if name == _settings.header:
+            return value.strip().lower() not in (b"", b"0", b"false", b"no")
+    return False
+
+
+# ---------- Captures ----------
+
+
+class Capture:
+    """Samples of one in-flight request."""
+
+    __slots__ = ("method", "path", "forced", "started", "stacks", "samples", "task", "token")
+
+    def __init__(self, method: str, path: str, forced: bool):
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started = time.time()
+        self.stacks: Dict[Stack, int] = {}
+        self.samples = 0
+        self.task: Optional[asyncio.Task] = None
+        self.token: Any = None
+
+    def add(self, stack: Stack) -> None:
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+
+_current: ContextVar[Optional[Capture]] = ContextVar("profile_capture", default=None)
+_lock = threading.Lock()
+# Worker thread ident -> capture, while inside attach()
+_threads: Dict[int, Capture] = {}
+# Event loop thread ident -> loop, and the requests' tasks -> capture
+_loops: Dict[int, asyncio.AbstractEventLoop] = {}
+_tasks: Dict[asyncio.Task, Capture] = {}
+
+
+def begin(method: str, path: str, forced: bool) -> Optional[Capture]:
+    """Start capturing the current request (call from its asyncio task)."""
+    if not _settings.enabled:
+        return None
+    capture = Capture(method, path, forced)
+    capture.task = asyncio.current_task()
+    with _lock:
+        for ident in [i for i, loop in _loops.items() if loop.is_closed()]:
+            del _loops[ident]
+        _loops[threading.get_ident()] = asyncio.get_running_loop()
+        if capture.task is not None:
+            _tasks[capture.task] = capture
+    capture.token = _current.set(capture)
+    return capture
+
+
+def finish(
+    capture: Capture, route: Optional[str], status: int, seconds: float
+) -> Optional["Profile"]:
+    """Stop capturing; keep the profile when forced or slower than the threshold."""
+    _current.reset(capture.token)
+    with _lock:
+        _tasks.pop(capture.task, None)
+    if capture.forced:
+        trigger = "header"
+    elif 1000 * seconds >= _settings.threshold_ms:
+        trigger = "threshold"
+    else:
+        return None
+    profile = Profile(capture, route, status, seconds, trigger)
+    store.add(profile)
+    return profile
+
+
+@contextmanager
+def attach() -> Iterator[None]:
+    """Attribute this worker thread's stacks to the current request while inside."""
+    capture = _current.get()
+    ident = threading.get_ident()
+    if capture is None or ident in _loops:
+        # Not profiling, or on the loop thread (already covered by the task)
+        yield
+        return
+    _threads[ident] = capture
+    try:
+        yield
+    finally:
+        _threads.pop(ident, None)
+
+
+def _stack(frame: Any) -> Stack:
+    codes = []
+    while frame is not None and len(codes) < MAX_DEPTH:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return tuple(codes)
+
+
+class _Sampler:
+    """Background thread sampling the attributed threads while profiling is on."""
+
+    def __init__(self) -> None:
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        with _lock:
+            if self._thread is not None and self._thread.is_alive() and not self._stop.is_set():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop,), name="request-profiler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, stop: threading.Event) -> None:
+        sys.setswitchinterval(_switch_interval())
+        try:
+            while not stop.wait(_settings.interval_ms / 1000):
+                self.sample()
+        finally:
+            if self._thread is threading.current_thread():
+                sys.setswitchinterval(_DEFAULT_SWITCH_INTERVAL)
+
+    def sample(self) -> None:
+        with _lock:
+            targets = list(_threads.items())
+            for ident, loop in _loops.items():
+                capture = _tasks.get(asyncio.current_task(loop))
+                if capture is not None:
+                    targets.append((ident, capture))
+        if not targets:
+            return
+        frames = sys._current_frames()
+        for ident, capture in targets:
+            frame = frames.get(ident)
+            if frame is not None:
+                capture.add(_stack(frame))
+
+
+_sampler = _Sampler()
+
+
+# ---------- Kept profiles ----------
+
+
+def _function(code: Any) -> Tuple[str, int, str]:
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _label(code: Any) -> str:
+    parts = code.co_filename.replace("\\", "/").split("/")
+    where = "/".join(parts[-2:])
+    return f"{code.co_name} ({where}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Profile:
+    """A kept request profile: stack -> sample count plus request details."""
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self, capture: Capture, route: Optional[str], status: int, seconds: float, trigger: str
+    ):
+        self.id = next(self._ids)
+        self.method = capture.method
+        self.path = capture.path
+        self.route = route
+        self.status = status
+        self.seconds = seconds
+        self.trigger = trigger
+        self.captured_at = capture.started
+        self.interval = _settings.interval_ms / 1000
+        self.stacks = dict(capture.stacks)
+        self.samples = sum(self.stacks.values())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": round(1000 * self.seconds, 3),
+            "trigger": self.trigger,
+            "captured_at": time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.captured_at)
+            ),
+            "samples": self.samples,
+            "interval_ms": round(1000 * self.interval, 3),
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: "root;...;leaf count" per line."""
+        lines = [
+            ";".join(_label(code) for code in stack) + f" {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda kv: -kv[1])
+        ]
+        return "".join(line + "\n" for line in lines)
+
+    def pstats(self) -> bytes:
+        """
+        The samples as a marshalled pstats dict (load with pstats.Stats).
+        Call counts are sample counts; times are samples x interval.
+        """
+        dt = self.interval
+        stats: Dict[Tuple[str, int, str], list] = {}
+
+        def entry(func):
+            e = stats.get(func)
+            if e is None:
+                e = stats[func] = [0, 0, 0.0, 0.0, {}]
+            return e
+
+        for stack, count in self.stacks.items():
+            funcs = [_function(code) for code in stack]
+            for func in set(funcs):
+                e = entry(func)
+                e[0] += count
+                e[1] += count
+                e[3] += count * dt
+            entry(funcs[-1])[2] += count * dt
+            seen = set()
+            for i in range(1, len(funcs)):
+                pair = (funcs[i - 1], funcs[i])
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                callers = entry(funcs[i])[4]
+                c = callers.get(funcs[i - 1], (0, 0, 0.0, 0.0))
+                leaf = count * dt if i == len(funcs) - 1 else 0.0
+                callers[funcs[i - 1]] = (c[0] + count, c[1] + count, c[2] + leaf, c[3] + count * dt)
+        return marshal.dumps({func: tuple(e) for func, e in stats.items()})
+
+
+class ProfileStore:
+    """Ring buffer of the most recent kept profiles."""
+
+    def __init__(self, capacity: int):
+        self._lock = threading.Lock()
+        self._profiles: deque = deque(maxlen=capacity)
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def resize(self, capacity: int) -> None:
+        with self._lock:
+            self._profiles = deque(self._profiles, maxlen=capacity)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [p.summary() for p in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            for p in self._profiles:
+                if p.id == profile_id:
+                    return p
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+store = ProfileStore(_settings.capacity)
\ No newline at end of file
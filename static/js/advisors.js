@@ -11,25 +11,23 @@ async function fetchJSON(url) {
   return res.json();
 }
 
+const ADVISOR_PAGE_SIZE = 100;
+
 async function loadAtRisk(major, cohortYear) {
-  // Enriched student summary
-  const summary = await fetchJSON("/api/metrics/student-summary");
-  // Risk flags + scores
-  const risk = await fetchJSON("/api/risk/at-risk");
+  // Highest-risk students of the selected major/cohort with their metrics, in one request
+  const params = new URLSearchParams({ limit: ADVISOR_PAGE_SIZE });
+  if (major) params.set("major", major);
+  if (cohortYear) params.set("cohort_year", cohortYear);
+  const bundle = await fetchJSON(`/api/dashboards/advisor?${params}`);
+  const risk = bundle.rows;
+  const total = bundle.total;
 
-  const riskIndex = new Map(risk.map(r => [r.student_id, r]));
   const tbody = document.querySelector("#advisor-risk-table tbody");
   tbody.innerHTML = "";
 
   const rows = [];
 
-  summary.forEach(row => {
-    if (major && row.major !== major) return;
-    if (cohortYear && String(row.cohort_year) !== String(cohortYear)) return;
-
-    const r = riskIndex.get(row.student_id);
-    if (!r) return; // not at risk
-
+  risk.forEach(row => {
     const gpa = row.gpa != null ? row.gpa.toFixed(2) : "n/a";
     const avgAttendance =
       row.avg_attendance != null ? row.avg_attendance.toFixed(1) : "0.0";
@@ -38,9 +36,9 @@ async function loadAtRisk(major, cohortYear) {
       row.credits_attempted != null
         ? row.credits_attempted.toFixed(1)
         : "0.0";
-    const scoreValue = r.score || 0;
-    const scoreDisplay = r.score != null ? r.score.toFixed(2) : "0.00";
-    const flagsStr = (r.flags || []).join(", ");
+    const scoreValue = row.score || 0;
+    const scoreDisplay = row.score != null ? row.score.toFixed(2) : "0.00";
+    const flagsStr = (row.flags || []).join(", ");
 
     rows.push({
       name: row.name || row.student_id,
@@ -56,9 +54,6 @@ async function loadAtRisk(major, cohortYear) {
     });
   });
 
-  // Sort by descending risk score
-  rows.sort((a, b) => b.scoreValue - a.scoreValue);
-
   rows.forEach(row => {
     const { label, className } = riskLevel(row.scoreValue);
     const tr = document.createElement("tr");
@@ -77,6 +72,12 @@ async function loadAtRisk(major, cohortYear) {
     tbody.appendChild(tr);
   });
 
+  if (total > rows.length && rows.length) {
+    const tr = document.createElement("tr");
+    tr.innerHTML = `<td colspan="9" class="text-muted small">Showing the ${rows.length} highest-risk of ${total} students.</td>`;
+    tbody.appendChild(tr);
+  }
+
   if (!tbody.children.length) {
     const tr = document.createElement("tr");
     tr.innerHTML = `<td colspan="9">No at-risk students for selected filters.</td>`;
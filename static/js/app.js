@@ -11,40 +11,53 @@ async function fetchJSON(url) {
   return res.json();
 }
 
+// Paged endpoints: rows plus X-Total-Count / X-Next-Cursor headers
+async function fetchPage(url) {
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`Failed: ${url} (${res.status})`);
+  return {
+    rows: await res.json(),
+    total: Number(res.headers.get("X-Total-Count") || 0),
+    nextCursor: res.headers.get("X-Next-Cursor"),
+  };
+}
+
+const GPA_PAGE_SIZE = 50;
+const RISK_LIST_SIZE = 20;
+let gpaNextCursor = null;
+
 // Single Chart instance for cohort chart so we can destroy/recreate safely
 let cohortChart = null;
-async function loadHeadlineMetrics() {
-  const [summary, atRisk] = await Promise.all([
-    fetchJSON("/api/metrics/student-summary"),
-    fetchJSON("/api/risk/at-risk"),
-  ]);
-
-  const nStudents = summary.length;
-  const avgGpa =
-    nStudents > 0
-      ? summary.reduce((sum, r) => sum + (r.gpa || 0), 0) / nStudents
-      : 0.0;
-  const nAtRisk = atRisk.length;
-
-  document.getElementById("kpi-total-students").textContent = nStudents;
+function renderHeadlineMetrics(kpis) {
+  const avgGpa = kpis.avg_gpa != null ? kpis.avg_gpa : 0.0;
+  document.getElementById("kpi-total-students").textContent = kpis.students;
   document.getElementById("kpi-avg-gpa").textContent = avgGpa.toFixed(2);
-  document.getElementById("kpi-at-risk").textContent = nAtRisk;
+  document.getElementById("kpi-at-risk").textContent = kpis.at_risk;
 }
 
-async function loadGpaLeaderboard() {
-  const data = await fetchJSON("/api/metrics/student-summary");
+// `firstPage` ({rows, nextCursor}) comes from the overview bundle on page load
+async function loadGpaLeaderboard(append = false, firstPage = null) {
   // Read optional filter value (student id substring)
   const filterInput = document.getElementById('gpa-filter');
   const filterVal = filterInput && filterInput.value ? filterInput.value.trim().toLowerCase() : '';
   const tbody = document.querySelector("#gpa-table tbody");
-  tbody.innerHTML = "";
-
-  data.sort((a, b) => (b.gpa || 0) - (a.gpa || 0));
+  const moreBtn = document.getElementById("gpa-more");
 
-  // Apply student id filter if present
-  const rows = filterVal
-    ? data.filter(r => (r.student_id || '').toLowerCase().includes(filterVal))
-    : data;
+  // The server sorts by GPA; without a filter only one page is fetched
+  let rows;
+  if (filterVal) {
+    const data = await fetchJSON("/api/metrics/student-summary?sort_by=gpa");
+    rows = data.filter(r => (r.student_id || '').toLowerCase().includes(filterVal));
+    gpaNextCursor = null;
+  } else {
+    let url = `/api/metrics/student-summary?sort_by=gpa&limit=${GPA_PAGE_SIZE}`;
+    if (append && gpaNextCursor) url += `&cursor=${encodeURIComponent(gpaNextCursor)}`;
+    const page = firstPage || (await fetchPage(url));
+    rows = page.rows;
+    gpaNextCursor = page.nextCursor;
+  }
+  if (!append) tbody.innerHTML = "";
+  if (moreBtn) moreBtn.classList.toggle("d-none", !gpaNextCursor);
 
   for (const row of rows) {
     const gpa = row.gpa != null ? row.gpa.toFixed(2) : "n/a";
@@ -80,9 +93,10 @@ async function loadGpaLeaderboard() {
   }
 }
 
-async function loadRiskList() {
-  const risk = await fetchJSON("/api/risk/at-risk");
-  risk.sort((a, b) => (b.score || 0) - (a.score || 0));
+async function loadRiskList(page = null) {
+  // Highest scores first, sorted server-side
+  page = page || (await fetchPage(`/api/risk/at-risk?limit=${RISK_LIST_SIZE}`));
+  const risk = page.rows;
 
   const list = document.getElementById("risk-list");
   list.innerHTML = "";
@@ -108,6 +122,13 @@ async function loadRiskList() {
     list.appendChild(li);
   });
 
+  if (page.total > risk.length) {
+    const li = document.createElement("li");
+    li.className = "list-group-item small text-muted";
+    li.textContent = `… and ${page.total - risk.length} more (see Advisor view).`;
+    list.appendChild(li);
+  }
+
   if (!risk.length) {
     const li = document.createElement("li");
     li.className = "list-group-item";
@@ -116,10 +137,9 @@ async function loadRiskList() {
   }
 }
 
-async function loadCohortChart() {
-  let data;
+async function loadCohortChart(data = null) {
   try {
-    data = await fetchJSON("/api/metrics/cohort-gpa");
+    data = data || (await fetchJSON("/api/metrics/cohort-gpa"));
   } catch (err) {
     console.error("Failed to load cohort GPA:", err);
     return;
@@ -255,13 +275,57 @@ async function loadCohortChart() {
   // No interactive zoom/pan controls — chart size is handled above
 }
 
+// GPA histogram, binned on the server
+let gpaDistChart = null;
+async function loadGpaDistribution(hist = null) {
+  const ctx = document.getElementById("gpaDistChart");
+  if (!ctx) return;
+  if (!hist) {
+    const dist = await fetchJSON("/api/metrics/distributions?metric=gpa");
+    const { edges, groups } = dist.distributions.gpa;
+    hist = { edges, counts: groups.length ? groups[0].counts : [] };
+  }
+  const { edges, counts } = hist;
+  if (!counts.length) return;
+
+  const labels = edges.slice(0, -1).map((e, i) => `${e.toFixed(2)}–${edges[i + 1].toFixed(2)}`);
+  if (gpaDistChart) {
+    gpaDistChart.destroy();
+    gpaDistChart = null;
+  }
+  gpaDistChart = new Chart(ctx, {
+    type: "bar",
+    data: {
+      labels,
+      datasets: [
+        {
+          label: "Students",
+          data: counts,
+          backgroundColor: "rgba(78,121,167,0.6)",
+        },
+      ],
+    },
+    options: {
+      responsive: true,
+      plugins: { legend: { display: false } },
+      scales: { x: { ticks: { maxRotation: 60, minRotation: 45 } } },
+    },
+  });
+}
+
 async function initOverview() {
   try {
+    // One request for everything on the page
+    const bundle = await fetchJSON(
+      `/api/dashboards/overview?leaderboard_limit=${GPA_PAGE_SIZE}&risk_limit=${RISK_LIST_SIZE}`
+    );
+    const board = bundle.gpa_leaderboard;
+    renderHeadlineMetrics(bundle.kpis);
     await Promise.all([
-      loadHeadlineMetrics(),
-      loadGpaLeaderboard(),
-      loadRiskList(),
-      loadCohortChart(),
+      loadGpaLeaderboard(false, { rows: board.rows, nextCursor: board.next_cursor }),
+      loadRiskList(bundle.at_risk),
+      loadCohortChart(bundle.cohort_gpa),
+      loadGpaDistribution(bundle.gpa_distribution),
     ]);
   } catch (err) {
     console.error("Failed to init overview:", err);
@@ -286,4 +350,12 @@ try {
   }
 } catch (e) {
   // ignore DOM wiring errors
+}
+
+// "Load more" appends the next leaderboard page
+const gpaMoreBtn = document.getElementById("gpa-more");
+if (gpaMoreBtn) {
+  gpaMoreBtn.addEventListener("click", () => {
+    loadGpaLeaderboard(true).catch(err => console.error("Failed to load more GPA rows:", err));
+  });
 }
\ No newline at end of file
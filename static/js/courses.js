@@ -4,8 +4,8 @@ async function fetchJSON(url) {
   return res.json();
 }
 
-async function loadPassRates() {
-  const data = await fetchJSON("/api/metrics/pass-rates");
+// `data`: per-course rows of /api/dashboards/faculty (pass_rate and dfw_rate)
+function loadPassRates(data) {
   const labels = data.map(d => d.course_id);
   const values = data.map(d => d.pass_rate);
   const ctx = document.getElementById("passChart").getContext("2d");
@@ -28,8 +28,7 @@ async function loadPassRates() {
   });
 }
 
-async function loadDFWRates() {
-  const data = await fetchJSON("/api/metrics/dfw-rates");
+function loadDFWRates(data) {
   const labels = data.map(d => d.course_id);
   const values = data.map(d => d.dfw_rate);
   const ctx = document.getElementById("dfwChart").getContext("2d");
@@ -52,16 +51,12 @@ async function loadDFWRates() {
   });
 }
 
-async function loadCourseTable() {
-  const passData = await fetchJSON("/api/metrics/pass-rates");
-  const dfwData = await fetchJSON("/api/metrics/dfw-rates");
-  const dfwIndex = new Map(dfwData.map(d => [d.course_id, d.dfw_rate]));
-
+function loadCourseTable(data) {
   const tbody = document.querySelector("#course-table tbody");
   tbody.innerHTML = "";
 
-  passData.forEach(row => {
-    const dfwRate = dfwIndex.get(row.course_id) ?? 0;
+  data.forEach(row => {
+    const dfwRate = row.dfw_rate ?? 0;
     const tr = document.createElement("tr");
     tr.innerHTML = `
       <td>${row.course_id}</td>
@@ -77,11 +72,12 @@ async function loadCourseTable() {
 
 (async function init() {
   try {
-    await Promise.all([
-      loadPassRates(),
-      loadDFWRates(),
-      loadCourseTable(),
-    ]);
+    // Charts and table share one bundle request
+    const bundle = await fetchJSON("/api/dashboards/faculty");
+    const courses = bundle.courses || [];
+    loadPassRates(courses);
+    loadDFWRates(courses);
+    loadCourseTable(courses);
   } catch (err) {
     console.error(err);
     alert("Failed to load course analytics. Check backend.");
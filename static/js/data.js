@@ -11,6 +11,16 @@ async function loadStatus() {
   pre.textContent = JSON.stringify(data, null, 2);
 }
 
+function describeError(json) {
+  const detail = json.detail;
+  if (detail && typeof detail === "object") {
+    // Integrity failures carry a structured report; log it in full.
+    if (detail.report) console.warn("Validation report:", detail.report);
+    return detail.message || JSON.stringify(detail);
+  }
+  return detail || JSON.stringify(json);
+}
+
 async function uploadCSV(tableName, inputId) {
   const input = document.getElementById(inputId);
   const file = input.files[0];
@@ -32,7 +42,7 @@ async function uploadCSV(tableName, inputId) {
     });
     const json = await res.json();
     if (!res.ok) {
-      throw new Error(json.detail || JSON.stringify(json));
+      throw new Error(describeError(json));
     }
     msg.textContent = json.message || `Uploaded ${tableName} successfully.`;
     await loadStatus();
@@ -42,6 +52,37 @@ async function uploadCSV(tableName, inputId) {
   }
 }
 
+async function uploadBundle(inputId) {
+  const input = document.getElementById(inputId);
+  const file = input.files[0];
+  const msg = document.getElementById("upload-message");
+
+  if (!file) {
+    msg.textContent = "Please select a .zip bundle.";
+    return;
+  }
+
+  const formData = new FormData();
+  formData.append("bundle", file);
+
+  try {
+    const res = await fetch("/api/admin/upload-bundle", {
+      method: "POST",
+      body: formData,
+      headers: getAuthHeaders(),
+    });
+    const json = await res.json();
+    if (!res.ok) {
+      throw new Error(describeError(json));
+    }
+    msg.textContent = json.message || "Uploaded bundle successfully.";
+    await loadStatus();
+  } catch (err) {
+    console.error(err);
+    msg.textContent = `Error uploading bundle: ${err.message}`;
+  }
+}
+
 /* Adjusted init: loadStatus + initDownloadButtons */
 (async function init() {
   try {
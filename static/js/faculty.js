@@ -28,22 +28,17 @@ async function loadPassAndDFWCharts() {
   const { department, term } = getSelectedFilters();
   const query = buildQuery({ department, term });
 
+  // Pass and DFW rates per course come in one bundle
   let passRates = [];
-  let dfwRates = [];
   try {
-    [passRates, dfwRates] = await Promise.all([
-      fetchJSON(`/api/metrics/pass-rates${query}`),
-      fetchJSON(`/api/metrics/dfw-rates${query}`),
-    ]);
+    const bundle = await fetchJSON(`/api/dashboards/faculty${query}`);
+    passRates = bundle.courses || [];
   } catch (err) {
     console.error("Error fetching pass/dfw rates:", err);
     // Leave charts blank instead of breaking the page
     return;
   }
 
-  if (!Array.isArray(passRates)) passRates = [];
-  if (!Array.isArray(dfwRates)) dfwRates = [];
-
   const passCtx = document.getElementById("facultyPassChart");
   const dfwCtx = document.getElementById("facultyDFWChart");
   if (!passCtx || !dfwCtx) return;
@@ -70,10 +65,7 @@ async function loadPassAndDFWCharts() {
   const labels = passRates.map(r => `${r.course_id} ${r.title || ""}`);
   const passData = passRates.map(r => (r.pass_rate || 0) * 100);
 
-  const dfwMap = new Map(
-    dfwRates.map(r => [r.course_id, (r.dfw_rate || 0) * 100])
-  );
-  const dfwData = passRates.map(r => dfwMap.get(r.course_id) ?? 0);
+  const dfwData = passRates.map(r => (r.dfw_rate || 0) * 100);
 
   window._facultyPassChart = new Chart(passCtx, {
     type: "bar",
@@ -133,9 +125,10 @@ async function loadAllCoursePrereqs() {
   if (!container) return;
   container.innerHTML = '';
 
+  const { department } = getSelectedFilters();
   let full = [];
   try {
-    full = await fetchJSON('/api/graph/prerequisites/full');
+    full = await fetchJSON(`/api/graph/prerequisites/full${buildQuery({ department })}`);
   } catch (e) {
     console.error('Failed to fetch full prerequisites:', e);
     container.textContent = 'Could not load course prerequisites.';
@@ -0,0 +1,320 @@
+"""Benchmark services and API endpoints on synthetic institutions.
+
+For each size (number of students) a deterministic dataset is generated with
+tools/generate_synthetic_data.py (and kept under --data-root for later runs),
+then a fresh interpreter is started against it and records:
+- load:      DataService startup (CSV load + validation), snapshot warm-up
+             and the snapshot's per-stage timings
+- services:  every service method on freshly built (cold) service objects
+- endpoints: every GET endpoint, and the POST cases in POST_ENDPOINTS,
+             through TestClient on the warm snapshot
+
+Each measurement keeps min/median over --repeat runs (seconds). Results are
+written as JSON; --compare prints the ratio against an earlier result file
+and exits with status 1 when a median regressed by more than
+--max-regression, so runs of two versions can be diffed or gated in CI.
+
+Usage:
+  python tools/bench_services.py [--sizes 1000,50000,500000] [--repeat 3]
+        [--json out.json] [--compare baseline.json] [--max-regression 1.25]
+        [--data-root DIR]
+
+Run it from the project root; config/settings.yaml is used as the base
+configuration, with app.data_dir pointed at the generated data.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+
+from generate_synthetic_data import generate, write_tables  # noqa: E402
+
+DEFAULT_SIZES = (1000, 50000, 500000)
+
+# GET endpoints timed through TestClient; {course} and {student} are
+# filled with a mid-curriculum course and the first student.
+ENDPOINTS = (
+    "/api/metrics/gpa",
+    "/api/metrics/pass-rates",
+    "/api/metrics/dfw-rates",
+    "/api/metrics/attendance-correlation",
+    "/api/metrics/cohort-gpa",
+    "/api/metrics/student-summary",
+    "/api/metrics/distributions",
+    "/api/metrics/distributions?group_by=department",
+    "/api/metrics/gpa/export",
+    "/api/metrics/pass-rates/export",
+    "/api/risk/at-risk",
+    "/api/risk/early-warning",
+    "/api/graph/prerequisites",
+    "/api/graph/prerequisites/full",
+    "/api/graph/prerequisites/{course}/all",
+    "/api/graph/prerequisites/{course}/unlocks",
+    "/api/graph/curriculum",
+    "/api/graph/curriculum/{course}",
+    "/api/graph/gateway-impact",
+    "/api/students",
+    "/api/students/{student}/enrollments",
+    "/api/students/{student}/eligible-courses",
+    "/api/eligibility/export",
+    "/api/admin/data-status",
+    "/api/dashboards/overview",
+    "/api/dashboards/advisor",
+    "/api/dashboards/faculty",
+)
+
+# POST endpoints with their JSON bodies, reported as "POST <path>"
+POST_ENDPOINTS = (
+    (
+        "/api/risk/simulate",
+        {"grid": {"gpa_threshold": [1.5, 2.0, 2.5, 3.0], "attendance_threshold": [60, 70, 80]}},
+    ),
+)
+
+
+def _measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable] = None) -> Dict:
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        runs.append(time.perf_counter() - start)
+    return {"min": round(min(runs), 6), "median": round(statistics.median(runs), 6)}
+
+
+def run_child(repeat: int) -> Dict:
+    """Runs inside the benchmark interpreter (cwd = generated workspace)."""
+    sys.path.insert(0, str(ROOT))
+    from fastapi.testclient import TestClient
+
+    from src.api.main import app
+    from src.domain.grade_scale import default_scale
+    from src.domain.gradebook import Gradebook
+    from src.services import (
+        AnalyticsService,
+        DataService,
+        EligibilityService,
+        GraphService,
+        RiskService,
+        ScopeService,
+    )
+
+    result: Dict[str, Dict] = {"load": {}, "services": {}, "endpoints": {}}
+
+    # background_warmup is off, so this loads the CSVs and builds the snapshot
+    start = time.perf_counter()
+    data_service = DataService.instance()
+    total = time.perf_counter() - start
+    snapshot = data_service.get_snapshot()
+    warmup = float(data_service.status()["warmup"].get("total_seconds") or 0.0)
+    result["load"]["data_service"] = round(total - warmup, 6)
+    result["load"]["snapshot"] = round(warmup, 6)
+    result["load"]["stages"] = dict(snapshot.timings)
+
+    data = snapshot.data
+    students, courses = data["students"], data["courses"]
+    enrollments, prereqs = data["enrollments"], data["prerequisites"]
+
+    def gradebook():
+        return Gradebook(enrollments=enrollments, courses=courses, scale=default_scale)
+
+    def analytics():
+        return AnalyticsService(
+            gradebook=gradebook(), students=students, courses=courses, enrollments=enrollments
+        )
+
+    gpa = snapshot.analytics.gpa_table()
+    outcomes = snapshot.analytics.course_term_outcomes()
+    dfw = snapshot.analytics.dfw_rates()
+
+    def graph():
+        return GraphService(prereqs, courses)
+
+    def graph_with_closure():
+        g = graph()
+        g.closure
+        return g
+
+    cases = {
+        "Gradebook.compute_gpa_table": (gradebook, lambda g: g.compute_gpa_table()),
+        "AnalyticsService.gpa_table": (analytics, lambda a: a.gpa_table()),
+        "AnalyticsService.pass_rates": (analytics, lambda a: a.pass_rates()),
+        "AnalyticsService.dfw_rates": (analytics, lambda a: a.dfw_rates()),
+        "AnalyticsService.course_rates": (analytics, lambda a: a.course_rates()),
+        "AnalyticsService.attendance_grade_correlation": (
+            analytics, lambda a: a.attendance_grade_correlation()
+        ),
+        "AnalyticsService.cohort_gpa_summary": (analytics, lambda a: a.cohort_gpa_summary()),
+        "AnalyticsService.student_summary_table": (
+            analytics, lambda a: a.student_summary_table()
+        ),
+        "AnalyticsService.course_term_outcomes": (
+            analytics, lambda a: a.course_term_outcomes()
+        ),
+        "RiskService.__init__": (lambda: None, lambda _: RiskService(gpa, enrollments)),
+        "RiskService.at_risk_students": (
+            lambda: RiskService(gpa, enrollments), lambda r: r.at_risk_students()
+        ),
+        "GraphService.__init__": (lambda: None, lambda _: graph()),
+        "GraphService.summary": (graph, lambda g: g.summary()),
+        "GraphService.closure": (graph, lambda g: g.closure),
+        "GraphService.full_listing": (graph, lambda g: g.full_listing),
+        "GraphService.curriculum": (graph_with_closure, lambda g: g.curriculum(dfw)),
+        "GraphService.gateway_impact": (
+            graph_with_closure, lambda g: g.gateway_impact(outcomes)
+        ),
+        "EligibilityService.__init__": (
+            lambda: None,
+            lambda _: EligibilityService(students, courses, enrollments, snapshot.graph.graph),
+        ),
+        "ScopeService.__init__": (
+            lambda: None, lambda _: ScopeService(students, courses, enrollments)
+        ),
+    }
+    for name, (setup, fn) in cases.items():
+        result["services"][name] = _measure(fn, repeat, setup)
+
+    course = snapshot.graph.curriculum_stats.ids[
+        int(snapshot.graph.curriculum_stats.depth.argmax())
+    ] if len(snapshot.graph.graph.ids) else "NONE"
+    student = str(students["student_id"].iloc[0])
+    with TestClient(app) as client:
+        token = client.post(
+            "/api/auth/token", data={"username": "admin", "password": "admin123"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        calls = [("GET", template, None) for template in ENDPOINTS]
+        calls += [("POST", template, body) for template, body in POST_ENDPOINTS]
+        for method, template, body in calls:
+            path = template.format(course=course, student=student)
+            sizes: List[int] = []
+
+            def call():
+                response = client.request(method, path, headers=headers, json=body)
+                sizes.append(len(response.content))
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{path}: HTTP {response.status_code}")
+
+            stats = _measure(call, repeat)
+            stats["bytes"] = sizes[-1]
+            key = template if method == "GET" else f"{method} {template}"
+            result["endpoints"][key] = stats
+    return result
+
+
+def _workspace(data_dir: Path, tmp: Path) -> Path:
+    """A cwd for the child: config pointing at `data_dir`, empty static/."""
+    settings = yaml.safe_load((ROOT / "config" / "settings.yaml").read_text(encoding="utf-8"))
+    settings["app"]["data_dir"] = str(data_dir)
+    settings["app"]["data_cache_dir"] = None
+    settings["app"]["background_warmup"] = False
+    (tmp / "config").mkdir(parents=True, exist_ok=True)
+    (tmp / "static").mkdir(exist_ok=True)
+    (tmp / "config" / "settings.yaml").write_text(yaml.safe_dump(settings), encoding="utf-8")
+    return tmp
+
+
+def run_size(n_students: int, args: argparse.Namespace) -> Dict:
+    data_dir = args.data_root / f"students-{n_students}-seed{args.seed}"
+    if not (data_dir / "enrollments.csv").exists():
+        print(f"generating {n_students} students -> {data_dir}", file=sys.stderr)
+        write_tables(generate(n_students, seed=args.seed), data_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = _workspace(data_dir, Path(tmp))
+        out = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", "--repeat", str(args.repeat)],
+            cwd=cwd,
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float, floor: float) -> int:
+    """Print median ratios current/baseline; count regressions above the threshold."""
+    regressions = 0
+    for size, groups in current["results"].items():
+        base_groups = baseline.get("results", {}).get(size)
+        if base_groups is None:
+            continue
+        for group in ("services", "endpoints"):
+            for name, stats in groups[group].items():
+                base = base_groups.get(group, {}).get(name)
+                if base is None or max(base["median"], stats["median"]) < floor:
+                    continue
+                ratio = stats["median"] / max(base["median"], 1e-9)
+                flag = ""
+                if ratio > max_regression:
+                    regressions += 1
+                    flag = "  REGRESSION"
+                print(f"{size:>8} {group:<9} {name:<48} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare with")
+    parser.add_argument("--max-regression", type=float, default=1.25)
+    parser.add_argument(
+        "--min-seconds", type=float, default=0.005,
+        help="ignore measurements below this in --compare (timer noise)",
+    )
+    parser.add_argument(
+        "--data-root", type=Path, default=Path(tempfile.gettempdir()) / "spa-bench-data"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.repeat)))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    for n in sizes:
+        print(f"benchmarking {n} students", file=sys.stderr)
+        result["results"][str(n)] = run_size(n, args)
+
+    for size, groups in result["results"].items():
+        print(f"== {size} students: load {groups['load']['data_service']:.3f}s, "
+              f"warm-up {groups['load']['snapshot']:.3f}s")
+        for group in ("services", "endpoints"):
+            for name, stats in groups[group].items():
+                print(f"  {group:<9} {name:<48} {stats['median']:.4f}s")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if compare(result, baseline, args.max_regression, args.min_seconds):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
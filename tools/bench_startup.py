@@ -0,0 +1,98 @@
+"""Measure application import and startup time.
+
+Each run starts a fresh interpreter (so nothing is cached in sys.modules) and
+records:
+- import_s:   time to `import src.api.main`
+- startup_s:  time for the FastAPI lifespan hook (settings + data load)
+- warmup_s:   time until the first service snapshot is ready to serve
+- eager_heavy_modules: heavy optional modules (scipy, jose) that were
+  imported before any request; these should stay empty.
+
+Usage:
+  python tools/bench_startup.py [--runs 5] [--json out.json] [--max-import-seconds 1.5]
+
+With --max-import-seconds the script exits with status 1 when the median
+import time exceeds the budget, so it can guard against regressions in CI.
+Run it from the project root (config/settings.yaml is read relative to it).
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ("scipy", "jose")
+
+_CHILD = r"""
+import asyncio, json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from src.api.main import app, lifespan
+t1 = time.perf_counter()
+eager = [m for m in {heavy!r} if m in sys.modules]
+
+async def start():
+    async with lifespan(app):
+        t2 = time.perf_counter()
+        from src.services.data_service import DataService
+        DataService.instance().get_snapshot()
+        t3 = time.perf_counter()
+    return t2, t3
+
+t2, t3 = asyncio.run(start())
+print(json.dumps({{
+    "import_s": t1 - t0,
+    "startup_s": t2 - t1,
+    "warmup_s": t3 - t2,
+    "eager_heavy_modules": eager,
+}}))
+"""
+
+
+def run_once() -> dict:
+    code = _CHILD.format(root=str(ROOT), heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path.cwd(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    summary = {
+        key: round(statistics.median(r[key] for r in runs), 4)
+        for key in ("import_s", "startup_s", "warmup_s")
+    }
+    summary["eager_heavy_modules"] = sorted(
+        {m for r in runs for m in r["eager_heavy_modules"]}
+    )
+    result = {"runs": runs, "median": summary}
+
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.max_import_seconds is not None and summary["import_s"] > args.max_import_seconds:
+        print(
+            f"Import time {summary['import_s']:.3f}s exceeds budget "
+            f"{args.max_import_seconds:.3f}s"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,87 +7,59 @@ Outputs:
 Usage:
   python tools/generate_full_prereqs.py
 
-This is a helper for the demo; run locally and inspect the generated CSV before replacing the original.
+The API answers the same queries in-process (see src/graph/closure.py), so
+this is only needed for an offline export. Run locally and inspect the
+generated CSV before replacing the original.
 """
 import csv
-from collections import defaultdict, deque
+import sys
 from pathlib import Path
 
+import pandas as pd
+
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.graph import PrereqGraph, TransitiveClosure  # noqa: E402
+
 DATA = ROOT / 'data'
 PREREQ_CSV = DATA / 'prerequisites.csv'
 COURSES_CSV = DATA / 'courses.csv'
 OUT_CSV = DATA / 'inferred_prerequisites.csv'
 
 def read_prereqs(path):
-    adj = defaultdict(list)
-    referenced = set()
-    with open(path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            c = r.get('course_id')
-            p = r.get('prereq_id')
-            if c and p:
-                adj[c].append(p)
-                referenced.add(c)
-                referenced.add(p)
-    return dict(adj), referenced
+    df = pd.read_csv(path, dtype=str)
+    edges = df[['course_id', 'prereq_id']].dropna()
+    referenced = set(edges['course_id']) | set(edges['prereq_id'])
+    return edges, referenced
 
 def read_courses(path):
-    courses = set()
+    df = pd.read_csv(path, dtype=str)
+    courses = set(df['course_id'].dropna())
     titles = {}
-    with open(path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            cid = r.get('course_id')
-            title = r.get('title')
-            if cid:
-                courses.add(cid)
-                if title:
-                    titles[cid] = title
+    if 'title' in df.columns:
+        titles = dict(df[['course_id', 'title']].dropna().itertuples(index=False))
     return courses, titles
 
-# Compute transitive prerequisites for each course using BFS to capture shortest distance
-def compute_transitive(adj):
-    trans = defaultdict(dict)  # trans[course][prereq] = distance
-    for course in set(list(adj.keys()) + [p for vals in adj.values() for p in vals]):
-        # BFS from course following prereq edges
-        seen = {course: 0}
-        q = deque()
-        # Start with direct prerequisites
-        for p in adj.get(course, []):
-            q.append((p, 1))
-            if p not in seen or seen[p] > 1:
-                seen[p] = 1
-        while q:
-            node, dist = q.popleft()
-            # record
-            trans[course][node] = dist
-            for p in adj.get(node, []):
-                if p not in seen or seen[p] > dist + 1:
-                    seen[p] = dist + 1
-                    q.append((p, dist + 1))
-    return trans
+# Same closure index the API serves from (/graph/prerequisites/{id}/all):
+# shortest distance to every direct and indirect prerequisite.
+def compute_transitive(edges):
+    return TransitiveClosure(PrereqGraph.from_frame(edges))
 
 
-def write_inferred(trans, out_path):
+def write_inferred(closure, out_path):
     # flatten to rows and sort
-    rows = []
-    for c, pres in trans.items():
-        for p, d in pres.items():
-            rows.append((c, p, d))
-    rows.sort()
+    rows = sorted(closure.pairs())
     with open(out_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['course_id', 'prereq_id', 'distance'])
-        for r in rows:
-            writer.writerow(r)
+        writer.writerows(rows)
 
 if __name__ == '__main__':
     if not PREREQ_CSV.exists():
         print(f"Prerequisites file not found: {PREREQ_CSV}")
         raise SystemExit(1)
-    adj, referenced = read_prereqs(PREREQ_CSV)
+    edges, referenced = read_prereqs(PREREQ_CSV)
     courses, titles = (set(), {})
     if COURSES_CSV.exists():
         courses, titles = read_courses(COURSES_CSV)
@@ -100,8 +72,8 @@ if __name__ == '__main__':
     else:
         print("All referenced courses present in courses.csv")
 
-    trans = compute_transitive(adj)
-    write_inferred(trans, OUT_CSV)
+    closure = compute_transitive(edges)
+    write_inferred(closure, OUT_CSV)
     print(f"Wrote inferred prerequisites to {OUT_CSV}")
     print("Sample (first 20 rows):")
     with open(OUT_CSV, newline='', encoding='utf-8') as f:
@@ -0,0 +1,192 @@
+"""Generate a deterministic synthetic institution of any size.
+
+Writes students.csv, courses.csv, enrollments.csv and prerequisites.csv in
+the same layout as data/, so the app (or tools/bench_services.py) can be
+pointed at it through app.data_dir.
+
+- courses: DEPT + level + sequence (e.g. CS203), levels 100-400
+- prerequisites: a DAG; every edge points to a lower-level course, mostly
+  in the same department
+- enrollments: lower levels earlier in a student's career, failed courses
+  partly retaken in a later term, some withdrawals, and the latest term
+  still in progress
+
+The same arguments always produce the same files.
+
+Usage:
+  python tools/generate_synthetic_data.py --students 50000 --out /tmp/inst50k
+        [--courses N] [--terms 8] [--per-student 12] [--seed 0]
+"""
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+DEPARTMENTS = (
+    "CS", "MATH", "PHYS", "CHEM", "BIO", "ECON",
+    "HIST", "ENG", "PSY", "SOC", "PHIL", "ART",
+)
+SEASONS = ("Spring", "Fall")
+FIRST_YEAR = 2018
+MAX_PER_LEVEL = 99
+
+
+def default_course_count(n_students: int) -> int:
+    return int(np.clip(n_students // 50, 48, len(DEPARTMENTS) * 4 * MAX_PER_LEVEL))
+
+
+def make_courses(rng: np.random.Generator, n_courses: int) -> pd.DataFrame:
+    n_depts = len(DEPARTMENTS)
+    slot = np.arange(n_courses)
+    dept = slot % n_depts
+    level = (slot // n_depts) % 4 + 1
+    seq = slot // (n_depts * 4) + 1
+    ids = [f"{DEPARTMENTS[d]}{lv}{s:02d}" for d, lv, s in zip(dept, level, seq)]
+    return pd.DataFrame({
+        "course_id": ids,
+        "title": [f"{DEPARTMENTS[d]} course {lv}{s:02d}" for d, lv, s in zip(dept, level, seq)],
+        "credits": rng.choice([1, 3, 3, 3, 4], size=n_courses),
+        "department": [DEPARTMENTS[d] for d in dept],
+        "level": level * 100,
+    })
+
+
+def make_prerequisites(rng: np.random.Generator, courses: pd.DataFrame) -> pd.DataFrame:
+    """0-3 prerequisites per course above level 100, all from lower levels."""
+    level = courses["level"].to_numpy() // 100
+    dept = courses["department"].to_numpy()
+    ids = courses["course_id"].to_numpy()
+    lower = {
+        (d, lv): np.flatnonzero((dept == d) & (level < lv))
+        for d in DEPARTMENTS for lv in range(2, 5)
+    }
+    any_lower = {lv: np.flatnonzero(level < lv) for lv in range(2, 5)}
+
+    src, dst = [], []
+    counts = rng.choice([0, 1, 1, 2, 2, 3], size=len(ids))
+    for i in np.flatnonzero(level > 1):
+        pool = lower[(dept[i], level[i])]
+        if not len(pool) or rng.random() < 0.1:
+            pool = any_lower[level[i]]  # occasional cross-department prerequisite
+        k = min(int(counts[i]), len(pool))
+        for j in rng.choice(pool, size=k, replace=False):
+            src.append(ids[i])
+            dst.append(ids[j])
+    return pd.DataFrame({"course_id": src, "prereq_id": dst})
+
+
+def make_students(rng: np.random.Generator, n_students: int, n_terms: int) -> pd.DataFrame:
+    width = max(3, len(str(n_students)))
+    last_year = FIRST_YEAR + (n_terms - 1) // len(SEASONS)
+    return pd.DataFrame({
+        "student_id": [f"S{i:0{width}d}" for i in range(1, n_students + 1)],
+        "name": [f"Student {i}" for i in range(1, n_students + 1)],
+        "major": rng.choice(DEPARTMENTS, size=n_students),
+        "cohort_year": rng.integers(FIRST_YEAR, last_year + 1, size=n_students),
+    })
+
+
+def make_enrollments(
+    rng: np.random.Generator,
+    students: pd.DataFrame,
+    courses: pd.DataFrame,
+    n_terms: int,
+    per_student: float,
+) -> pd.DataFrame:
+    terms = np.array([
+        f"{FIRST_YEAR + t // len(SEASONS)}-{SEASONS[t % len(SEASONS)]}"
+        for t in range(n_terms)
+    ])
+    n_students, n_courses = len(students), len(courses)
+
+    # Draw courses per student, then keep the first (student, course) pair
+    counts = rng.poisson(per_student, size=n_students).clip(1, n_courses)
+    stu = np.repeat(np.arange(n_students), counts)
+    crs = rng.integers(0, n_courses, size=len(stu))
+    pairs = pd.DataFrame({"s": stu, "c": crs}).drop_duplicates()
+    stu, crs = pairs["s"].to_numpy(), pairs["c"].to_numpy()
+
+    # Students take lower levels first, spread over the terms since their cohort
+    start = (students["cohort_year"].to_numpy()[stu] - FIRST_YEAR) * len(SEASONS)
+    span = n_terms - start
+    level = courses["level"].to_numpy()[crs] // 100
+    progress = (level - 1 + rng.random(len(stu))) / 4
+    term = start + (progress * span).astype(np.int64)
+
+    ability = rng.normal(0, 8, size=n_students)[stu]
+    grade = np.clip(rng.normal(76, 13, size=len(stu)) + ability, 0, 100).round()
+    attendance = np.clip(60 + 0.35 * grade + rng.normal(0, 8, size=len(stu)), 0, 100).round()
+
+    # Retake a share of failed courses in the next term
+    retake = (grade < 60) & (term < n_terms - 1) & (rng.random(len(stu)) < 0.6)
+    r_grade = np.clip(grade[retake] + rng.normal(12, 8, size=int(retake.sum())), 0, 100).round()
+    stu = np.concatenate([stu, stu[retake]])
+    crs = np.concatenate([crs, crs[retake]])
+    term = np.concatenate([term, term[retake] + 1])
+    grade = np.concatenate([grade, r_grade])
+    attendance = np.concatenate([attendance, attendance[retake]])
+
+    status = np.full(len(stu), "completed", dtype=object)
+    status[rng.random(len(stu)) < 0.04] = "withdrawn"
+    status[term == n_terms - 1] = "in_progress"
+    grade = np.where(status == "completed", grade, np.nan)
+
+    order = np.lexsort((crs, term, stu))
+    return pd.DataFrame({
+        "student_id": students["student_id"].to_numpy()[stu[order]],
+        "course_id": courses["course_id"].to_numpy()[crs[order]],
+        "term": terms[term[order]],
+        "grade": grade[order],
+        "attendance_pct": attendance[order],
+        "status": status[order],
+    })
+
+
+def generate(
+    n_students: int,
+    n_courses: Optional[int] = None,
+    n_terms: int = 8,
+    per_student: float = 12.0,
+    seed: int = 0,
+) -> Dict[str, pd.DataFrame]:
+    """Build the four tables; identical output for identical arguments."""
+    rng = np.random.default_rng(seed)
+    courses = make_courses(rng, n_courses or default_course_count(n_students))
+    prerequisites = make_prerequisites(rng, courses)
+    students = make_students(rng, n_students, n_terms)
+    enrollments = make_enrollments(rng, students, courses, n_terms, per_student)
+    return {
+        "students": students,
+        "courses": courses,
+        "enrollments": enrollments,
+        "prerequisites": prerequisites,
+    }
+
+
+def write_tables(tables: Dict[str, pd.DataFrame], out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in tables.items():
+        df.to_csv(out_dir / f"{name}.csv", index=False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, required=True)
+    parser.add_argument("--courses", type=int, default=None)
+    parser.add_argument("--terms", type=int, default=8)
+    parser.add_argument("--per-student", type=float, default=12.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    tables = generate(args.students, args.courses, args.terms, args.per_student, args.seed)
+    write_tables(tables, args.out)
+    for name, df in tables.items():
+        print(f"{name}: {len(df)} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())